@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class DepartmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'departments'
+
+    def ready(self):
+        from mfgProject.cache import model_changed
+        from .models import Departments
+
+        # Drop the cached values depending on the departments, e.g. their capabilities, whenever one changes
+        post_save.connect(model_changed, sender=Departments, dispatch_uid='cache_department_saved')
+        post_delete.connect(model_changed, sender=Departments, dispatch_uid='cache_department_deleted')
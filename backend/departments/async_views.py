@@ -0,0 +1,16 @@
+from asgiref.sync import sync_to_async
+from rest_framework import status
+
+from manufacturing.async_views import AsyncReadView
+from manufacturing.versions import CATALOG
+from .capabilities import get_capabilities
+from .views import DepartmentInfoView
+
+
+class AsyncDepartmentInfoView(AsyncReadView):
+    view_class = DepartmentInfoView
+    versions = (CATALOG,)
+
+    async def handle(self, request, user, capabilities):
+        data = DepartmentInfoView.response_data(user, await sync_to_async(get_capabilities)())
+        return data, status.HTTP_201_CREATED
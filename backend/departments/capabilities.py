@@ -0,0 +1,63 @@
+from dataclasses import dataclass
+
+from mfgProject.cache import CachedValue
+from parts.models import Parts
+from .models import Departments
+
+# The department whose members assemble planes, every other department makes parts
+ASSEMBLY_DEPARTMENT = 'Assembly Team'
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    """What the members of a department may do: assemble planes, or make and recycle the parts in `part_ids`."""
+    department_id: int = None
+    name: str = None
+    can_assemble: bool = False
+    part_ids: frozenset = frozenset()
+
+    @property
+    def makes_parts(self):
+        return self.department_id is not None and not self.can_assemble
+
+    def can_use_parts(self, part_ids):
+        """Returns whether every part of `part_ids` belongs to the department."""
+        return self.makes_parts and self.part_ids.issuperset(part_ids)
+
+
+# Capabilities of users without a (known) department
+NO_CAPABILITIES = Capabilities()
+
+def _load_capabilities():
+    part_ids = {}
+    for department_id, part_id in Departments.objects.filter(parts__isnull=False).values_list('id', 'parts__id'):
+        part_ids.setdefault(department_id, set()).add(part_id)
+    return {
+        department_id: Capabilities(
+            department_id=department_id,
+            name=name,
+            can_assemble=name == ASSEMBLY_DEPARTMENT,
+            part_ids=frozenset(part_ids.get(department_id, ())),
+        )
+        for department_id, name in Departments.objects.order_by('id').values_list('id', 'name')
+    }
+
+
+department_capabilities = CachedValue('department_capabilities', [Departments, Parts], _load_capabilities)
+
+
+def get_capabilities():
+    """
+    Returns the capabilities of every department as `{department_id: Capabilities}`.
+
+    They are loaded with two queries and cached, see `CachedValue`. Every Departments or Parts
+    change made through the ORM invalidates them.
+    """
+    return department_capabilities.get()
+
+
+def get_department_capabilities(department_id):
+    """Returns the capabilities of the given department, `NO_CAPABILITIES` for None or an unknown department."""
+    if department_id is None:
+        return NO_CAPABILITIES
+    return get_capabilities().get(department_id, NO_CAPABILITIES)
@@ -0,0 +1,53 @@
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+
+from .capabilities import get_department_capabilities
+
+
+class DepartmentPermissionDenied(PermissionDenied):
+    """403 with the `{'status': False, 'error': ...}` body of the views, kept as is by DRF's exception handler."""
+
+    def __init__(self, error):
+        super().__init__()
+        self.detail = {'status': False, 'error': error}
+
+
+class DepartmentPermission(IsAuthenticated):
+    """
+    Allows the users whose department capabilities pass `allows(capabilities)`, a static method
+    of the subclasses, read from the cached capabilities without a query.
+    """
+    error = None
+
+    @classmethod
+    def check(cls, capabilities):
+        """Raises DepartmentPermissionDenied unless `capabilities` are allowed."""
+        if not cls.allows(capabilities):
+            raise DepartmentPermissionDenied(cls.error)
+
+    def has_permission(self, request, view):
+        if not super().has_permission(request, view):
+            return False
+        self.check(get_department_capabilities(request.user.department_id))
+        return True
+
+
+class CanAssemble(DepartmentPermission):
+    """Allows the members of a department assembling planes."""
+    error = 'User is not part of the Assembly Team.'
+
+    @staticmethod
+    def allows(capabilities):
+        return capabilities.can_assemble
+
+
+class MakesParts(DepartmentPermission):
+    """
+    Allows the members of a department making parts. Which parts a user may use is checked by the
+    view with `Capabilities.can_use_parts` once it knows them.
+    """
+    error = 'User is either in the Assembly Team or has no valid department.'
+
+    @staticmethod
+    def allows(capabilities):
+        return capabilities.makes_parts
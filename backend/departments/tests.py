@@ -1,3 +1,61 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from parts.models import Parts
+from personnel.models import CustomUser
+from personnel.tokens import ClaimsRefreshToken
+from planes.models import Planes
+from .capabilities import get_capabilities, get_department_capabilities
+from .models import Departments
+
+
+class DepartmentCapabilitiesTests(TestCase):
+    def setUp(self):
+        self.assembly_team = Departments.objects.create(name='Assembly Team')
+        self.wing_team = Departments.objects.create(name='Wing Team')
+        self.body_team = Departments.objects.create(name='Body Team')
+        self.left_wing = Parts.objects.create(name='Left Wing', department=self.wing_team)
+        self.right_wing = Parts.objects.create(name='Right Wing', department=self.wing_team)
+        self.body = Parts.objects.create(name='Body', department=self.body_team)
+        self.plane = Planes.objects.create(name='TB2')
+        self.user = CustomUser.objects.create_user(username='operator', password='pass', department=self.wing_team)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(self.user).access_token}')
+
+    def test_departments_can_own_several_parts(self):
+        wing_team = get_department_capabilities(self.wing_team.id)
+
+        self.assertEqual(wing_team.part_ids, {self.left_wing.id, self.right_wing.id})
+        self.assertTrue(wing_team.can_use_parts([self.left_wing.id, self.right_wing.id]))
+        self.assertFalse(wing_team.can_use_parts([self.left_wing.id, self.body.id]))
+        self.assertTrue(get_department_capabilities(self.assembly_team.id).can_assemble)
+        self.assertFalse(get_department_capabilities(None).makes_parts)
+
+        for part in (self.left_wing, self.right_wing):
+            response = self.client.post('/part/create', {'plane_id': self.plane.id, 'part_id': part.id}, format='json')
+            self.assertEqual(response.status_code, 200)
+
+    def test_authorization_needs_no_query(self):
+        get_capabilities()
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/plane/list')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data, {'status': False, 'error': 'User is not part of the Assembly Team.'})
+
+        # Only the catalog version of the ETag is read
+        with self.assertNumQueries(1):
+            response = self.client.get('/department/list')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([department['department_name'] for department in response.data['departments']], ['Wing Team', 'Body Team'])
+
+    def test_part_changes_invalidate_the_capabilities(self):
+        self.assertNotIn(self.body.id, get_department_capabilities(self.wing_team.id).part_ids)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.body.department = self.wing_team
+            self.body.save()
+
+        self.assertIn(self.body.id, get_department_capabilities(self.wing_team.id).part_ids)
+        response = self.client.post('/part/create', {'plane_id': self.plane.id, 'part_id': self.body.id}, format='json')
+        self.assertEqual(response.status_code, 200)
@@ -1,7 +1,9 @@
 # departments/urls.py
+from django.conf import settings
 from django.urls import path
+from .async_views import AsyncDepartmentInfoView
 from .views import DepartmentInfoView
 
 urlpatterns = [
-    path('department/list', DepartmentInfoView.as_view(), name='department-info'),
+    path('department/list', (AsyncDepartmentInfoView if settings.ASYNC_READ_VIEWS else DepartmentInfoView).as_view(), name='department-info'),
 ]
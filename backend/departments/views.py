@@ -2,15 +2,16 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from manufacturing.versions import CATALOG, conditional
+from personnel.authentication import ClaimsJWTAuthentication
 from personnel.models import CustomUser
-from .models import Departments
+from .capabilities import NO_CAPABILITIES, get_capabilities
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 class DepartmentInfoView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -31,47 +32,42 @@ class DepartmentInfoView(APIView):
             )
         ]
     )
+    @conditional(CATALOG)
     def get(self, request):
-        user = request.user
+        # If department exists, construct the response from the cached capabilities of every department
+        data = self.response_data(request.user, get_capabilities())
+        return Response(data, status=status.HTTP_201_CREATED)
 
+    @staticmethod
+    def response_data(user, capabilities):
         # If department is None, return an appropriate response
-        if not user.department:
-            data = {
+        if user.department_id is None:
+            return {
                 'error': 'Department ID is null or blank.'
             }
-            return Response(data, status=status.HTTP_201_CREATED)
 
-        # If department exists, construct the response
-        department_name = user.department.name
-        user_department_id = user.department.id
-        is_assembly_team = department_name == 'Assembly Team'
+        user_department_id = user.department_id
+        is_assembly_team = capabilities.get(user_department_id, NO_CAPABILITIES).can_assemble
 
-        # Retrieve all departments and construct the departments list, excluding "Assembly Team"
+        # Construct the departments list, excluding the assembling departments
         departments_data = []
-        all_departments = Departments.objects.all()
-
-        for dept in all_departments:
+        for department in capabilities.values():
             # Skip the "Assembly Team" department
-            if dept.name == 'Assembly Team':
+            if department.can_assemble:
                 continue
 
             # Set isAccess to True only if the department matches the user's department
-            # If the user is in the Assembly Team, then isAccess should only be True for "Assembly Team"
-            is_access = dept.id == user_department_id if not is_assembly_team else dept.name == 'Assembly Team'
+            # If the user is in the Assembly Team, then isAccess is False for every listed department
+            is_access = department.department_id == user_department_id and not is_assembly_team
             departments_data.append({
-                'department_name': dept.name,
-                'department_id': dept.id,
+                'department_name': department.name,
+                'department_id': department.department_id,
                 'isAccess': is_access
             })
 
         # Construct the response
-        data = {
+        return {
             'isAssemblyTeam': is_assembly_team,
             'username': user.username,
             'departments': departments_data
         }
-
-        return Response(data, status=status.HTTP_201_CREATED)
-
-
-
@@ -0,0 +1,24 @@
+# Production server: gunicorn managing uvicorn workers, each serving mfgProject.asgi with its own
+# event loop. Run with `gunicorn -c gunicorn.conf.py`, every setting can be overridden from the
+# environment.
+import multiprocessing
+import os
+
+wsgi_app = 'mfgProject.asgi:application'
+worker_class = 'uvicorn_worker.UvicornWorker'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Worker processes, each one holds its own database connections
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Read by the settings to split the database connections between the workers
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+# Workers silent for this long are restarted, recycling them bounds the memory they can grow to
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+# One line per request on stdout, an empty GUNICORN_ACCESS_LOG turns it off
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class ManufacturingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'manufacturing'
+
+    def ready(self):
+        from departments.models import Departments
+        from parts.models import Parts
+        from planes.models import BillOfMaterials, Planes
+        from .versions import catalog_changed
+
+        # Bump the catalog version, and with it the ETags of the read endpoints, whenever the catalog changes
+        for model in (Departments, Parts, Planes, BillOfMaterials):
+            post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_saved_{model.__name__}')
+            post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_deleted_{model.__name__}')
+        m2m_changed.connect(catalog_changed, sender=Planes.parts.through, dispatch_uid='catalog_m2m_changed')
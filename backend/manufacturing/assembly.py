@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from parts.inventory import fold_parts_inventory_deltas
+from parts.models import PartsInventory
+from parts.names import get_part_names
+from planes.bom import read_bill_of_materials
+from planes.inventory import increment_planes_inventory
+from planes.models import Planes
+from .ledger import record_movements
+from .models import AssemblyHistory, AssemblyUsedPart, InventoryMovement
+from .rollups import record_production
+from .versions import HISTORY, changed
+
+
+class AssemblyError(Exception):
+    """Raised when a plane cannot be assembled. Carries the HTTP status the view should answer with."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def assemble_plane(plane_id):
+    """Assembles one plane, see `assemble_planes`."""
+    plane, built, new_inventory, used_parts = assemble_planes(plane_id, 1)
+    return plane, new_inventory, used_parts
+
+
+def assemble_planes(plane_id, quantity, allow_partial=False):
+    """
+    Assembles `quantity` planes of one model as a single atomic unit.
+
+    The plane row is locked first so that assemblies of the same model are serialized, then the
+    inventory rows of the required parts are locked in (plane, part) order (to avoid deadlocks
+    with the other writers) and read once to compute how many planes can be built. All the parts
+    are decremented with one UPDATE, the plane inventory is upserted and the history rows and
+    their used parts are written with one bulk insert each and the daily rollups are upserted with
+    one statement, so the number of queries depends neither on the number of parts nor on the quantity.
+
+    When fewer than `quantity` planes can be built, nothing is assembled unless `allow_partial`
+    is set, in which case as many planes as the inventory allows are assembled.
+
+    Returns `(plane, built, new_inventory, used_parts)` where `used_parts` lists the parts used by
+    a single plane, a part appearing once per unit of its bill of materials quantity.
+    """
+    with transaction.atomic():
+        # Lock the plane row, this also checks that the plane exists
+        try:
+            plane = Planes.objects.select_for_update().get(id=plane_id)
+        except Planes.DoesNotExist:
+            raise AssemblyError('Plane not found.', 404)
+
+        # Read the plane's bill of materials under the lock, the cached one may predate a change made by another process
+        required_parts = read_bill_of_materials(plane.id)
+        if not required_parts:
+            raise AssemblyError(f"{plane.name} has no bill of materials.", 400)
+
+        # Fold the buffered part increments of the plane into its inventory rows
+        fold_parts_inventory_deltas(plane_id=plane.id, part_id__in=required_parts)
+
+        # Lock the inventory row of every required part, in (plane, part) order like the other writers
+        inventories = dict(PartsInventory.objects.select_for_update().filter(
+            plane_id=plane.id,
+            part_id__in=required_parts,
+        ).order_by('part_id').values_list('part_id', 'inventory'))
+
+        # Find how many planes can be built
+        feasible = min(max(inventories.get(part_id, 0), 0) // per_plane for part_id, per_plane in required_parts.items())
+
+        built = min(feasible, quantity) if allow_partial else quantity
+        if built < 1 or feasible < built:
+            missing_parts = [part_id for part_id, per_plane in required_parts.items() if inventories.get(part_id, 0) < per_plane * max(built, 1)]
+            # Retrieve the names of the insufficient parts from the cache, keeping the order of the plane's parts
+            names = get_part_names()
+            part_names = ', '.join(names.get(part_id, str(part_id)) for part_id in missing_parts)
+            if quantity == 1:
+                raise AssemblyError(f"There is no {part_names} to create {plane.name}.", 400)
+            raise AssemblyError(f"There is not enough {part_names} to create {quantity} {plane.name}.", 400)
+
+        # Decrement every required part at once
+        PartsInventory.objects.filter(
+            plane_id=plane.id,
+            part_id__in=required_parts,
+        ).update(inventory=F('inventory') - Case(
+            *[When(part_id=part_id, then=Value(per_plane * built)) for part_id, per_plane in required_parts.items()],
+            output_field=IntegerField(),
+        ))
+
+        used_parts = [part_id for part_id, per_plane in required_parts.items() for _ in range(per_plane)]
+
+        # Increment the plane's inventory
+        new_inventory = increment_planes_inventory(plane.id, built)
+
+        # Record the consumed parts and the assembled planes in the inventory ledger
+        record_movements(
+            [(plane.id, part_id, -per_plane * built, InventoryMovement.CONSUMED) for part_id, per_plane in required_parts.items()]
+            + [(plane.id, None, built, InventoryMovement.ASSEMBLED)]
+        )
+
+        # Record the assembly history, one row per plane
+        history = AssemblyHistory.objects.bulk_create([AssemblyHistory(plane=plane) for _ in range(built)])
+        AssemblyUsedPart.objects.bulk_create([
+            AssemblyUsedPart(history_id=record.id, part_id=part_id, quantity=per_plane)
+            for record in history
+            for part_id, per_plane in required_parts.items()
+        ])
+
+        # Add the assembly to the daily production rollups
+        record_production(history[0].date, plane.id, built, required_parts)
+        changed(HISTORY)
+
+    return plane, built, new_inventory, used_parts
@@ -0,0 +1,117 @@
+import abc
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from departments.capabilities import get_department_capabilities
+from departments.permissions import DepartmentPermission
+from parts.names import get_part_names
+from .versions import CATALOG, HISTORY, INVENTORY, current_versions, patch_revalidation, version_etag, versioned_reads
+from .views import AssembleHistoryView, PartManufacturerInfoView, PlaneManufacturerInfoView
+
+
+class AsyncReadView(View, metaclass=abc.ABCMeta):
+    """
+    Async version of the GET of the DRF `view_class`, served without blocking a worker when the
+    application runs under ASGI, see ASYNC_READ_VIEWS.
+
+    It authenticates and authorizes like `view_class`, with its authentication and department
+    permission classes, answers conditional requests from the version counters of `versions`
+    and reads from the replica when they allow it, like `conditional` does, and renders
+    `handle`'s data with DRF's JSON renderer. The endpoint is documented from `view_class`.
+    """
+    view_class = None
+    versions = ()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # drf_yasg documents the views having the DRF view they mirror as `cls`
+        view.cls = cls.view_class
+        view.initkwargs = {}
+        return view
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            user = await self.authenticate(request)
+            capabilities = await sync_to_async(get_department_capabilities)(user.department_id)
+            for permission in self.view_class.permission_classes:
+                if issubclass(permission, DepartmentPermission):
+                    permission.check(capabilities)
+        except exceptions.APIException as e:
+            response = self.render(e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}, e.status_code)
+            if isinstance(e, (exceptions.AuthenticationFailed, exceptions.NotAuthenticated)):
+                response.headers['WWW-Authenticate'] = self.view_class.authentication_classes[0]().authenticate_header(request)
+            return response
+
+        # Answer If-None-Match before running the view, see manufacturing.versions.conditional
+        versions = await sync_to_async(current_versions)(self.versions)
+        etag = quote_etag(version_etag(user, versions))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            with versioned_reads(self.versions, versions):
+                data, status_code = await self.handle(request, user, capabilities)
+            response = self.render(data, status_code)
+            response.headers.setdefault('ETag', etag)
+        patch_revalidation(response)
+        return response
+
+    async def authenticate(self, request):
+        # Tokens carrying claims are authenticated without a query, the others load the user
+        for authentication_class in self.view_class.authentication_classes:
+            result = await sync_to_async(authentication_class().authenticate)(request)
+            if result is not None:
+                return result[0]
+        raise exceptions.NotAuthenticated()
+
+    @staticmethod
+    def render(data, status_code):
+        # A DRF response rendered here, since no APIView negotiates and renders it
+        response = Response(data, status=status_code)
+        response.accepted_renderer = JSONRenderer()
+        response.accepted_media_type = JSONRenderer.media_type
+        response.renderer_context = {}
+        return response.render()
+
+    @abc.abstractmethod
+    async def handle(self, request, user, capabilities):
+        """Returns the response data of the authorized `request` and its status code."""
+
+
+class AsyncPlaneManufacturerInfoView(AsyncReadView):
+    view_class = PlaneManufacturerInfoView
+    versions = (CATALOG, INVENTORY)
+
+    async def handle(self, request, user, capabilities):
+        planes = [plane async for plane in PlaneManufacturerInfoView.planes_query()]
+        return PlaneManufacturerInfoView.response_data(planes, capabilities.name), status.HTTP_200_OK
+
+
+class AsyncPartManufacturerInfoView(AsyncReadView):
+    view_class = PartManufacturerInfoView
+    versions = (CATALOG, INVENTORY)
+
+    async def handle(self, request, user, capabilities):
+        cells = [cell async for cell in PartManufacturerInfoView.cells_query(capabilities.department_id)]
+        return PartManufacturerInfoView.response_data(capabilities, cells), status.HTTP_200_OK
+
+
+class AsyncAssembleHistoryView(AsyncReadView):
+    view_class = AssembleHistoryView
+    versions = (CATALOG, HISTORY)
+
+    async def handle(self, request, user, capabilities):
+        try:
+            assembly_history, limit = AssembleHistoryView.page_query(request.GET)
+        except ValueError as e:
+            return {'status': False, 'error': str(e)}, status.HTTP_400_BAD_REQUEST
+
+        page = [history async for history in assembly_history[:limit + 1]]
+        used_parts = [row async for row in AssembleHistoryView.used_parts_query(page[:limit])]
+        part_names = await sync_to_async(get_part_names)()
+        return AssembleHistoryView.page_data(page, limit, used_parts, part_names), status.HTTP_200_OK
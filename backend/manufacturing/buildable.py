@@ -0,0 +1,207 @@
+import numpy as np
+
+from parts.models import PartsInventory, PartsInventoryDelta
+from planes.bom import get_bills_of_materials
+
+
+class InventoryMatrix:
+    """
+    Sparse plane x part view of the bills of materials and the parts inventory.
+
+    Every bill of materials entry is one cell of the matrix: `rows`/`cols` are indexes into
+    `plane_ids`/`part_ids`, `required` is how many units of the part one plane needs and `stock`
+    is how many units of that part are in the inventory for that plane. The cells are sorted by
+    plane, the cells of plane `i` start at `starts[i]`.
+    """
+
+    def __init__(self, bom_entries, inventory_entries):
+        bom = np.asarray(bom_entries, dtype=np.int64).reshape(-1, 3)
+        inventory = np.asarray(inventory_entries, dtype=np.int64).reshape(-1, 3)
+        bom = bom[np.argsort(bom[:, 0], kind='stable')]
+
+        # Index the planes by their bill of materials, the parts by both tables
+        self.plane_ids, self.rows = np.unique(bom[:, 0], return_inverse=True)
+        self.part_ids, part_index = np.unique(np.concatenate([bom[:, 1], inventory[:, 1]]), return_inverse=True)
+        self.cols = part_index[:len(bom)]
+        self.required = bom[:, 2]
+        self.starts = np.searchsorted(self.rows, np.arange(len(self.plane_ids)))
+
+        # Inventory of planes without a bill of materials can never be used
+        inventory_rows = np.searchsorted(self.plane_ids, inventory[:, 0])
+        known = inventory_rows < len(self.plane_ids)
+        known[known] = self.plane_ids[inventory_rows[known]] == inventory[known, 0]
+
+        # Match the inventory to the bill of materials cells through their (plane, part) keys
+        bom_keys = self.rows * len(self.part_ids) + self.cols
+        inventory_keys = inventory_rows[known] * len(self.part_ids) + part_index[len(bom):][known]
+        keys, key_index = np.unique(np.concatenate([bom_keys, inventory_keys]), return_inverse=True)
+        stock_by_key = np.bincount(key_index[len(bom):], weights=np.clip(inventory[known, 2], 0, None), minlength=len(keys))
+        self.stock = stock_by_key[key_index[:len(bom)]].astype(np.int64)
+
+    @classmethod
+    def from_database(cls):
+        """Builds the matrix from the cached bills of materials and one inventory query, pending deltas included."""
+        bom_entries = [
+            (plane_id, part_id, quantity)
+            for plane_id, parts in get_bills_of_materials().items()
+            for part_id, quantity in parts.items()
+        ]
+        # The matrix sums the entries of the same (plane, part) pair
+        inventory_entries = list(
+            PartsInventory.objects.values_list('plane_id', 'part_id', 'inventory').union(
+                PartsInventoryDelta.objects.values_list('plane_id', 'part_id', 'delta'), all=True,
+            )
+        )
+        return cls(bom_entries, inventory_entries)
+
+
+def max_buildable(matrix):
+    """
+    Returns how many planes of every model can be built from the parts stocked for that model,
+    and the part limiting each model, as two arrays aligned with `matrix.plane_ids`.
+    """
+    if not len(matrix.plane_ids):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    buildable_per_part = matrix.stock // matrix.required
+    counts = np.minimum.reduceat(buildable_per_part, matrix.starts)
+
+    # The first cell of every plane allowing no more than its count is its bottleneck
+    bottlenecks = np.flatnonzero(buildable_per_part == counts[matrix.rows])
+    bottlenecks = bottlenecks[np.r_[True, matrix.rows[bottlenecks][1:] != matrix.rows[bottlenecks][:-1]]]
+
+    return counts, matrix.part_ids[matrix.cols[bottlenecks]]
+
+
+# Level of the parts no unfrozen model uses any more
+UNBOUNDED = np.iinfo(np.int64).max
+
+
+def _segment_starts(keys):
+    """Returns where every run of equal values of the sorted `keys` starts."""
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def _serve_in_order(candidates, rows, cols, required, available):
+    """
+    Returns which `candidates` models get one more plane when every part serves them in plane id
+    order with its `available` units. The cells `rows`/`cols`/`required` must be sorted by part
+    then plane.
+
+    A part counts every candidate still undecided before a model, so what is served always fits.
+    A model that does not fit even after the ones served before it alone is refused, the others
+    are tried again.
+    """
+    candidates = candidates.copy()
+    served = np.zeros_like(candidates)
+    available = available.copy()
+    cells = candidates[rows]
+    rows, cols, required = rows[cells], cols[cells], required[cells]
+    while True:
+        candidates[rows[available[cols] < required]] = False
+        cells = candidates[rows]
+        rows, cols, required = rows[cells], cols[cells], required[cells]
+        if not len(rows):
+            return served
+        starts = _segment_starts(cols)
+        sizes = np.diff(np.r_[starts, len(rows)])
+
+        # Units used before every cell of a part by the undecided models, then by the served ones
+        before = np.cumsum(required) - required
+        before -= np.repeat(before[starts], sizes)
+        granted = candidates.copy()
+        granted[rows[before + required > available[cols]]] = False
+        used = granted[rows] * required
+        before = np.cumsum(used) - used
+        before -= np.repeat(before[starts], sizes)
+        candidates[rows[before + required > available[cols]]] = False
+
+        served |= granted
+        candidates &= ~granted
+        available -= np.bincount(cols, weights=used, minlength=len(available)).astype(np.int64)
+
+
+def joint_allocation(matrix):
+    """
+    Allocates a shared pool of parts between every plane model.
+
+    The stock of a part is pooled across all the models, so models needing the same part compete
+    for it. The allocation is max-min fair (progressive filling): every model is raised by the same
+    number of planes until one of its parts cannot give one more plane to all the models using it,
+    or it reaches what it could build alone. Such a part gives its last planes to its models in
+    plane id order, the ones served keep rising. Returns the number of planes allocated to every
+    model, aligned with `matrix.plane_ids`.
+
+    Instead of raising the models plane by plane, every round computes the level each part would
+    run out at if all its unfrozen models kept rising together. These levels can only be too low,
+    but a part's level is right once none of its models stops lower on another part or at its cap,
+    and the lowest level always is. Every round stops the models of the parts whose level is right
+    and the models reaching their cap first, so the number of rounds is the length of the chains
+    of parts limiting each other rather than the number of planes or parts. Catalogs where few
+    models share a part take a handful of rounds. When every part is shared by dozens of models
+    the chains grow with the catalog: a few thousand models is the supported size for an answer
+    within a request, see `benchmark_buildable`.
+    """
+    plane_count = len(matrix.plane_ids)
+    allocation = np.zeros(plane_count, dtype=np.int64)
+    if not plane_count:
+        return allocation
+
+    part_count = len(matrix.part_ids)
+    pool = np.bincount(matrix.cols, weights=matrix.stock, minlength=part_count).astype(np.int64)
+    remaining = pool.copy()
+
+    # What every model could build on its own from the whole pool
+    caps = np.minimum.reduceat(pool[matrix.cols] // matrix.required, matrix.starts)
+
+    # The cells of the unfrozen models by plane, and by part then plane. Dropping the cells of the
+    # frozen models keeps both sorted, every round only works on the models still rising.
+    by_part = np.argsort(matrix.cols, kind='stable')
+    rows, cols, required = matrix.rows, matrix.cols, matrix.required
+    part_rows, part_cols, part_required = rows[by_part], cols[by_part], required[by_part]
+    keep, part_keep = caps[rows] > 0, caps[part_rows] > 0
+    while True:
+        rows, cols, required = rows[keep], cols[keep], required[keep]
+        part_rows, part_cols, part_required = part_rows[part_keep], part_cols[part_keep], part_required[part_keep]
+        if not len(rows):
+            break
+
+        # Every part runs out when its stock is shared by all the models still using it
+        rate = np.bincount(cols, weights=required, minlength=part_count).astype(np.int64)
+        used = rate > 0
+        levels = np.full(part_count, UNBOUNDED)
+        levels[used] = remaining[used] // rate[used]
+
+        # A model stops at the lowest level of its parts or at its cap
+        model_starts = _segment_starts(rows)
+        models = rows[model_starts]
+        stops = np.full(plane_count, UNBOUNDED)
+        stops[models] = np.minimum(caps[models], np.minimum.reduceat(levels[cols], model_starts))
+
+        # The level of a part is right when none of its models stops lower
+        part_starts = _segment_starts(part_cols)
+        lowest = np.full(part_count, UNBOUNDED)
+        lowest[part_cols[part_starts]] = np.minimum.reduceat(stops[part_rows], part_starts)
+        settled = used & (lowest >= levels)
+
+        # The models of those parts stop there, but for the ones the parts can give one more plane
+        capped = np.zeros(plane_count, dtype=bool)
+        capped[models] = caps[models] <= stops[models]
+        cells = settled[part_cols]
+        stopping = np.zeros(plane_count, dtype=bool)
+        stopping[part_rows[cells]] = True
+        left = remaining - rate * np.where(settled, levels, 0)
+        served = _serve_in_order(stopping & ~capped, part_rows[cells], part_cols[cells], part_required[cells], left)
+
+        frozen = capped | (stopping & ~served)
+        allocation[frozen] = stops[frozen]
+        keep, part_keep = ~frozen[rows], ~frozen[part_rows]
+        remaining -= np.bincount(cols[~keep], weights=allocation[rows[~keep]] * required[~keep], minlength=part_count).astype(np.int64)
+
+    # Serving the models in plane id order can leave a part with units another model could use
+    while True:
+        served = _serve_in_order(allocation < caps, matrix.rows[by_part], matrix.cols[by_part], matrix.required[by_part], remaining)
+        if not served.any():
+            return allocation
+        allocation += served
+        remaining -= np.bincount(matrix.cols, weights=served[matrix.rows] * matrix.required, minlength=part_count).astype(np.int64)
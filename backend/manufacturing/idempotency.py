@@ -0,0 +1,80 @@
+import functools
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+
+idempotency_key_parameter = openapi.Parameter(
+    IDEMPOTENCY_KEY_HEADER,
+    openapi.IN_HEADER,
+    description="Optional client generated key. Retrying with the same key replays the first response instead of changing the inventory again.",
+    type=openapi.TYPE_STRING,
+    required=False
+)
+
+
+def replay(record, endpoint):
+    if record.endpoint != endpoint:
+        return Response({'status': False, 'error': f'{IDEMPOTENCY_KEY_HEADER} was already used for another request.'}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if record.status_code is None:
+        return Response({'status': False, 'error': 'A request with this idempotency key is still in progress.'}, status=status.HTTP_409_CONFLICT)
+    return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """
+    Makes a view method safe to retry with an `Idempotency-Key` header.
+
+    The first request with a key runs the view and stores its response, any later request from the
+    same user with the same key gets that response back without running the view again. A replay
+    costs one lookup on the (user, key) unique index. The key row is inserted in the same
+    transaction as the view's changes, so a concurrent retry waits on the unique index until the
+    first request commits and then replays it. Server errors are not stored, those requests roll
+    back and can be retried. Keys expire after IDEMPOTENCY_KEY_TTL and are removed by the
+    `prune_idempotency_keys` command.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'status': False, 'error': f'{IDEMPOTENCY_KEY_HEADER} must be at most 255 characters.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        endpoint = f'{request.method} {request.path}'[:100]
+        try:
+            record = IdempotencyKey.objects.get(user_id=request.user.id, key=key)
+        except IdempotencyKey.DoesNotExist:
+            pass
+        else:
+            if record.created_at >= timezone.now() - settings.IDEMPOTENCY_KEY_TTL:
+                return replay(record, endpoint)
+            record.delete()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(user_id=request.user.id, key=key, endpoint=endpoint)
+            except IntegrityError:
+                # A concurrent request with the same key committed first
+                return replay(IdempotencyKey.objects.get(user_id=request.user.id, key=key), endpoint)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=['status_code', 'response'])
+
+        return response
+
+    return wrapper
@@ -0,0 +1,101 @@
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import InventoryMovement, InventorySnapshot
+from .versions import INVENTORY, changed
+
+
+def movements_cte(name, movements, reason):
+    """
+    Returns `(sql, params)` of a data-modifying WITH query appending `movements`, given as
+    `{(plane_id, part_id): quantity}`, to the ledger. Prepended to an inventory upsert it records
+    the movements atomically with it, without an extra round trip.
+    """
+    table = connection.ops.quote_name(InventoryMovement._meta.db_table)
+    created_at = timezone.now()
+    values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(movements))
+    params = [
+        value
+        for (plane_id, part_id), quantity in sorted(movements.items())
+        for value in (plane_id, part_id, quantity, reason, created_at)
+    ]
+    return f'{name} AS (INSERT INTO {table} (plane_id, part_id, quantity, reason, created_at) VALUES {values})', params
+
+
+def record_movements(movements):
+    """Appends `movements`, given as `(plane_id, part_id, quantity, reason)` tuples, to the ledger with one insert."""
+    changed(INVENTORY)
+    created_at = timezone.now()
+    InventoryMovement.objects.bulk_create([
+        InventoryMovement(plane_id=plane_id, part_id=part_id, quantity=quantity, reason=reason, created_at=created_at)
+        for plane_id, part_id, quantity, reason in movements
+    ])
+
+
+def stock_at(plane_id, part_id, at):
+    """
+    Returns the inventory of a part for a plane, or of the plane itself when `part_id` is None,
+    at the moment `at`.
+
+    Costs one index lookup for the latest snapshot taken at or before `at` and one index range
+    scan over the movements between that snapshot and `at`, which `compact_inventory_ledger`
+    keeps short. Movements pruned by the compaction are only visible through their snapshots.
+    """
+    snapshot = InventorySnapshot.objects.filter(plane_id=plane_id, part_id=part_id, taken_at__lte=at) \
+        .order_by('-taken_at').values_list('taken_at', 'inventory').first()
+
+    movements = InventoryMovement.objects.filter(plane_id=plane_id, part_id=part_id, created_at__lte=at)
+    inventory = 0
+    if snapshot is not None:
+        taken_at, inventory = snapshot
+        movements = movements.filter(created_at__gt=taken_at)
+
+    return inventory + (movements.aggregate(total=Sum('quantity'))['total'] or 0)
+
+
+def compact_ledger(until, prune_before=None, batch_size=10000):
+    """
+    Snapshots, at `until`, every (plane, part) pair that moved since the previous compaction.
+
+    The new snapshot of a pair is its previous snapshot plus its movements in between, so only
+    the movements since the previous compaction are read. With `prune_before`, the movements up
+    to that moment, which the snapshots now cover, are deleted in batches of `batch_size`.
+    Returns `(snapshots, pruned)`.
+    """
+    movement_table = connection.ops.quote_name(InventoryMovement._meta.db_table)
+    snapshot_table = connection.ops.quote_name(InventorySnapshot._meta.db_table)
+
+    snapshots = 0
+    with transaction.atomic():
+        # Compactions are serialized, each one starts from what the previous one wrote
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {snapshot_table} IN SHARE ROW EXCLUSIVE MODE')
+
+        since = InventorySnapshot.objects.aggregate(since=Max('taken_at'))['since']
+        if since is None or since < until:
+            moved_condition, params = ('created_at > %s AND ', [since]) if since is not None else ('', [])
+            # Part and plane inventories are snapshotted separately so that the previous snapshot is an index lookup
+            for pair_condition, moved_part in (('latest.part_id = moved.part_id', 'IS NOT NULL'), ('latest.part_id IS NULL', 'IS NULL')):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'WITH moved AS (SELECT plane_id, part_id, SUM(quantity) AS quantity FROM {movement_table} '
+                        f'WHERE {moved_condition}created_at <= %s AND part_id {moved_part} GROUP BY plane_id, part_id) '
+                        f'INSERT INTO {snapshot_table} (plane_id, part_id, inventory, taken_at) '
+                        f'SELECT moved.plane_id, moved.part_id, moved.quantity + COALESCE(('
+                        f'SELECT latest.inventory FROM {snapshot_table} latest WHERE latest.plane_id = moved.plane_id '
+                        f'AND {pair_condition} ORDER BY latest.taken_at DESC LIMIT 1), 0), %s FROM moved',
+                        params + [until, until],
+                    )
+                    snapshots += cursor.rowcount
+
+    pruned = 0
+    if prune_before is not None:
+        cutoff = min(prune_before, until)
+        while True:
+            # Delete in batches to keep every statement short
+            ids = list(InventoryMovement.objects.filter(created_at__lte=cutoff).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            pruned += InventoryMovement.objects.filter(id__in=ids).delete()[0]
+    return snapshots, pruned
@@ -0,0 +1,58 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from manufacturing.partitions import add_months, archive_history_partition, create_history_partitions, history_partitions, \
+    restore_history_partition
+
+
+def month(value):
+    return date.fromisoformat(f'{value}-01')
+
+
+class Command(BaseCommand):
+    help = "Maintains the monthly partitions of the assembly history. `create` adds the partitions of the coming months and " \
+           "is meant to run daily from cron. `archive` moves the months before a given one to compressed files, `restore` " \
+           "loads an archived month back. `list` shows the attached months."
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['create', 'archive', 'restore', 'list'])
+        parser.add_argument('--months-ahead', type=int, default=settings.ASSEMBLY_HISTORY_PARTITIONS_AHEAD,
+                            help='create: partitions kept after the current month.')
+        parser.add_argument('--before', type=month, default=None,
+                            help='archive: archive every month before this one (YYYY-MM).')
+        parser.add_argument('--month', type=month, default=None, help='restore: the month to restore (YYYY-MM).')
+        parser.add_argument('--directory', default=settings.ASSEMBLY_HISTORY_ARCHIVE_DIR,
+                            help='archive and restore: directory of the archive files.')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        current = date.today().replace(day=1)
+
+        if action == 'list':
+            for partition in history_partitions():
+                self.stdout.write(f"{partition:%Y-%m}")
+
+        elif action == 'create':
+            created = create_history_partitions(current, add_months(current, options['months_ahead']))
+            self.stdout.write(f"Created {len(created)} partitions.")
+
+        elif action == 'archive':
+            if options['before'] is None:
+                raise CommandError("archive needs --before.")
+            if options['before'] > current:
+                raise CommandError("Only past months can be archived.")
+            for partition in history_partitions():
+                if partition < options['before']:
+                    history, used_parts = archive_history_partition(partition, options['directory'])
+                    self.stdout.write(f"Archived {partition:%Y-%m}: {history} assemblies, {used_parts} used parts.")
+
+        elif action == 'restore':
+            if options['month'] is None:
+                raise CommandError("restore needs --month.")
+            try:
+                history, used_parts = restore_history_partition(options['month'], options['directory'])
+            except ValueError as error:
+                raise CommandError(str(error))
+            self.stdout.write(f"Restored {options['month']:%Y-%m}: {history} assemblies, {used_parts} used parts.")
@@ -0,0 +1,75 @@
+import logging
+import multiprocessing
+import multiprocessing.connection
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from manufacturing.orders import process_next_order
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Drains the assembly order queue. Several worker processes can run side by side, on one or more machines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes to start.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit as soon as the queue is empty.')
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            processed = self.work(options['poll_interval'], options['once'])
+            self.stdout.write(f"Processed {processed} assembly orders.")
+            return
+
+        # Every process opens its own database connection
+        connections.close_all()
+        workers = [self.start_worker(options['poll_interval'], options['once']) for _ in range(options['processes'])]
+        try:
+            while workers:
+                multiprocessing.connection.wait([worker.sentinel for worker in workers])
+                for worker in [worker for worker in workers if not worker.is_alive()]:
+                    workers.remove(worker)
+                    # A worker that crashed is replaced, unless the queue is only drained once
+                    if worker.exitcode != 0 and not options['once']:
+                        self.stderr.write(f"Assembly worker {worker.pid} exited with code {worker.exitcode}, restarting it.")
+                        time.sleep(options['poll_interval'])
+                        workers.append(self.start_worker(options['poll_interval'], options['once']))
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+
+    def start_worker(self, poll_interval, once):
+        worker = multiprocessing.Process(target=self.work_in_process, args=(poll_interval, once), daemon=True)
+        worker.start()
+        return worker
+
+    def work(self, poll_interval, once):
+        processed = 0
+        try:
+            while True:
+                try:
+                    found = process_next_order()
+                except DatabaseError:
+                    # The order could not even be marked for a retry, e.g. the connection was lost
+                    logger.exception('Assembly worker failed to process an order')
+                    connections.close_all()
+                    found = False
+                if found:
+                    processed += 1
+                elif once:
+                    break
+                else:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        return processed
+
+    def work_in_process(self, poll_interval, once):
+        try:
+            self.work(poll_interval, once)
+        finally:
+            connections.close_all()
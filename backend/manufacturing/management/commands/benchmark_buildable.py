@@ -0,0 +1,40 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from manufacturing.buildable import InventoryMatrix, joint_allocation, max_buildable
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the buildable planes solver on a synthetic catalog. Does not touch the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--planes', type=int, default=5000, help='Number of plane models.')
+        parser.add_argument('--parts', type=int, default=2000, help='Number of parts.')
+        parser.add_argument('--parts-per-plane', type=int, default=20, help='Bill of materials size of every plane.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per solver, the best run is reported.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        planes, parts, per_plane = options['planes'], options['parts'], min(options['parts_per_plane'], options['parts'])
+
+        # Random bills of materials and a stock for every (plane, part) cell
+        plane_ids = np.repeat(np.arange(1, planes + 1), per_plane)
+        part_ids = np.concatenate([rng.choice(parts, per_plane, replace=False) + 1 for _ in range(planes)])
+        bom = np.column_stack([plane_ids, part_ids, rng.integers(1, 4, len(plane_ids))])
+        inventory = np.column_stack([plane_ids, part_ids, rng.integers(0, 500, len(plane_ids))])
+
+        self.report('build matrix', options['repeat'], lambda: InventoryMatrix(bom, inventory))
+        matrix = InventoryMatrix(bom, inventory)
+        self.report('max buildable', options['repeat'], lambda: max_buildable(matrix))
+        self.report('joint allocation', options['repeat'], lambda: joint_allocation(matrix))
+
+    def report(self, label, repeat, solver):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            solver()
+            timings.append(time.perf_counter() - start)
+        self.stdout.write(f"{label:>18}: best {min(timings) * 1000:.2f} ms, mean {sum(timings) / len(timings) * 1000:.2f} ms")
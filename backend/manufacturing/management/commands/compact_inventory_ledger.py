@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from manufacturing.ledger import compact_ledger
+
+
+class Command(BaseCommand):
+    help = "Folds the inventory movements since the previous run into snapshots and prunes old movements. " \
+           "Meant to run periodically, e.g. hourly from cron: point-in-time stock reads at most one period of movements."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--settle-seconds', type=int, default=60,
+                            help='Only movements older than this are compacted, so that transactions still in flight are not missed.')
+        parser.add_argument('--keep-days', type=int, default=None,
+                            help='Delete the movements older than this many days. By default movements are kept.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows deleted per statement.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        until = now - timedelta(seconds=options['settle_seconds'])
+        prune_before = now - timedelta(days=options['keep_days']) if options['keep_days'] is not None else None
+
+        snapshots, pruned = compact_ledger(until, prune_before, options['batch_size'])
+        self.stdout.write(f"Took {snapshots} snapshots and deleted {pruned} movements.")
@@ -0,0 +1,85 @@
+import http.client
+import itertools
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ['/plane/list', '/plane/assemble-history', '/department/list']
+
+
+class Command(BaseCommand):
+    help = "Sends concurrent GET requests to a running server and reports its throughput and latency, e.g. to compare " \
+           "`runserver` with `gunicorn -c gunicorn.conf.py`. Every client thread keeps its connection open."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server.')
+        parser.add_argument('--path', action='append', dest='paths', default=None,
+                            help=f"Path to request, repeat for several, requested in turn. Defaults to {', '.join(DEFAULT_PATHS)}, "
+                                 f"which need a user of the Assembly Team.")
+        parser.add_argument('--username', help='User logged in through personnel/login/ to get a token.')
+        parser.add_argument('--password', help='Password of --username.')
+        parser.add_argument('--token', help='Access token to use instead of logging in.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at any time.')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests sent in total.')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        paths = options['paths'] or DEFAULT_PATHS
+        token = options['token'] or self.login(url, options['username'], options['password'])
+        headers = {'Authorization': f'Bearer {token}'}
+
+        counter = itertools.count()
+        latencies, statuses, lock = [], {}, threading.Lock()
+
+        def client():
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+            while (number := next(counter)) < options['requests']:
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', paths[number % len(paths)], headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    status = 'error'
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[status] = statuses.get(status, 0) + 1
+            connection.close()
+
+        threads = [threading.Thread(target=client) for _ in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(f"{len(latencies)} requests in {elapsed:.2f}s with {options['concurrency']} concurrent clients: "
+                          f"{len(latencies) / elapsed:.1f} requests/s")
+        self.stdout.write(f"Latency p50 {percentile(0.5):.1f}ms, p95 {percentile(0.95):.1f}ms, p99 {percentile(0.99):.1f}ms, "
+                          f"max {latencies[-1] * 1000:.1f}ms")
+        self.stdout.write(f"Statuses: {', '.join(f'{status}: {count}' for status, count in sorted(statuses.items(), key=str))}")
+
+    def login(self, url, username, password):
+        if not username or not password:
+            raise CommandError('Pass --token, or --username and --password.')
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+        connection.request('POST', '/personnel/login/', body=json.dumps({'username': username, 'password': password}),
+                           headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        body = response.read()
+        connection.close()
+        if response.status != 200:
+            raise CommandError(f'Login failed with status {response.status}.')
+        return json.loads(body)['access']
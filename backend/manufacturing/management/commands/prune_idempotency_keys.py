@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from manufacturing.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Deletes the idempotency keys older than IDEMPOTENCY_KEY_TTL. Meant to run periodically, e.g. from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows deleted per statement.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        deleted = 0
+        while True:
+            # Delete in batches to keep every statement short
+            ids = list(IdempotencyKey.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(f"Deleted {deleted} expired idempotency keys.")
@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from manufacturing.models import AssemblyHistory
+from manufacturing.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the daily production rollups from the assembly history. Assemblies keep the rollups up to date, " \
+           "run this once after deploying them to catch up on the existing history, or to repair a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=date.fromisoformat, default=None,
+                            help='First day to rebuild (YYYY-MM-DD). Defaults to the first assembly. '
+                                 'Leave out archived months, their history is not in the database anymore.')
+        parser.add_argument('--date-to', type=date.fromisoformat, default=None,
+                            help='Last day to rebuild (YYYY-MM-DD). Defaults to the last assembly.')
+        parser.add_argument('--days', type=int, default=31,
+                            help='Days rebuilt per transaction, the assemblies wait for each one to commit.')
+
+    def handle(self, *args, **options):
+        bounds = AssemblyHistory.objects.aggregate(first=Min('date'), last=Max('date'))
+        date_from = options['date_from'] or bounds['first']
+        date_to = options['date_to'] or bounds['last']
+        if date_from is None or date_to is None:
+            self.stdout.write("There is no assembly history to roll up.")
+            return
+
+        production = consumption = 0
+        while date_from <= date_to:
+            chunk_to = min(date_from + timedelta(days=options['days'] - 1), date_to)
+            chunk_production, chunk_consumption = rebuild_rollups(date_from, chunk_to)
+            production += chunk_production
+            consumption += chunk_consumption
+            date_from = chunk_to + timedelta(days=1)
+
+        self.stdout.write(f"Wrote {production} daily production and {consumption} daily consumption rows.")
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planes', '0006_remove_planes_required_parts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('manufacturing', '0002_rename_plane_id_assemblyhistory_plane'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssemblyOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('allow_partial', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('built', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('plane', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='planes.planes')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='assembly_order_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0006_drop_redundant_plane_indexes'),
+        ('planes', '0008_planesinventory_unique_plane_and_indexes'),
+        ('manufacturing', '0004_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inventory', models.IntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('part', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='parts.parts')),
+                ('plane', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='planes.planes')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['plane', 'part', 'taken_at'], name='inventory_snapshot_pair_idx'), models.Index(fields=['taken_at'], name='inventory_snapshot_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('reason', models.CharField(choices=[('manufactured', 'Manufactured'), ('recycled', 'Recycled'), ('consumed', 'Consumed by an assembly'), ('assembled', 'Assembled')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('part', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='parts.parts')),
+                ('plane', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='planes.planes')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['plane', 'part', 'created_at'], name='inventory_movement_pair_idx'), models.Index(fields=['created_at'], name='inventory_movement_date_idx')],
+            },
+        ),
+    ]
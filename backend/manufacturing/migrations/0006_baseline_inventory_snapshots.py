@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:40
+
+from django.db import migrations
+from django.db.models import Sum
+from django.utils import timezone
+
+
+def take_baseline_snapshots(apps, schema_editor):
+    InventorySnapshot = apps.get_model('manufacturing', 'InventorySnapshot')
+    PartsInventory = apps.get_model('parts', 'PartsInventory')
+    PartsInventoryDelta = apps.get_model('parts', 'PartsInventoryDelta')
+    PlanesInventory = apps.get_model('planes', 'PlanesInventory')
+
+    # The ledger starts from the current inventory, buffered increments included
+    taken_at = timezone.now()
+    stock = {}
+    for plane_id, part_id, inventory in PartsInventory.objects.values_list('plane_id', 'part_id', 'inventory').iterator():
+        stock[(plane_id, part_id)] = inventory
+    pending = PartsInventoryDelta.objects.values('plane_id', 'part_id').annotate(total=Sum('delta'))
+    for delta in pending.iterator():
+        key = (delta['plane_id'], delta['part_id'])
+        stock[key] = stock.get(key, 0) + delta['total']
+    for plane_id, inventory in PlanesInventory.objects.values_list('plane_id', 'inventory').iterator():
+        stock[(plane_id, None)] = inventory
+
+    InventorySnapshot.objects.bulk_create([
+        InventorySnapshot(plane_id=plane_id, part_id=part_id, inventory=inventory, taken_at=taken_at)
+        for (plane_id, part_id), inventory in stock.items()
+    ], batch_size=5000)
+
+
+def remove_snapshots(apps, schema_editor):
+    apps.get_model('manufacturing', 'InventorySnapshot').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manufacturing', '0005_inventory_ledger'),
+        ('parts', '0006_drop_redundant_plane_indexes'),
+        ('planes', '0008_planesinventory_unique_plane_and_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(take_baseline_snapshots, remove_snapshots),
+    ]
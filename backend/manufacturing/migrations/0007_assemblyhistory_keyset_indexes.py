@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planes', '0008_planesinventory_unique_plane_and_indexes'),
+        ('manufacturing', '0006_baseline_inventory_snapshots'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assemblyhistory',
+            name='plane',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='planes.planes'),
+        ),
+        migrations.AddIndex(
+            model_name='assemblyhistory',
+            index=models.Index(fields=['date', 'id'], name='assembly_history_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assemblyhistory',
+            index=models.Index(fields=['plane', 'date', 'id'], name='assembly_history_plane_idx'),
+        ),
+    ]
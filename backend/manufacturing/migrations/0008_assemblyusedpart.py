@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0006_drop_redundant_plane_indexes'),
+        ('manufacturing', '0007_assemblyhistory_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssemblyUsedPart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('history', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='parts_used', to='manufacturing.assemblyhistory')),
+                ('part', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='parts.parts')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['part', 'history'], name='assembly_used_part_part_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='assemblyusedpart',
+            constraint=models.UniqueConstraint(fields=('history', 'part'), name='unique_assembly_used_part'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:05
+
+import ast
+from collections import Counter
+
+from django.db import migrations, transaction
+
+# History rows backfilled per transaction, so that no lock is held for long
+CHUNK_SIZE = 5000
+
+
+def used_parts_to_rows(apps, schema_editor):
+    AssemblyHistory = apps.get_model('manufacturing', 'AssemblyHistory')
+    AssemblyUsedPart = apps.get_model('manufacturing', 'AssemblyUsedPart')
+    Parts = apps.get_model('parts', 'Parts')
+
+    part_ids = set(Parts.objects.values_list('id', flat=True))
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(AssemblyHistory.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'used_parts')[:CHUNK_SIZE])
+            if not chunk:
+                break
+            rows = []
+            for history_id, used_parts in chunk:
+                # used_parts is a string like "[1, 2, 3, 4]", a repeated part means more than one unit
+                try:
+                    parsed = ast.literal_eval(used_parts)
+                except (ValueError, SyntaxError):
+                    continue
+                if isinstance(parsed, int):
+                    parsed = (parsed,)
+                for part_id, quantity in Counter(parsed).items():
+                    if part_id in part_ids:
+                        rows.append(AssemblyUsedPart(history_id=history_id, part_id=part_id, quantity=quantity))
+            # Rows already backfilled by an interrupted run are skipped
+            AssemblyUsedPart.objects.bulk_create(rows, ignore_conflicts=True)
+        last_id = chunk[-1][0]
+
+
+def rows_to_used_parts(apps, schema_editor):
+    AssemblyHistory = apps.get_model('manufacturing', 'AssemblyHistory')
+    AssemblyUsedPart = apps.get_model('manufacturing', 'AssemblyUsedPart')
+
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(AssemblyHistory.objects.filter(id__gt=last_id).order_by('id')[:CHUNK_SIZE])
+            if not chunk:
+                break
+            used_parts = {}
+            rows = AssemblyUsedPart.objects.filter(history_id__in=[history.id for history in chunk]) \
+                .order_by('history_id', 'part_id').values_list('history_id', 'part_id', 'quantity')
+            for history_id, part_id, quantity in rows:
+                used_parts.setdefault(history_id, []).extend([part_id] * quantity)
+            for history in chunk:
+                history.used_parts = str(used_parts.get(history.id, []))
+            AssemblyHistory.objects.bulk_update(chunk, ['used_parts'])
+        last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+    # Every chunk commits on its own
+    atomic = False
+
+    dependencies = [
+        ('manufacturing', '0008_assemblyusedpart'),
+    ]
+
+    operations = [
+        migrations.RunPython(used_parts_to_rows, rows_to_used_parts),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manufacturing', '0009_populate_assemblyusedpart'),
+    ]
+
+    operations = [
+        # Give the column a default first so that reversing this migration can add it back
+        migrations.AlterField(
+            model_name='assemblyhistory',
+            name='used_parts',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='assemblyhistory',
+            name='used_parts',
+        ),
+    ]
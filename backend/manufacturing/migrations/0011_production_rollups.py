@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('departments', '0001_initial'),
+        ('planes', '0008_planesinventory_unique_plane_and_indexes'),
+        ('manufacturing', '0010_remove_assemblyhistory_used_parts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPlaneProduction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('built', models.PositiveIntegerField(default=0)),
+                ('plane', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='planes.planes')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyPartConsumption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='departments.departments')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailyplaneproduction',
+            constraint=models.UniqueConstraint(fields=('date', 'plane'), name='unique_daily_plane_production'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailypartconsumption',
+            constraint=models.UniqueConstraint(fields=('date', 'department'), name='unique_daily_part_consumption'),
+        ),
+    ]
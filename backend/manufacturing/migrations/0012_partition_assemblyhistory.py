@@ -0,0 +1,100 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:21
+
+from datetime import date
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+TABLE = 'manufacturing_assemblyhistory'
+# Months of partitions created after the current one, later ones come from `assembly_history_partitions create`
+MONTHS_AHEAD = 3
+INDEXES = [
+    ('assembly_history_date_idx', 'date, id'),
+    ('assembly_history_plane_idx', 'plane_id, date, id'),
+]
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_indexes(schema_editor):
+    # Runs the deferred foreign key checks of the copied rows, an index cannot be built while they are pending
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    for name, columns in INDEXES:
+        schema_editor.execute(f'CREATE INDEX {name} ON {TABLE} ({columns})')
+
+
+def reset_identity(schema_editor):
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {TABLE}"
+    )
+
+
+def partition_by_month(apps, schema_editor):
+    # The rows are copied into a new partitioned table, which must have the partition key in its primary key
+    schema_editor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned')
+    schema_editor.execute(f'ALTER INDEX {TABLE}_pkey RENAME TO {TABLE}_unpartitioned_pkey')
+    schema_editor.execute(f'DROP INDEX {", ".join(name for name, _ in INDEXES)}')
+    schema_editor.execute(
+        f'CREATE TABLE {TABLE} ('
+        f'id bigint GENERATED BY DEFAULT AS IDENTITY, '
+        f'date date NOT NULL, '
+        f'plane_id bigint NOT NULL REFERENCES planes_planes (id) DEFERRABLE INITIALLY DEFERRED, '
+        f'PRIMARY KEY (id, date)'
+        f') PARTITION BY RANGE (date)'
+    )
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(date) FROM {TABLE}_unpartitioned')
+        first = cursor.fetchone()[0]
+    current = date.today().replace(day=1)
+    month = min(first.replace(day=1), current) if first is not None else current
+    while month <= add_months(current, MONTHS_AHEAD):
+        schema_editor.execute(
+            f"CREATE TABLE {TABLE}_{month:%Y_%m} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        month = add_months(month, 1)
+    # Catches the rows of months without a partition, so that an assembly never fails for lack of one
+    schema_editor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+
+    schema_editor.execute(f'INSERT INTO {TABLE} (id, date, plane_id) SELECT id, date, plane_id FROM {TABLE}_unpartitioned')
+    schema_editor.execute(f'DROP TABLE {TABLE}_unpartitioned')
+    reset_identity(schema_editor)
+    create_indexes(schema_editor)
+
+
+def merge_partitions(apps, schema_editor):
+    # Archived partitions are not part of the table anymore and are not restored
+    schema_editor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned')
+    schema_editor.execute(f'ALTER INDEX {TABLE}_pkey RENAME TO {TABLE}_partitioned_pkey')
+    schema_editor.execute(f'DROP INDEX {", ".join(name for name, _ in INDEXES)}')
+    schema_editor.execute(
+        f'CREATE TABLE {TABLE} ('
+        f'id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY, '
+        f'date date NOT NULL, '
+        f'plane_id bigint NOT NULL REFERENCES planes_planes (id) DEFERRABLE INITIALLY DEFERRED'
+        f')'
+    )
+    schema_editor.execute(f'INSERT INTO {TABLE} (id, date, plane_id) SELECT id, date, plane_id FROM {TABLE}_partitioned')
+    schema_editor.execute(f'DROP TABLE {TABLE}_partitioned')
+    reset_identity(schema_editor)
+    create_indexes(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manufacturing', '0011_production_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assemblyusedpart',
+            name='history',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='parts_used', to='manufacturing.assemblyhistory'),
+        ),
+        migrations.RunPython(partition_by_month, merge_partitions),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:40
+
+from django.db import migrations
+
+VERSIONS = ['catalog', 'inventory', 'history']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manufacturing', '0012_partition_assemblyhistory'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [f'CREATE SEQUENCE manufacturing_{name}_version' for name in VERSIONS],
+            [f'DROP SEQUENCE manufacturing_{name}_version' for name in VERSIONS],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manufacturing', '0013_version_sequences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assemblyorder',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assemblyorder',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
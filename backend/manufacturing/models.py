@@ -1,10 +1,146 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from planes.models import Planes
 
 
 # Create your models here.
 class AssemblyHistory(models.Model):
-    used_parts = models.TextField()
+    # The table is range partitioned by month on `date`, see manufacturing.partitions
     date = models.DateField(auto_now_add=True)
-    plane =  models.ForeignKey(Planes, on_delete=models.CASCADE)
+    # Indexed by the (plane, date, id) index
+    plane =  models.ForeignKey(Planes, on_delete=models.CASCADE, db_index=False)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the history, newest first, with and without a plane filter
+            models.Index(fields=['date', 'id'], name='assembly_history_date_idx'),
+            models.Index(fields=['plane', 'date', 'id'], name='assembly_history_plane_idx'),
+        ]
+
+
+class AssemblyUsedPart(models.Model):
+    # The partitioned history has no unique index on id alone for a database foreign key to reference
+    history = models.ForeignKey(AssemblyHistory, on_delete=models.CASCADE, related_name='parts_used', db_index=False, db_constraint=False)
+    part = models.ForeignKey('parts.Parts', on_delete=models.CASCADE, db_index=False)
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            # Also the index of the history reads
+            models.UniqueConstraint(fields=['history', 'part'], name='unique_assembly_used_part'),
+        ]
+        indexes = [
+            # Finds the assemblies that consumed a part
+            models.Index(fields=['part', 'history'], name='assembly_used_part_part_idx'),
+        ]
+
+
+class AssemblyOrder(models.Model):
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    plane = models.ForeignKey(Planes, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    allow_partial = models.BooleanField(default=False)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    built = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # Attempts that failed with an unexpected error, and when the order may be tried again
+    attempts = models.PositiveSmallIntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The workers only ever scan the pending orders
+            models.Index(fields=['id'], condition=models.Q(status='pending'), name='assembly_order_pending_idx'),
+        ]
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=100)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+
+
+class InventoryMovement(models.Model):
+    MANUFACTURED = 'manufactured'
+    RECYCLED = 'recycled'
+    CONSUMED = 'consumed'
+    ASSEMBLED = 'assembled'
+    REASON_CHOICES = [
+        (MANUFACTURED, 'Manufactured'),
+        (RECYCLED, 'Recycled'),
+        (CONSUMED, 'Consumed by an assembly'),
+        (ASSEMBLED, 'Assembled'),
+    ]
+
+    # Indexed by the (plane, part, created_at) index
+    plane = models.ForeignKey(Planes, on_delete=models.CASCADE, db_index=False)
+    # Empty for the movements of the plane inventory
+    part = models.ForeignKey('parts.Parts', on_delete=models.CASCADE, null=True, blank=True)
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['plane', 'part', 'created_at'], name='inventory_movement_pair_idx'),
+            models.Index(fields=['created_at'], name='inventory_movement_date_idx'),
+        ]
+
+
+class InventorySnapshot(models.Model):
+    # Indexed by the (plane, part, taken_at) index
+    plane = models.ForeignKey(Planes, on_delete=models.CASCADE, db_index=False)
+    # Empty for the snapshots of the plane inventory
+    part = models.ForeignKey('parts.Parts', on_delete=models.CASCADE, null=True, blank=True)
+    inventory = models.IntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['plane', 'part', 'taken_at'], name='inventory_snapshot_pair_idx'),
+            models.Index(fields=['taken_at'], name='inventory_snapshot_date_idx'),
+        ]
+
+
+class DailyPlaneProduction(models.Model):
+    # Planes of one model assembled on one day, maintained by the assemblies, see manufacturing.rollups
+    date = models.DateField()
+    plane = models.ForeignKey(Planes, on_delete=models.CASCADE)
+    built = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'plane'], name='unique_daily_plane_production'),
+        ]
+
+
+class DailyPartConsumption(models.Model):
+    # Parts made by one department consumed on one day by the assemblies of every plane model
+    date = models.DateField()
+    department = models.ForeignKey('departments.Departments', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'department'], name='unique_daily_part_consumption'),
+        ]
@@ -0,0 +1,77 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .assembly import AssemblyError, assemble_planes
+from .models import AssemblyOrder
+
+logger = logging.getLogger(__name__)
+
+
+# Advisory lock serializing the orders being queued
+QUEUE_LOCK_ID = 0x6d66675f6f726473
+
+
+def orders_in_flight():
+    return AssemblyOrder.objects.filter(status=AssemblyOrder.PENDING).count()
+
+
+def queue_order(**fields):
+    """
+    Creates a pending order from `fields` while fewer than ASSEMBLY_ORDERS_MAX_IN_FLIGHT orders are
+    waiting for a worker, returns None otherwise. The count and the insert run under a transaction
+    level advisory lock, so concurrent requests cannot all see room for one more order.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [QUEUE_LOCK_ID])
+        if orders_in_flight() >= settings.ASSEMBLY_ORDERS_MAX_IN_FLIGHT:
+            return None
+        return AssemblyOrder.objects.create(**fields)
+
+
+def process_next_order():
+    """
+    Takes the oldest pending order nobody else is working on and assembles it.
+
+    The order row stays locked with SELECT ... FOR UPDATE SKIP LOCKED until the assembly is
+    committed, so any number of workers can drain the queue side by side and an order whose
+    worker dies is simply picked up again. An order failing with an unexpected error is retried
+    after a delay, and marked failed after ASSEMBLY_ORDERS_MAX_ATTEMPTS attempts. Returns False
+    when there is nothing to do.
+    """
+    with transaction.atomic():
+        order = AssemblyOrder.objects.select_for_update(skip_locked=True) \
+            .filter(Q(retry_at__isnull=True) | Q(retry_at__lte=timezone.now()), status=AssemblyOrder.PENDING) \
+            .order_by('id').first()
+        if order is None:
+            return False
+
+        # The assembly runs in a savepoint, a failure only rolls back the assembly itself
+        try:
+            plane, built, new_inventory, used_parts = assemble_planes(order.plane_id, order.quantity, allow_partial=order.allow_partial)
+        except AssemblyError as e:
+            order.status = AssemblyOrder.FAILED
+            order.error = e.message
+        except Exception as e:
+            # A deadlock or any other unexpected error, retried later until the order runs out of attempts
+            logger.exception('Assembly order %s failed', order.id)
+            order.attempts += 1
+            order.error = f'{type(e).__name__}: {e}'
+            if order.attempts >= settings.ASSEMBLY_ORDERS_MAX_ATTEMPTS:
+                order.status = AssemblyOrder.FAILED
+            else:
+                order.retry_at = timezone.now() + timedelta(seconds=order.attempts * settings.ASSEMBLY_ORDERS_RETRY_DELAY)
+        else:
+            order.status = AssemblyOrder.DONE
+            order.built = built
+
+        if order.status != AssemblyOrder.PENDING:
+            order.finished_at = timezone.now()
+        order.save(update_fields=['status', 'built', 'error', 'attempts', 'retry_at', 'finished_at'])
+
+    return True
@@ -0,0 +1,170 @@
+import gzip
+import os
+from datetime import date
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from .models import AssemblyHistory, AssemblyUsedPart
+from .versions import HISTORY, changed
+
+# Partition maintenance waits this long for the history's locks before giving up, instead of
+# queueing every assembly behind it while a long read finishes
+LOCK_TIMEOUT = '5s'
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{AssemblyHistory._meta.db_table}_{month:%Y_%m}'
+
+
+def archive_paths(month, directory):
+    """Returns the files an archived partition is written to: its history rows and their used parts."""
+    directory = Path(directory)
+    return directory / f'{partition_name(month)}.history.csv.gz', directory / f'{partition_name(month)}.used_parts.csv.gz'
+
+
+def history_partitions():
+    """Returns the first day of the month of every monthly partition attached to the history, in order."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass',
+            [AssemblyHistory._meta.db_table],
+        )
+        names = {name for name, in cursor.fetchall()}
+    prefix = f'{AssemblyHistory._meta.db_table}_'
+    return sorted(
+        date(int(name[-7:-3]), int(name[-2:]), 1)
+        for name in names
+        if name.startswith(prefix) and name[len(prefix):] != 'default'
+    )
+
+
+def default_partition_months():
+    """Returns the months having rows in the default partition, for lack of a partition of their own."""
+    default = connection.ops.quote_name(f'{AssemblyHistory._meta.db_table}_default')
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT date_trunc('month', date)::date FROM {default} ORDER BY 1")
+        return [month for month, in cursor.fetchall()]
+
+
+def attach_partition(cursor, month, fill=None):
+    """
+    Creates the partition of `month` and attaches it to the history. `fill(cursor, table)`, when
+    given, loads rows into it before it is attached. Rows of that month which landed in the
+    default partition are moved into it first, the default partition could not be narrowed
+    otherwise.
+    """
+    table = connection.ops.quote_name(AssemblyHistory._meta.db_table)
+    default = connection.ops.quote_name(f'{AssemblyHistory._meta.db_table}_default')
+    partition = connection.ops.quote_name(partition_name(month))
+    bounds = [month, add_months(month, 1)]
+
+    cursor.execute(f'CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    if fill is not None:
+        fill(cursor, partition)
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {default} WHERE date >= %s AND date < %s RETURNING id, date, plane_id) '
+        f'INSERT INTO {partition} (id, date, plane_id) SELECT id, date, plane_id FROM moved',
+        bounds,
+    )
+    # Lets the attach skip scanning the new partition
+    cursor.execute(f'ALTER TABLE {partition} ADD CONSTRAINT {partition_name(month)}_bounds CHECK (date >= %s AND date < %s)', bounds)
+    cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES FROM (%s) TO (%s)', bounds)
+    cursor.execute(f'ALTER TABLE {partition} DROP CONSTRAINT {partition_name(month)}_bounds')
+
+
+def create_history_partitions(first_month, last_month):
+    """
+    Creates the missing monthly partitions of the history from `first_month` to `last_month`,
+    and of the months found in the default partition. Returns the months created.
+    """
+    existing = set(history_partitions())
+    months = set(default_partition_months())
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        months.add(month)
+        month = add_months(month, 1)
+
+    created = []
+    for month in sorted(months - existing):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+            attach_partition(cursor, month)
+        created.append(month)
+    return created
+
+
+def archive_history_partition(month, directory):
+    """
+    Writes the history rows of `month` and their used parts to gzip compressed CSV files in
+    `directory`, then removes them from the database by detaching and dropping the partition.
+    The daily production rollups of the month are kept. Returns the number of
+    `(history, used parts)` rows archived.
+    """
+    if month not in history_partitions():
+        raise ValueError(f'There is no assembly history partition for {month:%Y-%m}.')
+
+    partition = connection.ops.quote_name(partition_name(month))
+    table = connection.ops.quote_name(AssemblyHistory._meta.db_table)
+    used_part_table = connection.ops.quote_name(AssemblyUsedPart._meta.db_table)
+    history_path, used_parts_path = archive_paths(month, directory)
+    os.makedirs(directory, exist_ok=True)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # The partition is locked first, so that the files hold exactly what is dropped
+        cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+        cursor.execute(f'LOCK TABLE {partition} IN SHARE MODE')
+        for path, query in (
+            (history_path, f'SELECT id, date, plane_id FROM {partition} ORDER BY id'),
+            (used_parts_path, f'SELECT used.id, used.history_id, used.part_id, used.quantity FROM {used_part_table} used '
+                              f'JOIN {partition} history ON history.id = used.history_id ORDER BY used.id'),
+        ):
+            # Written next to the final file and renamed once complete
+            partial_path = path.with_name(f'{path.name}.partial')
+            with gzip.open(partial_path, 'wb') as archive:
+                cursor.copy_expert(f'COPY ({query}) TO STDOUT WITH (FORMAT csv)', archive)
+            os.replace(partial_path, path)
+
+        cursor.execute(f'SELECT COUNT(*) FROM {partition}')
+        history = cursor.fetchone()[0]
+        cursor.execute(f'DELETE FROM {used_part_table} WHERE history_id IN (SELECT id FROM {partition})')
+        used_parts = cursor.rowcount
+        cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {partition}')
+        cursor.execute(f'DROP TABLE {partition}')
+        changed(HISTORY)
+    return history, used_parts
+
+
+def restore_history_partition(month, directory):
+    """
+    Loads an archived month back from the files written by `archive_history_partition` and
+    attaches its partition again. The files are kept. Returns the number of
+    `(history, used parts)` rows restored.
+    """
+    if month in history_partitions():
+        raise ValueError(f'The assembly history partition for {month:%Y-%m} is already attached.')
+    history_path, used_parts_path = archive_paths(month, directory)
+    if not history_path.exists() or not used_parts_path.exists():
+        raise ValueError(f'There is no archive for {month:%Y-%m} in {directory}.')
+
+    used_part_table = connection.ops.quote_name(AssemblyUsedPart._meta.db_table)
+    restored = {}
+
+    def load_history(cursor, partition):
+        with gzip.open(history_path, 'rb') as archive:
+            cursor.copy_expert(f'COPY {partition} (id, date, plane_id) FROM STDIN WITH (FORMAT csv)', archive)
+        restored['history'] = cursor.rowcount
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+        attach_partition(cursor, month, fill=load_history)
+        changed(HISTORY)
+        with gzip.open(used_parts_path, 'rb') as archive:
+            cursor.copy_expert(f'COPY {used_part_table} (id, history_id, part_id, quantity) FROM STDIN WITH (FORMAT csv)', archive)
+        return restored['history'], cursor.rowcount
@@ -0,0 +1,67 @@
+from django.db import connection, transaction
+
+from parts.models import Parts
+from .models import AssemblyHistory, AssemblyUsedPart, DailyPartConsumption, DailyPlaneProduction
+
+
+def record_production(day, plane_id, built, required_parts):
+    """
+    Adds `built` planes assembled on `day`, each using `required_parts` as `{part_id: quantity}`,
+    to the daily rollups with one statement: the planes built by the model and the parts consumed
+    per department. Must run in the assembly's transaction: the production row of a model is only
+    updated under the plane's lock, and the department rows, shared by every model, are upserted
+    last and in department order so that they stay locked only until the commit.
+    """
+    production_table = connection.ops.quote_name(DailyPlaneProduction._meta.db_table)
+    consumption_table = connection.ops.quote_name(DailyPartConsumption._meta.db_table)
+    parts_table = connection.ops.quote_name(Parts._meta.db_table)
+    values = ', '.join(['(%s, %s)'] * len(required_parts))
+    params = [value for part_id, per_plane in sorted(required_parts.items()) for value in (part_id, per_plane * built)]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH built AS (INSERT INTO {production_table} (date, plane_id, built) VALUES (%s, %s, %s) '
+            f'ON CONFLICT (date, plane_id) DO UPDATE SET built = {production_table}.built + EXCLUDED.built) '
+            f'INSERT INTO {consumption_table} (date, department_id, quantity) '
+            f'SELECT %s, parts.department_id, SUM(used.quantity) '
+            f'FROM (VALUES {values}) AS used (part_id, quantity) JOIN {parts_table} parts ON parts.id = used.part_id '
+            f'GROUP BY parts.department_id ORDER BY parts.department_id '
+            f'ON CONFLICT (date, department_id) DO UPDATE SET quantity = {consumption_table}.quantity + EXCLUDED.quantity',
+            [day, plane_id, built, day] + params,
+        )
+
+
+def rebuild_rollups(date_from, date_to):
+    """
+    Recomputes the daily rollups of the days from `date_from` to `date_to` from the assembly
+    history. The rollup tables are locked for the duration, so assemblies committing meanwhile
+    wait and are added on top of the rebuilt rows instead of being lost. Returns the number of
+    `(production, consumption)` rows written.
+    """
+    production_table = connection.ops.quote_name(DailyPlaneProduction._meta.db_table)
+    consumption_table = connection.ops.quote_name(DailyPartConsumption._meta.db_table)
+    history_table = connection.ops.quote_name(AssemblyHistory._meta.db_table)
+    used_part_table = connection.ops.quote_name(AssemblyUsedPart._meta.db_table)
+    parts_table = connection.ops.quote_name(Parts._meta.db_table)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {production_table}, {consumption_table} IN SHARE ROW EXCLUSIVE MODE')
+
+        DailyPlaneProduction.objects.filter(date__range=(date_from, date_to)).delete()
+        cursor.execute(
+            f'INSERT INTO {production_table} (date, plane_id, built) '
+            f'SELECT date, plane_id, COUNT(*) FROM {history_table} '
+            f'WHERE date BETWEEN %s AND %s GROUP BY date, plane_id',
+            [date_from, date_to],
+        )
+        production = cursor.rowcount
+
+        DailyPartConsumption.objects.filter(date__range=(date_from, date_to)).delete()
+        cursor.execute(
+            f'INSERT INTO {consumption_table} (date, department_id, quantity) '
+            f'SELECT history.date, parts.department_id, SUM(used.quantity) FROM {history_table} history '
+            f'JOIN {used_part_table} used ON used.history_id = history.id JOIN {parts_table} parts ON parts.id = used.part_id '
+            f'WHERE history.date BETWEEN %s AND %s GROUP BY history.date, parts.department_id',
+            [date_from, date_to],
+        )
+        return production, cursor.rowcount
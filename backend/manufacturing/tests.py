@@ -1,3 +1,988 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from personnel.tokens import ClaimsRefreshToken
+
+from departments.capabilities import get_capabilities
+from departments.models import Departments
+from parts.inventory import increment_parts_inventory
+from parts.models import Parts, PartsInventory, PartsInventoryDelta
+from parts.names import get_part_names
+from planes.bom import get_bill_of_materials
+from planes.models import BillOfMaterials, Planes, PlanesInventory
+from personnel.models import CustomUser
+from .async_views import AsyncAssembleHistoryView, AsyncPlaneManufacturerInfoView
+from .buildable import InventoryMatrix, joint_allocation, max_buildable
+from . import versions
+from .ledger import compact_ledger, stock_at
+from .models import AssemblyHistory, AssemblyOrder, AssemblyUsedPart, DailyPartConsumption, DailyPlaneProduction, IdempotencyKey, \
+    InventoryMovement, InventorySnapshot
+from .orders import process_next_order
+from .views import AssembleHistoryExportView, AssembleHistoryView, PlaneManufacturerInfoView
+
+
+def create_catalog(part_count=4):
+    assembly_team = Departments.objects.create(name='Assembly Team')
+    parts = []
+    for i in range(part_count):
+        department = Departments.objects.create(name=f'Team {i}')
+        parts.append(Parts.objects.create(name=f'Part {i}', department=department))
+    plane = Planes.objects.create(name='TB2')
+    plane.parts.add(*parts)
+    return assembly_team, parts, plane
+
+
+def authenticated_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(user).access_token}')
+    return client
+
+
+class PlaneManufacturingViewTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog()
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        self.client = authenticated_client(self.user)
+
+    def stock(self, inventory):
+        for part in self.parts:
+            PartsInventory.objects.create(plane=self.plane, part=part, inventory=inventory)
+
+    def test_assembles_plane_and_consumes_one_of_each_part(self):
+        self.stock(2)
+
+        response = self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['new_inventory'], 1)
+        self.assertEqual(response.data['used_parts'], [part.id for part in self.parts])
+        self.assertEqual(list(PartsInventory.objects.values_list('inventory', flat=True).distinct()), [1])
+        self.assertEqual(PlanesInventory.objects.get(plane=self.plane).inventory, 1)
+        self.assertEqual(AssemblyHistory.objects.filter(plane=self.plane).count(), 1)
+        self.assertEqual(sorted(AssemblyUsedPart.objects.values_list('part_id', 'quantity')), [(part.id, 1) for part in self.parts])
+
+    def test_plane_inventory_stays_one_row_per_plane(self):
+        self.stock(3)
+        for _ in range(2):
+            self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+        response = self.client.delete('/plane/recycle', {'plane_id': self.plane.id}, format='json')
+
+        self.assertEqual(response.data['new_inventory'], 1)
+        self.assertEqual(list(PlanesInventory.objects.values_list('plane_id', 'inventory')), [(self.plane.id, 1)])
+
+        other = Planes.objects.create(name='AKINCI')
+        PlanesInventory.objects.create(plane=other, inventory=4)
+        with self.assertNumQueries(2):
+            # The version counters of the ETag and the inventory, the user comes from the token claims
+            response = self.client.get('/plane/list')
+        self.assertEqual([plane['plane_inventory'] for plane in response.data['data']], [1, 4])
+
+    def test_reads_a_bill_of_materials_changed_by_another_process(self):
+        self.stock(3)
+        get_bill_of_materials(self.plane.id)
+        # Changed without invalidating the cache of this process
+        BillOfMaterials.objects.filter(plane=self.plane, part=self.parts[0]).update(quantity=2)
+
+        self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+
+        self.assertEqual(PartsInventory.objects.get(plane=self.plane, part=self.parts[0]).inventory, 1)
+
+    def test_consumes_bill_of_materials_quantity(self):
+        self.stock(3)
+        BillOfMaterials.objects.filter(plane=self.plane, part=self.parts[0]).delete()
+        BillOfMaterials.objects.create(plane=self.plane, part=self.parts[0], quantity=2)
+
+        first = self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+        second = self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['used_parts'].count(self.parts[0].id), 2)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(PartsInventory.objects.get(part=self.parts[0]).inventory, 1)
+
+    def test_missing_part_rolls_back(self):
+        self.stock(1)
+        PartsInventory.objects.filter(part=self.parts[2]).update(inventory=0)
+
+        response = self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'There is no Part 2 to create TB2.')
+        self.assertEqual(PartsInventory.objects.filter(inventory=1).count(), 3)
+        self.assertFalse(PlanesInventory.objects.exists())
+        self.assertFalse(AssemblyHistory.objects.exists())
+
+    def test_query_count_does_not_grow_with_required_parts(self):
+        self.stock(5)
+        with CaptureQueriesContext(connection) as small:
+            self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+
+        _, parts, plane = create_catalog(part_count=40)
+        for part in parts:
+            PartsInventory.objects.create(plane=plane, part=part, inventory=5)
+        # The new departments dropped the cached capabilities
+        get_capabilities()
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post('/plane/create', {'plane_id': plane.id}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(small), len(large))
+
+
+class PlaneBatchManufacturingViewTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog()
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        self.client = authenticated_client(self.user)
+        for part in self.parts:
+            PartsInventory.objects.create(plane=self.plane, part=part, inventory=7)
+
+    def test_builds_full_quantity(self):
+        response = self.client.post('/plane/create-batch', {'plane_id': self.plane.id, 'quantity': 5}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['status'])
+        self.assertEqual(response.data['results'][0]['built'], 5)
+        self.assertEqual(response.data['results'][0]['new_inventory'], 5)
+        self.assertEqual(PartsInventory.objects.get(part=self.parts[0]).inventory, 2)
+        self.assertEqual(AssemblyHistory.objects.count(), 5)
+
+    def test_short_inventory_builds_nothing_by_default(self):
+        response = self.client.post('/plane/create-batch', [{'plane_id': self.plane.id, 'quantity': 8}], format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['status'])
+        self.assertEqual(response.data['results'][0]['result'], 'failed')
+        self.assertEqual(response.data['results'][0]['built'], 0)
+        self.assertFalse(AssemblyHistory.objects.exists())
+
+    def test_partial_builds_what_the_inventory_allows(self):
+        response = self.client.post('/plane/create-batch', {
+            'items': [{'plane_id': self.plane.id, 'quantity': 8}, {'plane_id': self.plane.id, 'quantity': 1}],
+            'allow_partial': True,
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['result'] for r in response.data['results']], ['partial', 'failed'])
+        self.assertEqual(response.data['results'][0]['built'], 7)
+        self.assertEqual(PlanesInventory.objects.get(plane=self.plane).inventory, 7)
+        self.assertFalse(PartsInventory.objects.filter(inventory__gt=0).exists())
+
+    def test_rejects_invalid_quantity(self):
+        response = self.client.post('/plane/create-batch', {'plane_id': self.plane.id, 'quantity': 0}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_allow_partial_is_parsed_strictly(self):
+        # A form encoded "false" must not build a partial batch
+        response = self.client.post('/plane/create-batch', {'plane_id': self.plane.id, 'quantity': 8, 'allow_partial': 'false'})
+        self.assertEqual(response.data['results'][0]['result'], 'failed')
+
+        response = self.client.post('/plane/create-batch', {'plane_id': self.plane.id, 'quantity': 8, 'allow_partial': 'maybe'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AssemblyHistory.objects.exists())
+
+
+class PartBatchManufacturingViewTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog(part_count=2)
+        self.other_plane = Planes.objects.create(name='AKINCI')
+        self.user = CustomUser.objects.create_user(username='maker', password='pass', department=self.parts[0].department)
+        self.client = authenticated_client(self.user)
+        PartsInventory.objects.create(plane=self.plane, part=self.parts[0], inventory=3)
+
+    def test_single_part_creates_the_missing_inventory_row(self):
+        response = self.client.post('/part/create', {'plane_id': self.other_plane.id, 'part_id': self.parts[0].id}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['new_inventory'], 1)
+        self.assertEqual(PartsInventory.objects.get(plane=self.other_plane, part=self.parts[0]).inventory, 1)
+
+    def test_batch_upserts_and_merges_duplicate_items(self):
+        with self.assertNumQueries(3):
+            # Parts, planes and the upsert
+            response = self.client.post('/part/create-batch', [
+                {'plane_id': self.plane.id, 'part_id': self.parts[0].id, 'quantity': 2},
+                {'plane_id': self.other_plane.id, 'part_id': self.parts[0].id, 'quantity': 5},
+                {'plane_id': self.plane.id, 'part_id': self.parts[0].id},
+            ], format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(r['quantity'], r['new_inventory']) for r in response.data['results']], [(3, 6), (5, 5)])
+        self.assertEqual(PartsInventory.objects.get(plane=self.plane, part=self.parts[0]).inventory, 6)
+        self.assertEqual(PartsInventory.objects.count(), 2)
+
+    @override_settings(PARTS_INVENTORY_WRITE_COMBINING=True)
+    def test_buffered_parts_are_seen_by_every_reader(self):
+        for _ in range(2):
+            response = self.client.post('/part/create', {'plane_id': self.plane.id, 'part_id': self.parts[0].id}, format='json')
+        self.assertEqual(response.data['new_inventory'], 5)
+        self.assertEqual(self.client.get('/part/list').data['data'][0]['part_count'], 5)
+
+        response = self.client.delete('/part/recycle', {'plane_id': self.plane.id, 'part_id': self.parts[0].id}, format='json')
+        self.assertEqual(response.data['new_inventory'], 4)
+
+        # Assembly folds the remaining buffered parts before consuming them
+        PartsInventory.objects.create(plane=self.plane, part=self.parts[1], inventory=1)
+        self.client.post('/part/create', {'plane_id': self.plane.id, 'part_id': self.parts[0].id}, format='json')
+        assembler = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        response = authenticated_client(assembler).post('/plane/create', {'plane_id': self.plane.id}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PartsInventory.objects.get(plane=self.plane, part=self.parts[0]).inventory, 4)
+        self.assertFalse(PartsInventoryDelta.objects.exists())
+
+    @override_settings(PARTS_INVENTORY_WRITE_COMBINING=True)
+    def test_recycling_another_departments_part_folds_nothing(self):
+        increment_parts_inventory({(self.plane.id, self.parts[1].id): 2})
+
+        response = self.client.delete('/part/recycle', {'plane_id': self.plane.id, 'part_id': self.parts[1].id}, format='json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(PartsInventoryDelta.objects.filter(part=self.parts[1]).exists())
+
+    def test_batch_with_a_part_of_another_department_changes_nothing(self):
+        response = self.client.post('/part/create-batch', {'items': [
+            {'plane_id': self.plane.id, 'part_id': self.parts[0].id},
+            {'plane_id': self.plane.id, 'part_id': self.parts[1].id},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(PartsInventory.objects.get(plane=self.plane, part=self.parts[0]).inventory, 3)
+
+    def test_batch_rejects_unknown_plane(self):
+        response = self.client.post('/part/create-batch', [{'plane_id': 0, 'part_id': self.parts[0].id}], format='json')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class PartManufacturerInfoViewTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog(part_count=2)
+        self.user = CustomUser.objects.create_user(username='maker', password='pass', department=self.parts[0].department)
+        self.client = authenticated_client(self.user)
+
+    def add_planes(self, count):
+        planes = Planes.objects.bulk_create([Planes(name=f'Plane {i}') for i in range(count)])
+        BillOfMaterials.objects.bulk_create([BillOfMaterials(plane=plane, part=part) for plane in planes for part in self.parts])
+        PartsInventory.objects.bulk_create([PartsInventory(plane=plane, part=self.parts[0], inventory=2) for plane in planes])
+
+    def test_lists_department_parts_per_plane(self):
+        PartsInventory.objects.create(plane=self.plane, part=self.parts[0], inventory=4)
+        PartsInventory.objects.create(plane=self.plane, part=self.parts[1], inventory=9)
+        BillOfMaterials.objects.filter(plane=self.plane, part=self.parts[0]).update(quantity=2)
+        empty_plane = Planes.objects.create(name='AKINCI')
+        empty_plane.parts.add(self.parts[0])
+
+        response = self.client.get('/part/list')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['part_id'], self.parts[0].id)
+        self.assertEqual(response.data['data'], [
+            {'plane_id': self.plane.id, 'plane_name': 'TB2', 'part_count': 4, 'parts': [
+                {'part_id': self.parts[0].id, 'part_name': 'Part 0', 'required_quantity': 2, 'inventory': 4},
+            ]},
+            {'plane_id': empty_plane.id, 'plane_name': 'AKINCI', 'part_count': 0, 'parts': [
+                {'part_id': self.parts[0].id, 'part_name': 'Part 0', 'required_quantity': 1, 'inventory': 0},
+            ]},
+        ])
+
+    def test_query_count_does_not_grow_with_planes(self):
+        query_counts = []
+        for count in (5, 4995):
+            self.add_planes(count)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/part/list')
+            query_counts.append(len(queries))
+
+        self.assertEqual(len(response.data['data']), 5001)
+        self.assertEqual(query_counts[0], query_counts[1])
+
+
+class PlaneOrderTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog()
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        self.client = authenticated_client(self.user)
+        for part in self.parts:
+            PartsInventory.objects.create(plane=self.plane, part=part, inventory=3)
+
+    def test_order_is_queued_then_assembled_by_the_worker(self):
+        response = self.client.post('/plane/order', {'plane_id': self.plane.id, 'quantity': 2}, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        order_id = response.data['order_id']
+        self.assertEqual(self.client.get(f'/plane/order/{order_id}').data['order_status'], 'pending')
+        self.assertFalse(AssemblyHistory.objects.exists())
+
+        call_command('assembly_worker', once=True, stdout=StringIO())
+
+        response = self.client.get(f'/plane/order/{order_id}')
+        self.assertEqual(response.data['order_status'], 'done')
+        self.assertEqual(response.data['built'], 2)
+        self.assertEqual(PlanesInventory.objects.get(plane=self.plane).inventory, 2)
+
+    def test_failed_order_records_the_error(self):
+        order = AssemblyOrder.objects.create(plane=self.plane, quantity=5)
+
+        call_command('assembly_worker', once=True, stdout=StringIO())
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, AssemblyOrder.FAILED)
+        self.assertIn('not enough', order.error)
+        self.assertFalse(PartsInventory.objects.exclude(inventory=3).exists())
+
+    @override_settings(ASSEMBLY_ORDERS_MAX_ATTEMPTS=2)
+    def test_unexpected_errors_are_retried_then_fail_the_order(self):
+        order = AssemblyOrder.objects.create(plane=self.plane)
+
+        with mock.patch('manufacturing.orders.assemble_planes', side_effect=OperationalError('deadlock detected')), \
+                self.assertLogs('manufacturing.orders', 'ERROR'):
+            self.assertTrue(process_next_order())
+            order.refresh_from_db()
+            self.assertEqual((order.status, order.attempts), (AssemblyOrder.PENDING, 1))
+            self.assertGreater(order.retry_at, timezone.now())
+
+            # Not tried again before its retry time
+            self.assertFalse(process_next_order())
+            AssemblyOrder.objects.filter(id=order.id).update(retry_at=timezone.now())
+            self.assertTrue(process_next_order())
+
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.attempts), (AssemblyOrder.FAILED, 2))
+        self.assertIn('deadlock detected', order.error)
+
+    @override_settings(ASSEMBLY_ORDERS_MAX_IN_FLIGHT=1)
+    def test_refuses_orders_over_the_in_flight_limit(self):
+        first = self.client.post('/plane/order', {'plane_id': self.plane.id}, format='json')
+        second = self.client.post('/plane/order', {'plane_id': self.plane.id}, format='json')
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.status_code, 429)
+
+    def test_allow_partial_is_parsed_strictly(self):
+        response = self.client.post('/plane/order', {'plane_id': self.plane.id, 'allow_partial': 'false'})
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(AssemblyOrder.objects.get(id=response.data['order_id']).allow_partial)
+
+        response = self.client.post('/plane/order', {'plane_id': self.plane.id, 'allow_partial': 'maybe'})
+        self.assertEqual(response.status_code, 400)
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog()
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        self.client = authenticated_client(self.user)
+        for part in self.parts:
+            PartsInventory.objects.create(plane=self.plane, part=part, inventory=3)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        # Only the key lookup, the user comes from the token claims
+        with self.assertNumQueries(1):
+            retry = self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(PlanesInventory.objects.get(plane=self.plane).inventory, 1)
+
+    def test_errors_are_replayed_too(self):
+        first = self.client.delete('/plane/recycle', {'plane_id': self.plane.id}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+        retry = self.client.delete('/plane/recycle', {'plane_id': self.plane.id}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(first.status_code, 404)
+        self.assertEqual(retry.status_code, 404)
+        self.assertEqual(PlanesInventory.objects.get(plane=self.plane).inventory, 1)
+
+    def test_key_reused_on_another_endpoint_is_rejected(self):
+        self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        response = self.client.delete('/plane/recycle', {'plane_id': self.plane.id}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(PlanesInventory.objects.get(plane=self.plane).inventory, 1)
+
+    def test_expired_keys_are_pruned(self):
+        self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json', HTTP_IDEMPOTENCY_KEY='old')
+        self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json', HTTP_IDEMPOTENCY_KEY='new')
+        IdempotencyKey.objects.filter(key='old').update(created_at=timezone.now() - timedelta(days=2))
+
+        call_command('prune_idempotency_keys', stdout=StringIO())
+
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
+
+
+class InventoryLedgerTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog(part_count=2)
+        self.wing = self.parts[0]
+        self.start = timezone.now() - timedelta(hours=3)
+
+    def move(self, minutes, quantity, part=None):
+        InventoryMovement.objects.create(plane=self.plane, part=part or self.wing, quantity=quantity,
+                                         reason=InventoryMovement.MANUFACTURED, created_at=self.start + timedelta(minutes=minutes))
+
+    def test_every_inventory_change_is_recorded(self):
+        maker = CustomUser.objects.create_user(username='maker', password='pass', department=self.wing.department)
+        maker_client = authenticated_client(maker)
+        for part in self.parts:
+            increment_parts_inventory({(self.plane.id, part.id): 3})
+        maker_client.delete('/part/recycle', {'plane_id': self.plane.id, 'part_id': self.wing.id}, format='json')
+        assembler = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        authenticated_client(assembler).post('/plane/create-batch', {'plane_id': self.plane.id, 'quantity': 2}, format='json')
+
+        now = timezone.now()
+        self.assertEqual(stock_at(self.plane.id, self.wing.id, now), PartsInventory.objects.get(part=self.wing).inventory)
+        self.assertEqual(stock_at(self.plane.id, self.wing.id, now), 0)
+        self.assertEqual(stock_at(self.plane.id, self.parts[1].id, now), 1)
+        self.assertEqual(stock_at(self.plane.id, None, now), 2)
+        self.assertEqual(sorted(InventoryMovement.objects.filter(part=self.wing).values_list('reason', 'quantity')),
+                         [('consumed', -2), ('manufactured', 3), ('recycled', -1)])
+
+    def test_stock_at_a_past_moment(self):
+        self.move(0, 5)
+        self.move(60, -2)
+        self.move(120, 4)
+
+        self.assertEqual(stock_at(self.plane.id, self.wing.id, self.start - timedelta(minutes=1)), 0)
+        self.assertEqual(stock_at(self.plane.id, self.wing.id, self.start + timedelta(minutes=90)), 3)
+        self.assertEqual(stock_at(self.plane.id, self.wing.id, self.start + timedelta(minutes=120)), 7)
+
+    def test_compaction_folds_movements_into_snapshots(self):
+        self.move(0, 5)
+        self.move(10, 1, part=self.parts[1])
+        InventoryMovement.objects.create(plane=self.plane, quantity=2, reason=InventoryMovement.ASSEMBLED, created_at=self.start)
+        self.assertEqual(compact_ledger(self.start + timedelta(minutes=30)), (3, 0))
+
+        self.move(60, -2)
+        self.move(120, 4)
+        self.assertEqual(compact_ledger(self.start + timedelta(minutes=90), prune_before=self.start + timedelta(minutes=90)), (1, 4))
+        self.assertEqual(compact_ledger(self.start + timedelta(minutes=90)), (0, 0))
+
+        self.assertEqual(list(InventorySnapshot.objects.filter(part=self.wing).order_by('taken_at').values_list('inventory', flat=True)), [5, 3])
+        with self.assertNumQueries(2):
+            self.assertEqual(stock_at(self.plane.id, self.wing.id, self.start + timedelta(minutes=150)), 7)
+        self.assertEqual(stock_at(self.plane.id, self.wing.id, self.start + timedelta(minutes=100)), 3)
+        self.assertEqual(stock_at(self.plane.id, self.parts[1].id, self.start + timedelta(minutes=100)), 1)
+        self.assertEqual(stock_at(self.plane.id, None, self.start + timedelta(minutes=100)), 2)
+
+
+class AssembleHistoryViewTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog(part_count=2)
+        self.other_plane = Planes.objects.create(name='AKINCI')
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        self.client = authenticated_client(self.user)
+        self.history = []
+        for day in (1, 1, 2, 3, 3, 3, 4):
+            plane = self.other_plane if day == 2 else self.plane
+            history = AssemblyHistory.objects.create(plane=plane)
+            AssemblyHistory.objects.filter(id=history.id).update(date=date(2026, 1, day))
+            AssemblyUsedPart.objects.create(history=history, part=self.parts[0], quantity=2)
+            if day != 3:
+                AssemblyUsedPart.objects.create(history=history, part=self.parts[1])
+            self.history.append(history.id)
+
+    def test_pages_through_the_history_newest_first(self):
+        ids, cursor = [], None
+        while True:
+            response = self.client.get('/plane/assemble-history', {'limit': 3, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            ids += [entry['id'] for entry in response.data['data']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(ids, [self.history[6], self.history[5], self.history[4], self.history[3], self.history[2], self.history[1], self.history[0]])
+        self.assertEqual(response.data['data'][0]['used_parts'], 'Part 0, Part 0, Part 1')
+
+    def test_filters_by_plane_and_date(self):
+        response = self.client.get('/plane/assemble-history', {'plane_id': self.plane.id, 'date_from': '2026-01-02', 'date_to': '2026-01-03'})
+
+        self.assertEqual([entry['id'] for entry in response.data['data']], [self.history[5], self.history[4], self.history[3]])
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_filters_by_used_part(self):
+        response = self.client.get('/plane/assemble-history', {'part_id': self.parts[1].id, 'date_to': '2026-01-03'})
+
+        self.assertEqual([entry['id'] for entry in response.data['data']], [self.history[2], self.history[1], self.history[0]])
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        history = AssemblyHistory.objects.bulk_create([AssemblyHistory(plane=self.plane) for _ in range(100)])
+        AssemblyUsedPart.objects.bulk_create([AssemblyUsedPart(history=record, part=part) for record in history for part in self.parts])
+        self.client.get('/plane/assemble-history')
+
+        with self.assertNumQueries(3):
+            # The version counters of the ETag, the page and its used parts, the part names are cached
+            response = self.client.get('/plane/assemble-history', {'limit': 100})
+        self.assertEqual(len(response.data['data']), 100)
+
+    def test_rejects_invalid_cursor(self):
+        response = self.client.get('/plane/assemble-history', {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog()
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        self.client = authenticated_client(self.user)
+        for part in self.parts:
+            PartsInventory.objects.create(plane=self.plane, part=part, inventory=5)
+
+    def test_unchanged_data_is_not_modified_until_an_assembly(self):
+        first = self.client.get('/plane/list')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            # Only the version counters, the view does not run
+            response = self.client.get('/plane/list', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+        response = self.client.get('/plane/list', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_catalog_changes_and_other_users_get_another_etag(self):
+        first = self.client.get('/department/list')
+
+        other = CustomUser.objects.create_user(username='other', password='pass', department=self.parts[0].department)
+        response = authenticated_client(other).get('/department/list', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 201)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Departments.objects.create(name='Avionics Team')
+        response = self.client.get('/department/list', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 201)
+
+    def test_large_bodies_are_compressed(self):
+        for _ in range(10):
+            Planes.objects.create(name='TB3').parts.add(self.parts[0])
+        manufacturer = CustomUser.objects.create_user(username='manufacturer', password='pass', department=self.parts[0].department)
+        response = authenticated_client(manufacturer).get('/part/list', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog()
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        self.token = f'Bearer {ClaimsRefreshToken.for_user(self.user).access_token}'
+        for part in self.parts:
+            PartsInventory.objects.create(plane=self.plane, part=part, inventory=5)
+        self.client.post('/plane/create', {'plane_id': self.plane.id}, content_type='application/json', HTTP_AUTHORIZATION=self.token)
+
+    def get(self, view, path, **extra):
+        request = APIRequestFactory().get(path, **extra)
+        response = async_to_sync(view)(request) if asyncio.iscoroutinefunction(view) else view(request)
+        return response.render() if hasattr(response, 'render') else response
+
+    def test_responses_match_the_drf_views(self):
+        for path, async_view, view in (
+                ('/plane/list', AsyncPlaneManufacturerInfoView, PlaneManufacturerInfoView),
+                ('/plane/assemble-history', AsyncAssembleHistoryView, AssembleHistoryView)):
+            expected = self.get(view.as_view(), path, HTTP_AUTHORIZATION=self.token)
+            response = self.get(async_view.as_view(), path, HTTP_AUTHORIZATION=self.token)
+
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content))
+            self.assertEqual(response['ETag'], expected['ETag'])
+
+    def test_refuses_like_the_drf_views(self):
+        response = self.get(AsyncPlaneManufacturerInfoView.as_view(), '/plane/list')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+        manufacturer = CustomUser.objects.create_user(username='manufacturer', password='pass', department=self.parts[0].department)
+        token = f'Bearer {ClaimsRefreshToken.for_user(manufacturer).access_token}'
+        response = self.get(AsyncPlaneManufacturerInfoView.as_view(), '/plane/list', HTTP_AUTHORIZATION=token)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(json.loads(response.content), {'status': False, 'error': 'User is not part of the Assembly Team.'})
+
+
+@override_settings(DATABASE_READ_REPLICA='replica', DATABASE_REPLICA_MAX_LAG=0.2)
+class ReadReplicaTests(TestCase):
+    # The replica is a second connection to the test database, it sees none of the rows created by
+    # the tests, like a replica lagging behind
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        versions._seen.clear()
+        self.assembly_team, self.parts, self.plane = create_catalog()
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        self.client = authenticated_client(self.user)
+        for part in self.parts:
+            PartsInventory.objects.create(plane=self.plane, part=part, inventory=5)
+        PlanesInventory.objects.create(plane=self.plane, inventory=1)
+
+    def test_reads_move_to_the_replica_once_the_data_is_stable(self):
+        self.assertEqual(len(self.client.get('/plane/list').data['data']), 1)
+        time.sleep(0.3)
+
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = self.client.get('/plane/list')
+        self.assertEqual(response.data['data'], [])
+        self.assertTrue(queries)
+        request = APIRequestFactory().get('/plane/list', HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(self.user).access_token}')
+        self.assertEqual(PlaneManufacturerInfoView.as_view()(request).data['data'], [])
+
+    def test_writer_reads_from_the_primary_after_a_write(self):
+        self.client.get('/plane/assemble-history')
+        time.sleep(0.3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = self.client.get('/plane/assemble-history')
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertFalse(queries)
+
+
+class AssembleHistoryExportViewTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog(part_count=2)
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        self.client = authenticated_client(self.user)
+        self.history = AssemblyHistory.objects.bulk_create([AssemblyHistory(plane=self.plane) for _ in range(3)])
+        AssemblyUsedPart.objects.bulk_create([AssemblyUsedPart(history=history, part=self.parts[0], quantity=2) for history in self.history])
+        AssemblyUsedPart.objects.create(history=self.history[0], part=self.parts[1])
+
+    def test_streams_csv(self):
+        get_part_names()
+        with self.assertNumQueries(2):
+            # The transaction timeouts and the export, the part names are cached
+            response = self.client.get('/plane/assemble-history/export')
+            content = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = content.splitlines()
+        self.assertEqual(lines[0], 'id,date,plane_id,plane_name,used_parts')
+        self.assertEqual(lines[1], f'{self.history[0].id},{self.history[0].date.isoformat()},{self.plane.id},TB2,"Part 0, Part 0, Part 1"')
+        self.assertEqual(len(lines), 4)
+
+    def test_streams_ndjson_with_filters(self):
+        response = self.client.get('/plane/assemble-history/export', {'type': 'ndjson', 'part_id': self.parts[1].id})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual([row['id'] for row in rows], [self.history[0].id])
+        self.assertEqual(rows[0]['used_parts'], [
+            {'part_id': self.parts[0].id, 'part_name': 'Part 0', 'quantity': 2},
+            {'part_id': self.parts[1].id, 'part_name': 'Part 1', 'quantity': 1},
+        ])
+
+    @override_settings(ASSEMBLY_HISTORY_EXPORT_IDLE_TIMEOUT=45)
+    def test_stalled_download_is_timed_out(self):
+        response = self.client.get('/plane/assemble-history/export')
+        b''.join(response.streaming_content)
+
+        # The export ran in the test's transaction, its local settings are still there
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_setting('idle_in_transaction_session_timeout')")
+            self.assertEqual(cursor.fetchone()[0], '45s')
+
+    @mock.patch.object(AssembleHistoryExportView, 'chunk_size', 1)
+    def test_streams_in_chunks_under_asgi(self):
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/plane/assemble-history/export', 'query_string': b'type=ndjson',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+        }
+        bodies = []
+        events = []
+        batched = AssembleHistoryExportView.batched
+
+        def read_batches(view, lines):
+            for batch in batched(view, lines):
+                events.append('read')
+                yield batch
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message.get('body'):
+                events.append('sent')
+                bodies.append(message['body'])
+
+        # Like the test client, keep the test's connection open around the request
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            with mock.patch.object(AssembleHistoryExportView, 'batched', read_batches):
+                async_to_sync(ASGIHandler())(scope, receive, send)
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+
+        # Every row is sent before the next one is read from the cursor
+        self.assertEqual(events, ['read', 'sent'] * 3)
+        self.assertEqual([json.loads(body)['id'] for body in bodies], [history.id for history in self.history])
+
+    def test_rejects_unknown_type(self):
+        response = self.client.get('/plane/assemble-history/export', {'type': 'xlsx'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ProductionRollupTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog(part_count=2)
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=self.assembly_team)
+        self.client = authenticated_client(self.user)
+        BillOfMaterials.objects.filter(part=self.parts[0]).update(quantity=2)
+        for part in self.parts:
+            PartsInventory.objects.create(plane=self.plane, part=part, inventory=20)
+
+    def rollups(self):
+        return (
+            list(DailyPlaneProduction.objects.order_by('date', 'plane_id').values_list('date', 'plane_id', 'built')),
+            list(DailyPartConsumption.objects.order_by('date', 'department_id').values_list('date', 'department_id', 'quantity')),
+        )
+
+    def test_assemblies_maintain_the_rollups(self):
+        self.client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+        self.client.post('/plane/create-batch', {'plane_id': self.plane.id, 'quantity': 3}, format='json')
+
+        today = date.today()
+        production, consumption = self.rollups()
+        self.assertEqual(production, [(today, self.plane.id, 4)])
+        self.assertEqual(consumption, [(today, self.parts[0].department_id, 8), (today, self.parts[1].department_id, 4)])
+
+        # The catch-up command recomputes the same figures from the history
+        DailyPlaneProduction.objects.update(built=0)
+        DailyPartConsumption.objects.all().delete()
+        call_command('rebuild_production_rollups', stdout=StringIO())
+        self.assertEqual(self.rollups(), (production, consumption))
+
+    def test_analytics_sums_the_days_of_every_period(self):
+        monday = date(2024, 1, 1)
+        DailyPlaneProduction.objects.bulk_create([
+            DailyPlaneProduction(date=monday + timedelta(days=day), plane=self.plane, built=day + 1) for day in range(10)
+        ])
+        DailyPartConsumption.objects.bulk_create([
+            DailyPartConsumption(date=monday + timedelta(days=day), department=self.parts[0].department, quantity=2)
+            for day in range(10)
+        ])
+
+        with self.assertNumQueries(3):
+            # One query per rollup and one for the plane names, the department names are cached
+            response = self.client.get('/analytics/production', {'granularity': 'week', 'date_to': '2024-01-09'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['planes_built'], [
+            {'period': monday, 'plane_id': self.plane.id, 'plane_name': 'TB2', 'built': 28},
+            {'period': date(2024, 1, 8), 'plane_id': self.plane.id, 'plane_name': 'TB2', 'built': 17},
+        ])
+        self.assertEqual([row['quantity'] for row in response.data['parts_consumed']], [14, 4])
+        self.assertEqual(response.data['parts_consumed'][0]['department_name'], 'Team 0')
+
+    def test_rejects_unknown_granularity_and_long_daily_ranges(self):
+        response = self.client.get('/analytics/production', {'granularity': 'year'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/analytics/production', {'granularity': 'day', 'date_from': '2023-01-01', 'date_to': '2024-12-31'})
+        self.assertEqual(response.status_code, 400)
+
+
+class AssemblyHistoryPartitionTests(TestCase):
+    def setUp(self):
+        self.assembly_team, self.parts, self.plane = create_catalog(part_count=2)
+        self.history = AssemblyHistory.objects.bulk_create([AssemblyHistory(plane=self.plane) for _ in range(3)])
+        # Past months have no partition yet, their rows land in the default partition
+        AssemblyHistory.objects.filter(id=self.history[0].id).update(date=date(2023, 1, 15))
+        AssemblyHistory.objects.filter(id=self.history[1].id).update(date=date(2023, 2, 15))
+        AssemblyUsedPart.objects.bulk_create([AssemblyUsedPart(history=history, part=part) for history in self.history for part in self.parts])
+
+    def test_date_filters_prune_partitions(self):
+        call_command('assembly_history_partitions', 'create', stdout=StringIO())
+        queryset = AssemblyHistory.objects.filter(date__gte=date(2023, 1, 1), date__lte=date(2023, 1, 31)).order_by('-date', '-id')
+
+        plan = queryset.explain()
+        self.assertIn('manufacturing_assemblyhistory_2023_01', plan)
+        self.assertNotIn('manufacturing_assemblyhistory_2023_02', plan)
+        self.assertNotIn('manufacturing_assemblyhistory_default', plan)
+        self.assertEqual(list(queryset), [self.history[0]])
+
+    def test_archive_and_restore_a_month(self):
+        call_command('assembly_history_partitions', 'create', stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('assembly_history_partitions', 'archive', '--before=2023-02', f'--directory={directory}', stdout=StringIO())
+            self.assertFalse(AssemblyHistory.objects.filter(id=self.history[0].id).exists())
+            self.assertFalse(AssemblyUsedPart.objects.filter(history_id=self.history[0].id).exists())
+            self.assertEqual(AssemblyHistory.objects.count(), 2)
+
+            call_command('assembly_history_partitions', 'restore', '--month=2023-01', f'--directory={directory}', stdout=StringIO())
+
+        self.assertEqual(AssemblyHistory.objects.get(id=self.history[0].id).date, date(2023, 1, 15))
+        self.assertEqual(AssemblyUsedPart.objects.filter(history_id=self.history[0].id).count(), 2)
+        self.assertEqual(AssemblyHistory.objects.count(), 3)
+
+
+class BuildableSolverTests(SimpleTestCase):
+    def test_max_buildable_reports_bottleneck(self):
+        matrix = InventoryMatrix(
+            [(1, 10, 1), (1, 11, 2), (2, 10, 1), (2, 12, 1)],
+            [(1, 10, 5), (1, 11, 5), (2, 12, 9), (9, 10, 100)],
+        )
+
+        counts, limiting_part_ids = max_buildable(matrix)
+
+        self.assertEqual(matrix.plane_ids.tolist(), [1, 2])
+        self.assertEqual(counts.tolist(), [2, 0])
+        self.assertEqual(limiting_part_ids.tolist(), [11, 10])
+
+    def test_joint_allocation_is_max_min_fair(self):
+        # Part 10 is shared by every model, plane 3 also depends on part 12 only
+        matrix = InventoryMatrix(
+            [(1, 10, 1), (2, 10, 1), (2, 11, 1), (3, 12, 1)],
+            [(1, 10, 3), (2, 10, 2), (2, 11, 50), (3, 12, 7)],
+        )
+
+        self.assertEqual(joint_allocation(matrix).tolist(), [3, 2, 7])
+
+    def test_joint_allocation_never_exceeds_the_pool(self):
+        matrix = InventoryMatrix(
+            [(1, 10, 2), (2, 10, 1), (3, 10, 1), (3, 11, 1)],
+            [(1, 10, 3), (2, 10, 2), (3, 11, 50)],
+        )
+
+        allocation = joint_allocation(matrix)
+
+        self.assertEqual(allocation.tolist(), [1, 2, 1])
+        self.assertLessEqual(allocation[0] * 2 + allocation[1] + allocation[2], 5)
+
+    def test_joint_allocation_leaves_no_plane_to_build(self):
+        rng = np.random.default_rng(0)
+        bom = [(plane, part, int(rng.integers(1, 4))) for plane in range(1, 201) for part in rng.choice(50, 5, replace=False) + 1]
+        matrix = InventoryMatrix(bom, [(plane, part, int(rng.integers(0, 60))) for plane, part, quantity in bom])
+
+        allocation = joint_allocation(matrix)
+
+        # The pool is never exceeded and no model could take one more plane from what is left
+        pool = np.bincount(matrix.cols, weights=matrix.stock)
+        left = pool - np.bincount(matrix.cols, weights=allocation[matrix.rows] * matrix.required)
+        self.assertGreaterEqual(left.min(), 0)
+        fits = np.minimum.reduceat(left[matrix.cols] >= matrix.required, matrix.starts)
+        self.assertFalse(fits.any())
+
+
+class PlaneBuildableViewTests(TestCase):
+    def test_lists_buildable_planes(self):
+        assembly_team, parts, plane = create_catalog()
+        user = CustomUser.objects.create_user(username='assembler', password='pass', department=assembly_team)
+        for inventory, part in zip((4, 3, 9, 9), parts):
+            PartsInventory.objects.create(plane=plane, part=part, inventory=inventory)
+
+        response = authenticated_client(user).get('/plane/buildable?shared=true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data'], [{
+            'plane_id': plane.id,
+            'plane_name': 'TB2',
+            'buildable': 3,
+            'limiting_part_id': parts[1].id,
+            'limiting_part_name': 'Part 1',
+            'shared_allocation': 3,
+        }])
+
+    def test_shared_is_parsed_strictly(self):
+        assembly_team, parts, plane = create_catalog()
+        client = authenticated_client(CustomUser.objects.create_user(username='assembler', password='pass', department=assembly_team))
+
+        self.assertNotIn('shared_allocation', client.get('/plane/buildable?shared=false').data['data'][0])
+        self.assertEqual(client.get('/plane/buildable?shared=maybe').status_code, 400)
+
+
+class PlaneManufacturingConcurrencyTests(TransactionTestCase):
+    stations = 12
+    stock = 5
+
+    def setUp(self):
+        assembly_team, self.parts, self.plane = create_catalog()
+        self.user = CustomUser.objects.create_user(username='assembler', password='pass', department=assembly_team)
+        for part in self.parts:
+            PartsInventory.objects.create(plane=self.plane, part=part, inventory=self.stock)
+
+    def test_concurrent_assemblies_never_oversell(self):
+        barrier = threading.Barrier(self.stations)
+        status_codes = []
+
+        def station():
+            client = authenticated_client(self.user)
+            try:
+                barrier.wait()
+                response = client.post('/plane/create', {'plane_id': self.plane.id}, format='json')
+                status_codes.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=station) for _ in range(self.stations)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(status_codes.count(200), self.stock)
+        self.assertEqual(status_codes.count(400), self.stations - self.stock)
+        self.assertEqual(list(PartsInventory.objects.values_list('inventory', flat=True).distinct()), [0])
+        self.assertEqual(PlanesInventory.objects.get(plane=self.plane).inventory, self.stock)
+        self.assertEqual(AssemblyHistory.objects.count(), self.stock)
+
+    @override_settings(ASSEMBLY_ORDERS_MAX_IN_FLIGHT=stock)
+    def test_concurrent_orders_never_exceed_the_in_flight_limit(self):
+        barrier = threading.Barrier(self.stations)
+        status_codes = []
+
+        def station():
+            client = authenticated_client(self.user)
+            try:
+                barrier.wait()
+                response = client.post('/plane/order', {'plane_id': self.plane.id}, format='json')
+                status_codes.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=station) for _ in range(self.stations)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(status_codes.count(202), self.stock)
+        self.assertEqual(status_codes.count(429), self.stations - self.stock)
+        self.assertEqual(AssemblyOrder.objects.count(), self.stock)
+
+    def test_worker_processes_drain_the_queue_once(self):
+        orders = AssemblyOrder.objects.bulk_create([AssemblyOrder(plane=self.plane) for _ in range(self.stations)])
+
+        call_command('assembly_worker', processes=3, once=True)
+
+        statuses = list(AssemblyOrder.objects.filter(id__in=[o.id for o in orders]).values_list('status', flat=True))
+        self.assertEqual(statuses.count(AssemblyOrder.DONE), self.stock)
+        self.assertEqual(statuses.count(AssemblyOrder.FAILED), self.stations - self.stock)
+        self.assertEqual(PlanesInventory.objects.get(plane=self.plane).inventory, self.stock)
+        self.assertEqual(AssemblyHistory.objects.count(), self.stock)
@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from .views import PartManufacturingView, PlaneManufacturingView, PartManufacturerInfoView, PartManufacturerRecycleView, \
-    PlaneManufacturerInfoView, PlaneManufacturerRecycle, AssembleHistoryView
+from .async_views import AsyncAssembleHistoryView, AsyncPartManufacturerInfoView, AsyncPlaneManufacturerInfoView
+from .views import PartManufacturingView, PartBatchManufacturingView, PlaneManufacturingView, PlaneBatchManufacturingView, PartManufacturerInfoView, \
+    PartManufacturerRecycleView, PlaneManufacturerInfoView, PlaneManufacturerRecycle, PlaneBuildableView, PlaneOrderView, \
+    PlaneOrderStatusView, AssembleHistoryView, AssembleHistoryExportView, ProductionAnalyticsView
 
 urlpatterns = [
     # Team Crud Operations
@@ -8,14 +11,23 @@ urlpatterns = [
 
     # part creation teams
     path('part/create', PartManufacturingView.as_view(), name='part-manufacturing'),
-    path('part/list', PartManufacturerInfoView.as_view(), name='part-list'),
+    path('part/create-batch', PartBatchManufacturingView.as_view(), name='part-manufacturing-batch'),
+    path('part/list', (AsyncPartManufacturerInfoView if settings.ASYNC_READ_VIEWS else PartManufacturerInfoView).as_view(), name='part-list'),
     path('part/recycle', PartManufacturerRecycleView.as_view(), name='part-recycle'),
 
     # plane assembly team
     path('plane/create', PlaneManufacturingView.as_view(), name='plane-manufacturing'),
-    path('plane/list', PlaneManufacturerInfoView.as_view(), name='plane-list'),
+    path('plane/create-batch', PlaneBatchManufacturingView.as_view(), name='plane-manufacturing-batch'),
+    path('plane/order', PlaneOrderView.as_view(), name='plane-order'),
+    path('plane/order/<int:order_id>', PlaneOrderStatusView.as_view(), name='plane-order-status'),
+    path('plane/list', (AsyncPlaneManufacturerInfoView if settings.ASYNC_READ_VIEWS else PlaneManufacturerInfoView).as_view(), name='plane-list'),
     path('plane/recycle', PlaneManufacturerRecycle.as_view(), name='plane-recycle'),
+    path('plane/buildable', PlaneBuildableView.as_view(), name='plane-buildable'),
 
 
-    path('plane/assemble-history', AssembleHistoryView.as_view() ,name='manufacturing-assemble-history'),
+    path('plane/assemble-history', (AsyncAssembleHistoryView if settings.ASYNC_READ_VIEWS else AssembleHistoryView).as_view(), name='manufacturing-assemble-history'),
+    path('plane/assemble-history/export', AssembleHistoryExportView.as_view(), name='manufacturing-assemble-history-export'),
+
+    # production dashboards
+    path('analytics/production', ProductionAnalyticsView.as_view(), name='production-analytics'),
 ]
\ No newline at end of file
@@ -0,0 +1,117 @@
+import contextlib
+import functools
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from mfgProject.routers import replica_reads
+
+# Version counters of the data behind the read endpoints, one Postgres sequence each. A sequence
+# takes no row lock, so bumping one never makes concurrent writers wait on each other.
+CATALOG = 'catalog'      # departments, parts, planes and bills of materials
+INVENTORY = 'inventory'  # parts and planes inventories
+HISTORY = 'history'      # assembly history
+
+
+def sequence_name(name):
+    return f'manufacturing_{name}_version'
+
+
+def changed(*names):
+    """
+    Bumps the version counters of `names` once the current transaction commits, or right away
+    outside of one. Bumping after the commit means that a reader never tags data older than the
+    version it read.
+    """
+    def bump():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT ' + ', '.join(f"nextval('{sequence_name(name)}')" for name in names))
+
+    transaction.on_commit(bump)
+
+
+def current_versions(names):
+    """Returns the version counters of `names`, in order, with one query."""
+    with connection.cursor() as cursor:
+        # A sequence nothing was taken from yet also reports its start value, with is_called false
+        cursor.execute('SELECT ' + ', '.join(
+            f'(SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {sequence_name(name)})' for name in names
+        ))
+        return cursor.fetchone()
+
+
+# Value of every version counter last read by this process, with when it first read that value
+_seen = {}
+
+
+def unchanged_for(names, versions):
+    """
+    Returns for how many seconds this process has read the same `versions` of the counters of
+    `names`, 0 when one of them changed since it last read it. The data changed at least that
+    long ago, other processes may have seen the change earlier but never later.
+    """
+    now = time.monotonic()
+    changed_at = 0
+    for name, value in zip(names, versions):
+        seen = _seen.get(name)
+        if seen is None or seen[0] != value:
+            seen = _seen[name] = (value, now)
+        changed_at = max(changed_at, seen[1])
+    return now - changed_at
+
+
+def versioned_reads(names, versions):
+    """
+    Returns the context to read the data versioned by `names` in: from the read replica once
+    `versions` have not changed for DATABASE_REPLICA_MAX_LAG seconds, so the replica has caught up
+    with them, from the primary otherwise. Writes bump the counters, so the reads following one,
+    the writer's included, stay on the primary until the replica has replayed it.
+    """
+    if settings.DATABASE_READ_REPLICA and unchanged_for(names, versions) >= settings.DATABASE_REPLICA_MAX_LAG:
+        return replica_reads()
+    return contextlib.nullcontext()
+
+
+def catalog_changed(**kwargs):
+    changed(CATALOG)
+
+
+def version_etag(user, versions):
+    """The ETag of `conditional`: the version counters read for its names and the user's id and department."""
+    return '-'.join(str(value) for value in (*versions, user.id, user.department_id))
+
+
+def patch_revalidation(response):
+    # The responses depend on the user and must be revalidated before being reused
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+
+
+def conditional(*names):
+    """
+    Makes a GET view method answer conditional requests. Its ETag is made of the version
+    counters of `names` and of the user's id and department, so a request with a matching
+    If-None-Match gets a 304 after a single query, before the view runs. The responses are
+    marked for revalidation, so browsers send If-None-Match on their own.
+
+    The counters are always read from the primary, the view reads from the replica when
+    `versioned_reads` allows it.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            versions = current_versions(names)
+
+            def etag(request, *args, **kwargs):
+                return version_etag(request.user, versions)
+
+            with versioned_reads(names, versions):
+                response = condition(etag_func=etag)(functools.partial(view_method, self))(request, *args, **kwargs)
+            patch_revalidation(response)
+            return response
+        return wrapper
+
+    return decorator
@@ -1,23 +1,55 @@
-from rest_framework import status
+import base64
+import csv
+import io
+import json
+from datetime import date
+
+from rest_framework import serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from personnel.authentication import ClaimsJWTAuthentication
 
-from parts.models import Parts, PartsInventory
-from planes.models import Planes, PlanesInventory
+from parts.inventory import fold_parts_inventory_deltas, increment_parts_inventory, pending_parts_inventory
+from parts.models import PartsInventory
+from parts.names import get_part_name, get_part_names
+from planes.models import BillOfMaterials, PlanesInventory
+from planes.names import get_plane_name, get_plane_names
 from personnel.models import CustomUser
-from .models import AssemblyHistory
-from django.db import models
+from departments.capabilities import get_capabilities, get_department_capabilities
+from departments.permissions import CanAssemble, MakesParts
+from .models import AssemblyHistory, AssemblyOrder, AssemblyUsedPart, DailyPartConsumption, DailyPlaneProduction, InventoryMovement
+from .assembly import AssemblyError, assemble_plane, assemble_planes
+from .buildable import InventoryMatrix, joint_allocation, max_buildable
+from .idempotency import idempotency_key_parameter, idempotent
+from .ledger import record_movements
+from .orders import queue_order
+from .versions import CATALOG, HISTORY, INVENTORY, conditional
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 
+def parse_flag(value):
+    """Returns a boolean request field as a bool ('true', 'false', 1, 0...), None when it is not one."""
+    try:
+        return serializers.BooleanField().to_internal_value(value)
+    except serializers.ValidationError:
+        return None
+
+
 # PLANE ASSEMBLY TEAM CRUD VIEWS
 class PlaneManufacturingView(APIView):
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [CanAssemble]
 
     @swagger_auto_schema(
         operation_description="Attempts to manufacture a plane based on the specified `plane_id`. The user must be part of the 'Assembly Team' to perform this operation.",
@@ -46,94 +78,291 @@ class PlaneManufacturingView(APIView):
             ),
             404: openapi.Response(
                 description="Plane not found.",
+            ),
+            409: openapi.Response(
+                description="Conflict. The parts were consumed by a concurrent assembly.",
             )
-        }
+        },
+        manual_parameters=[idempotency_key_parameter]
     )
 
+    @idempotent
     def post(self, request):
-        user = request.user
         plane_id = request.data.get('plane_id')
 
         # Validate the plane_id
         if not plane_id:
             return Response({'status': False, 'error': 'plane_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if the user is in the 'Assembly Team'
-        if user.department is None or user.department.name != 'Assembly Team':
-            return Response({'status': False, 'error': 'User is not part of the Assembly Team.'}, status=status.HTTP_403_FORBIDDEN)
-
-        # Check if the plane exists
-        try:
-            plane = Planes.objects.get(id=plane_id)
-        except Planes.DoesNotExist:
-            return Response({'status': False, 'error': 'Plane not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Parse the required parts
+        # Assemble the plane in a single transaction
         try:
-            required_parts = eval(plane.required_parts)  # Assuming required_parts is a string like "(1, 2, 3, 4)"
-        except Exception as e:
-            return Response({'status': False, 'error': 'Failed to parse required parts.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Check if all required parts are available in the inventory for the specified plane
-        insufficient_parts = []
-        for part_id in required_parts:
-            # Get all inventory records for the specified part and plane
-            parts_inventories = PartsInventory.objects.filter(part_id=part_id, plane_id=plane_id)
-
-            # Sum the inventory across all records for the specified plane
-            total_inventory = sum(p.inventory for p in parts_inventories)
-
-            if total_inventory < 1:
-                insufficient_parts.append(part_id)
-
-        if insufficient_parts:
-            # Retrieve the names of the insufficient parts
-            part_names = [Parts.objects.get(id=part_id).name for part_id in insufficient_parts]
-            # Construct the error message
-            error_message = f"There is no {', '.join(part_names)} to create {plane.name}."
-            return Response({
-                'status': False,
-                'error': error_message
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Decrement inventory for all required parts for the specified plane
-        used_parts = []
-        for part_id in required_parts:
-            # Get all inventory records for the specified part and plane and decrement one by one
-            parts_inventories = PartsInventory.objects.filter(part_id=part_id, plane_id=plane_id)
-
-            for parts_inventory in parts_inventories:
-                if parts_inventory.inventory > 0:
-                    parts_inventory.inventory -= 1
-                    parts_inventory.save()
-                    used_parts.append(part_id)
-                    break  # Stop once we've decremented the inventory for this part
-
-        # Increment the plane's inventory
-        plane_inventory, created = PlanesInventory.objects.get_or_create(plane=plane, defaults={'inventory': 0})
-        plane_inventory.inventory += 1
-        plane_inventory.save()
-
-        # Record the assembly history
-        AssemblyHistory.objects.create(
-            used_parts=str(used_parts),
-            plane=plane
-        )
+            plane, new_inventory, used_parts = assemble_plane(plane_id)
+        except AssemblyError as e:
+            return Response({'status': False, 'error': e.message}, status=e.status_code)
 
         # Construct the response
         data = {
             'status': True,
             'message': f"Successfully manufactured a '{plane.name}'",
             'plane_id': plane_id,
-            'new_inventory': plane_inventory.inventory,
+            'new_inventory': new_inventory,
             'used_parts': used_parts
         }
 
         return Response(data, status=status.HTTP_200_OK)
 
+class PlaneBatchManufacturingView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [CanAssemble]
+
+    @swagger_auto_schema(
+        operation_description="Manufactures several planes in one request. The body is either a single `{plane_id, quantity}` object, "
+                              "a list of such objects, or `{items: [...], allow_partial: bool}`. Every item is assembled in its own "
+                              "transaction. Without `allow_partial` an item is built in full or not at all; with `allow_partial` as many "
+                              "planes as the inventory allows are built, up to `quantity`. The user must be part of the 'Assembly Team'.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'items': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'plane_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the plane to be manufactured'),
+                            'quantity': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of planes to manufacture'),
+                            'allow_partial': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Overrides the request level `allow_partial`'),
+                        },
+                        required=['plane_id', 'quantity'],
+                    ),
+                ),
+                'allow_partial': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Build as many planes as possible when the inventory is short. Defaults to false.'),
+            },
+        ),
+        responses={
+            200: openapi.Response(
+                description="The batch was processed. `status` is true only if every item was built in full.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='True if every requested plane was built'),
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'plane_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the plane'),
+                                    'requested': openapi.Schema(type=openapi.TYPE_INTEGER, description='Requested quantity'),
+                                    'built': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of planes built'),
+                                    'result': openapi.Schema(type=openapi.TYPE_STRING, description="'built', 'partial' or 'failed'"),
+                                    'new_inventory': openapi.Schema(type=openapi.TYPE_INTEGER, description='Updated inventory of the plane'),
+                                    'error': openapi.Schema(type=openapi.TYPE_STRING, description='Why the item was not built'),
+                                }
+                            ),
+                        ),
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Bad request. The body is malformed or an item has an invalid `plane_id`, `quantity` or `allow_partial`.",
+            ),
+            403: openapi.Response(
+                description="Forbidden. The user is not authorized to manufacture planes.",
+            ),
+        }
+    )
+
+    def post(self, request):
+        # Accept a single item, a list of items or an object wrapping the items
+        allow_partial = False
+        if isinstance(request.data, list):
+            items = request.data
+        elif 'items' in request.data:
+            items = request.data.get('items')
+            allow_partial = parse_flag(request.data.get('allow_partial', False))
+        else:
+            items = [request.data]
+            allow_partial = parse_flag(request.data.get('allow_partial', False))
+
+        if not isinstance(items, list) or not items:
+            return Response({'status': False, 'error': 'At least one item is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if allow_partial is None:
+            return Response({'status': False, 'error': 'allow_partial must be a boolean.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Validate every item before building anything
+        orders = []
+        for item in items:
+            if not isinstance(item, dict) or not item.get('plane_id'):
+                return Response({'status': False, 'error': 'plane_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                quantity = int(item.get('quantity', 1))
+            except (TypeError, ValueError):
+                quantity = 0
+            if quantity < 1:
+                return Response({'status': False, 'error': 'quantity must be a positive integer.'}, status=status.HTTP_400_BAD_REQUEST)
+            item_allow_partial = parse_flag(item.get('allow_partial', allow_partial))
+            if item_allow_partial is None:
+                return Response({'status': False, 'error': 'allow_partial must be a boolean.'}, status=status.HTTP_400_BAD_REQUEST)
+            orders.append((item['plane_id'], quantity, item_allow_partial))
+
+        # Assemble every item in its own transaction
+        results = []
+        for plane_id, quantity, item_allow_partial in orders:
+            try:
+                plane, built, new_inventory, used_parts = assemble_planes(plane_id, quantity, allow_partial=item_allow_partial)
+            except AssemblyError as e:
+                results.append({
+                    'plane_id': plane_id,
+                    'requested': quantity,
+                    'built': 0,
+                    'result': 'failed',
+                    'error': e.message,
+                })
+                continue
+
+            results.append({
+                'plane_id': plane_id,
+                'plane_name': plane.name,
+                'requested': quantity,
+                'built': built,
+                'result': 'built' if built == quantity else 'partial',
+                'new_inventory': new_inventory,
+                'used_parts': used_parts,
+            })
+
+        # Construct the response
+        data = {
+            'status': all(result['result'] == 'built' for result in results),
+            'results': results,
+        }
+
+        return Response(data, status=status.HTTP_200_OK)
+
+class PlaneOrderView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [CanAssemble]
+
+    @swagger_auto_schema(
+        operation_description="Queues an assembly order and returns its id right away. The order is assembled by the `assembly_worker` "
+                              "management command, poll `plane/order/<order_id>` for its status. The user must be part of the 'Assembly Team'.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'plane_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the plane to be manufactured'),
+                'quantity': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of planes to manufacture, defaults to 1'),
+                'allow_partial': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Build as many planes as possible when the inventory is short'),
+            },
+            required=['plane_id'],
+        ),
+        responses={
+            202: openapi.Response(
+                description="The order was queued.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Request success status'),
+                        'order_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the assembly order'),
+                        'order_status': openapi.Schema(type=openapi.TYPE_STRING, description="Always 'pending'"),
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Bad request. Missing `plane_id`, invalid `quantity` or `allow_partial`.",
+            ),
+            403: openapi.Response(
+                description="Forbidden. The user is not authorized to manufacture planes.",
+            ),
+            404: openapi.Response(
+                description="Plane not found.",
+            ),
+            429: openapi.Response(
+                description="Too many orders are waiting for a worker, retry later.",
+            )
+        }
+    )
+
+    def post(self, request):
+        user = request.user
+        plane_id = request.data.get('plane_id')
+
+        # Validate the input parameters
+        if not plane_id:
+            return Response({'status': False, 'error': 'plane_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            quantity = int(request.data.get('quantity', 1))
+        except (TypeError, ValueError):
+            quantity = 0
+        if quantity < 1:
+            return Response({'status': False, 'error': 'quantity must be a positive integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        allow_partial = parse_flag(request.data.get('allow_partial', False))
+        if allow_partial is None:
+            return Response({'status': False, 'error': 'allow_partial must be a boolean.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Check if the plane exists, from the cached plane names
+        if get_plane_name(plane_id) is None:
+            return Response({'status': False, 'error': 'Plane not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Refuse new orders while the workers are behind
+        order = queue_order(plane_id=plane_id, quantity=quantity, allow_partial=allow_partial, requested_by_id=user.id)
+        if order is None:
+            return Response({'status': False, 'error': 'Too many assembly orders in flight, retry later.'}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        return Response({'status': True, 'order_id': order.id, 'order_status': order.status}, status=status.HTTP_202_ACCEPTED)
+
+class PlaneOrderStatusView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [CanAssemble]
+
+    @swagger_auto_schema(
+        operation_description="Returns the status of an assembly order. The user must be part of the 'Assembly Team'.",
+        responses={
+            200: openapi.Response(
+                description="The order status.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Request success status'),
+                        'order_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the assembly order'),
+                        'order_status': openapi.Schema(type=openapi.TYPE_STRING, description="'pending', 'done' or 'failed'"),
+                        'plane_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the plane'),
+                        'quantity': openapi.Schema(type=openapi.TYPE_INTEGER, description='Requested quantity'),
+                        'built': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of planes built'),
+                        'error': openapi.Schema(type=openapi.TYPE_STRING, description='Why the order failed'),
+                    }
+                )
+            ),
+            403: openapi.Response(
+                description="Forbidden. The user is not part of the Assembly Team.",
+            ),
+            404: openapi.Response(
+                description="Order not found.",
+            )
+        }
+    )
+
+    def get(self, request, order_id):
+        try:
+            order = AssemblyOrder.objects.get(id=order_id)
+        except AssemblyOrder.DoesNotExist:
+            return Response({'status': False, 'error': 'Order not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        data = {
+            'status': True,
+            'order_id': order.id,
+            'order_status': order.status,
+            'plane_id': order.plane_id,
+            'quantity': order.quantity,
+            'built': order.built,
+            'error': order.error,
+            'created_at': order.created_at,
+            'finished_at': order.finished_at,
+        }
+
+        return Response(data, status=status.HTTP_200_OK)
+
 class PlaneManufacturerInfoView(APIView):
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [CanAssemble]
 
     @swagger_auto_schema(
         operation_description="Returns a list of all planes and their inventory for users who are part of the 'Assembly Team'.",
@@ -187,38 +416,127 @@ class PlaneManufacturerInfoView(APIView):
     )
 
 
+    @conditional(CATALOG, INVENTORY)
     def get(self, request):
         user = request.user
 
-        # Check if the user's department is "Assembly Team"
-        if user.department is None or user.department.name != 'Assembly Team':
-            return Response({'status': False, 'error': 'User is not part of the Assembly Team.'}, status=status.HTTP_403_FORBIDDEN)
+        # Fetch all planes and their inventory in one query
+        planes = self.planes_query()
+
+        return Response(self.response_data(planes, user.department.name), status=status.HTTP_200_OK)
 
-        # Fetch all planes and their inventory
-        planes = PlanesInventory.objects.all()
+    @staticmethod
+    def planes_query():
+        return PlanesInventory.objects.order_by('plane_id').values_list('plane_id', 'plane__name', 'inventory')
 
+    @staticmethod
+    def response_data(planes, department_name):
         # Prepare the response data
         data = []
-        for plane_inventory in planes:
+        for plane_id, plane_name, inventory in planes:
             plane_data = {
-                'plane_id': plane_inventory.plane.id,
-                'plane_name': plane_inventory.plane.name,
-                'plane_inventory': plane_inventory.inventory
+                'plane_id': plane_id,
+                'plane_name': plane_name,
+                'plane_inventory': inventory
             }
             data.append(plane_data)
 
         # Construct the final response
-        response_data = {
+        return {
             'status': True,
-            'department_name': user.department.name,
+            'department_name': department_name,
             'data': data
         }
 
-        return Response(response_data, status=status.HTTP_200_OK)
+class PlaneBuildableView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [CanAssemble]
+
+    @swagger_auto_schema(
+        operation_description="Returns how many planes of every model can be built from the current parts inventory and which part limits each model. "
+                              "With `shared=true` the stock of every part is pooled across the models and allocated fairly between the models competing for it. "
+                              "The user must be part of the 'Assembly Team'.",
+        manual_parameters=[
+            openapi.Parameter(
+                'shared',
+                openapi.IN_QUERY,
+                description="Also compute the joint allocation of a shared parts pool. Adds tens of milliseconds on catalogs of thousands of models sharing their parts.",
+                type=openapi.TYPE_BOOLEAN,
+                required=False
+            ),
+            openapi.Parameter(
+                'Authorization',
+                openapi.IN_HEADER,
+                description="JWT Authorization header. Format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ],
+        responses={
+            200: openapi.Response(
+                description="Successfully computed the buildable planes.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Request success status'),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'plane_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the plane'),
+                                    'plane_name': openapi.Schema(type=openapi.TYPE_STRING, description='Name of the plane'),
+                                    'buildable': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of planes that can be built'),
+                                    'limiting_part_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the bottleneck part'),
+                                    'limiting_part_name': openapi.Schema(type=openapi.TYPE_STRING, description='Name of the bottleneck part'),
+                                    'shared_allocation': openapi.Schema(type=openapi.TYPE_INTEGER, description='Planes allocated from the shared pool, only with `shared=true`'),
+                                }
+                            ),
+                        )
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Bad request. `shared` is not a boolean.",
+            ),
+            403: openapi.Response(
+                description="Forbidden. The user is not part of the Assembly Team.",
+            )
+        }
+    )
+
+    def get(self, request):
+        shared = parse_flag(request.query_params.get('shared', False))
+        if shared is None:
+            return Response({'status': False, 'error': 'shared must be a boolean.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Solve over the whole inventory matrix
+        matrix = InventoryMatrix.from_database()
+        counts, limiting_part_ids = max_buildable(matrix)
+        allocation = joint_allocation(matrix) if shared else None
+
+        plane_names = get_plane_names()
+        part_names = get_part_names()
+
+        # Prepare the response data
+        data = []
+        for index, plane_id in enumerate(matrix.plane_ids.tolist()):
+            plane_data = {
+                'plane_id': plane_id,
+                'plane_name': plane_names.get(plane_id),
+                'buildable': int(counts[index]),
+                'limiting_part_id': int(limiting_part_ids[index]),
+                'limiting_part_name': part_names.get(int(limiting_part_ids[index])),
+            }
+            if allocation is not None:
+                plane_data['shared_allocation'] = int(allocation[index])
+            data.append(plane_data)
+
+        return Response({'status': True, 'data': data}, status=status.HTTP_200_OK)
 
 class PlaneManufacturerRecycle(APIView):
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [CanAssemble]
 
     @swagger_auto_schema(
         operation_description="Recycles one unit of the specified plane from the inventory for users who are part of the 'Assembly Team'.",
@@ -279,42 +597,41 @@ class PlaneManufacturerRecycle(APIView):
                 description="JWT Authorization header. Format: Bearer <token>",
                 type=openapi.TYPE_STRING,
                 required=True
-            )
+            ),
+            idempotency_key_parameter,
         ]
     )
 
+    @idempotent
     def delete(self, request):
-        user = request.user
         plane_id = request.data.get('plane_id')
 
         # Validate the input parameter
         if not plane_id:
             return Response({'status': False, 'error': 'plane_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if the user is in the "Assembly Team" department
-        if user.department is None or user.department.name != 'Assembly Team':
-            return Response({'status': False, 'error': 'User is not part of the Assembly Team.'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Get the plane name from the Planes model
-        try:
-            plane = Planes.objects.get(id=plane_id)
-            plane_name = plane.name
-        except Planes.DoesNotExist:
+        # Get the plane name from the cached plane names
+        plane_name = get_plane_name(plane_id)
+        if plane_name is None:
             return Response({'status': False, 'error': f'Plane with ID {plane_id} does not exist.'}, status=status.HTTP_404_NOT_FOUND)
+        plane_id = int(plane_id)
 
-        # Check if the plane exists in the inventory
-        try:
-            plane_inventory = PlanesInventory.objects.get(plane_id=plane_id)
-        except PlanesInventory.DoesNotExist:
-            return Response({'status': False, 'error': f'{plane_name} not found in inventory.'}, status=status.HTTP_404_NOT_FOUND)
+        with transaction.atomic():
+            # Lock the plane's inventory row
+            try:
+                plane_inventory = PlanesInventory.objects.select_for_update().get(plane_id=plane_id)
+            except PlanesInventory.DoesNotExist:
+                return Response({'status': False, 'error': f'{plane_name} not found in inventory.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Check if there is any inventory to recycle
-        if plane_inventory.inventory <= 0:
-            return Response({'status': False, 'error': f'No {plane_name} to recycle.'}, status=status.HTTP_400_BAD_REQUEST)
+            # Check if there is any inventory to recycle
+            if plane_inventory.inventory <= 0:
+                return Response({'status': False, 'error': f'No {plane_name} to recycle.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Decrement the inventory
-        plane_inventory.inventory -= 1
-        plane_inventory.save(update_fields=['inventory'])
+            # Decrement the inventory
+            plane_inventory.inventory -= 1
+            plane_inventory.save(update_fields=['inventory'])
+            record_movements([(plane_id, None, -1, InventoryMovement.RECYCLED)])
 
         # Return a success response
         response_data = {
@@ -328,8 +645,8 @@ class PlaneManufacturerRecycle(APIView):
 
 # PART MANUFACTURER TEAM CRUD VIEWS
 class PartManufacturingView(APIView):
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [MakesParts]
 
 
     @swagger_auto_schema(
@@ -400,10 +717,12 @@ class PartManufacturingView(APIView):
                 description="JWT Authorization header. Format: Bearer <token>",
                 type=openapi.TYPE_STRING,
                 required=True
-            )
+            ),
+            idempotency_key_parameter,
         ]
     )
 
+    @idempotent
     def post(self, request):
         user = request.user
         plane_id = request.data.get('plane_id')
@@ -417,54 +736,157 @@ class PartManufacturingView(APIView):
         if not request.auth:
             return Response({'error': 'Authentication token is required.'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        # Check if the part exists
-        try:
-            part = Parts.objects.get(id=part_id)
-        except Parts.DoesNotExist:
+        # Check if the part exists, from the cached part names
+        part_name = get_part_name(part_id)
+        if part_name is None:
             return Response({'error': 'Part not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Check if the plane exists
-        try:
-            plane = Planes.objects.get(id=plane_id)
-        except Planes.DoesNotExist:
+        # Check if the plane exists, from the cached plane names
+        plane_name = get_plane_name(plane_id)
+        if plane_name is None:
             return Response({'error': 'Plane not found.'}, status=status.HTTP_404_NOT_FOUND)
 
         # Check if the user has access to the part (based on department)
-        if user.department is None or user.department.id != part.department.id:
+        if not get_department_capabilities(user.department_id).can_use_parts([int(part_id)]):
             return Response({'error': 'User does not have access to this part.'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Check if a PartsInventory record exists for the given plane and part
-        parts_inventory, created = PartsInventory.objects.get_or_create(
-            plane_id=plane_id,
-            part_id=part_id
-        )
-
-        if created:
-            # If a new record is created, set the inventory to 1
-            parts_inventory.inventory = 1
-            parts_inventory.save()
-        else:
-            # If the record already exists, increment the inventory
-            parts_inventory.inventory += 1
-            parts_inventory.save()
+        # Create or increment the PartsInventory record for the given plane and part
+        key = (int(plane_id), int(part_id))
+        new_inventory = increment_parts_inventory({key: 1})[key]
 
         # Construct the response
         data = {
             'status': 'success',
-            'message': f"Successfully manufactured a '{part.name}' for '{plane.name}'",
+            'message': f"Successfully manufactured a '{part_name}' for '{plane_name}'",
             'plane_id': plane_id,
             'part_id': part_id,
-            'new_inventory': parts_inventory.inventory
+            'new_inventory': new_inventory
+        }
+
+        return Response(data, status=status.HTTP_200_OK)
+
+class PartBatchManufacturingView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [MakesParts]
+
+    @swagger_auto_schema(
+        operation_description="Manufactures several parts in one request, e.g. a department reporting a whole shift. The body is a list of "
+                              "`{plane_id, part_id, quantity}` objects or `{items: [...]}`. Every part must belong to the user's department. "
+                              "The batch is applied all at once or not at all.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'items': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'plane_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the plane'),
+                            'part_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the part to manufacture'),
+                            'quantity': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of parts manufactured, defaults to 1'),
+                        },
+                        required=['plane_id', 'part_id'],
+                    ),
+                ),
+            },
+        ),
+        responses={
+            200: openapi.Response(
+                description="Successfully manufactured the parts.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, description='Operation status'),
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'plane_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the plane'),
+                                    'part_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the part'),
+                                    'quantity': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of parts added'),
+                                    'new_inventory': openapi.Schema(type=openapi.TYPE_INTEGER, description='Updated inventory count for the part'),
+                                }
+                            ),
+                        ),
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Bad request due to missing or invalid items.",
+            ),
+            403: openapi.Response(
+                description="Forbidden. One of the parts does not belong to the user's department.",
+            ),
+            404: openapi.Response(
+                description="Not found. One of the planes or parts does not exist.",
+            )
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                'Authorization',
+                openapi.IN_HEADER,
+                description="JWT Authorization header. Format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ]
+    )
+
+    def post(self, request):
+        user = request.user
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'At least one item is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Validate the items and merge the ones for the same plane and part
+        increments = {}
+        for item in items:
+            try:
+                plane_id, part_id, quantity = int(item['plane_id']), int(item['part_id']), int(item.get('quantity', 1))
+            except (KeyError, TypeError, ValueError):
+                return Response({'error': 'Every item needs an integer plane_id, part_id and quantity.'}, status=status.HTTP_400_BAD_REQUEST)
+            if quantity < 1:
+                return Response({'error': 'quantity must be a positive integer.'}, status=status.HTTP_400_BAD_REQUEST)
+            increments[(plane_id, part_id)] = increments.get((plane_id, part_id), 0) + quantity
+
+        # Check that every part of the batch exists and belongs to the user's department, from the cached part names and capabilities
+        part_ids = {part_id for plane_id, part_id in increments}
+        if not part_ids.issubset(get_part_names()):
+            return Response({'error': 'Part not found.'}, status=status.HTTP_404_NOT_FOUND)
+        if not get_department_capabilities(user.department_id).can_use_parts(part_ids):
+            return Response({'error': 'User does not have access to this part.'}, status=status.HTTP_403_FORBIDDEN)
+
+        # Check if the planes exist, from the cached plane names
+        plane_ids = {plane_id for plane_id, part_id in increments}
+        if not plane_ids.issubset(get_plane_names()):
+            return Response({'error': 'Plane not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Apply every increment with a single upsert
+        new_inventories = increment_parts_inventory(increments)
+
+        data = {
+            'status': 'success',
+            'results': [
+                {
+                    'plane_id': plane_id,
+                    'part_id': part_id,
+                    'quantity': quantity,
+                    'new_inventory': new_inventories[(plane_id, part_id)],
+                }
+                for (plane_id, part_id), quantity in increments.items()
+            ]
         }
 
         return Response(data, status=status.HTTP_200_OK)
 
 class PartManufacturerInfoView(APIView):
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [MakesParts]
 
     @swagger_auto_schema(
-        operation_description="Retrieves information about parts related to the user's department, including the total inventory of relevant parts for each plane. The user must not be in the 'Assembly Team' and must belong to a valid department.",
+        operation_description="Retrieves information about parts related to the user's department, including the total inventory of relevant parts for each plane and the inventory of every department part in each plane's bill of materials. Every plane needing a part of the department is listed, even without inventory. The user must not be in the 'Assembly Team' and must belong to a valid department.",
         responses={
             200: openapi.Response(
                 description="Successfully retrieved part manufacturer information.",
@@ -487,6 +909,21 @@ class PartManufacturerInfoView(APIView):
                                                                  description='Name of the plane'),
                                     'part_count': openapi.Schema(type=openapi.TYPE_INTEGER,
                                                                  description='Total inventory count of relevant parts'),
+                                    'parts': openapi.Schema(
+                                        type=openapi.TYPE_ARRAY,
+                                        items=openapi.Schema(
+                                            type=openapi.TYPE_OBJECT,
+                                            properties={
+                                                'part_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the part'),
+                                                'part_name': openapi.Schema(type=openapi.TYPE_STRING, description='Name of the part'),
+                                                'required_quantity': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                                                                    description='Units of the part one plane needs'),
+                                                'inventory': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                                                            description='Inventory of the part for the plane'),
+                                            }
+                                        ),
+                                        description="The plane's bill of materials entries made by the department"
+                                    ),
                                 }
                             ),
                             description='List of planes with relevant part inventory details'
@@ -516,63 +953,56 @@ class PartManufacturerInfoView(APIView):
         ]
     )
 
+    @conditional(CATALOG, INVENTORY)
     def get(self, request):
         user = request.user
 
-        # Check if the user is not in the Assembly Team and their department is not None or 0
-        if user.department is None or user.department.name == 'Assembly Team':
-            return Response({'status': False, 'error': 'User is either in the Assembly Team or has no valid department.'}, status=status.HTTP_403_FORBIDDEN)
-
-        department_name = user.department.name
-        department_id = user.department.id
+        capabilities = get_department_capabilities(user.department_id)
+        cells = self.cells_query(capabilities.department_id)
 
-        # Fetch the part_id for the user's department
-        try:
-            department_part = Parts.objects.filter(department_id=department_id).first()
-            part_id = department_part.id if department_part else None
-        except Parts.DoesNotExist:
-            part_id = None
+        return Response(self.response_data(capabilities, cells), status=status.HTTP_200_OK)
 
-        # Fetch all planes
-        planes = Planes.objects.all()
+    @staticmethod
+    def cells_query(department_id):
+        # Join the bill of materials entries of the department's parts with their inventory, summed per plane and part
+        return BillOfMaterials.objects.filter(part__department_id=department_id).annotate(
+            stock=models.FilteredRelation('plane__partsinventory', condition=models.Q(plane__partsinventory__part=models.F('part'))),
+        ).values('plane_id', 'plane__name', 'part_id', 'part__name', 'quantity').annotate(
+            total_inventory=Coalesce(models.Sum('stock__inventory'), 0) + pending_parts_inventory(),
+        ).order_by('plane_id', 'part_id')
 
-        # Prepare the response data
+    @staticmethod
+    def response_data(capabilities, cells):
+        # Prepare the response data, one entry per plane with a cell for every part it needs from the department
         data = []
-        for plane in planes:
-            # Parse the required parts for the plane
-            try:
-                required_parts = eval(plane.required_parts)  # Assuming required_parts is a string like "(1, 2, 3, 4)"
-            except Exception:
-                continue  # Skip if there's an error in parsing
-
-            # Filter the parts that belong to the user's department
-            department_parts = Parts.objects.filter(id__in=required_parts, department=user.department)
-
-            # Sum the inventory for the matching parts in PartsInventory
-            part_inventory_total = PartsInventory.objects.filter(part__in=department_parts, plane=plane).aggregate(total_inventory=models.Sum('inventory'))['total_inventory']
-
-            if part_inventory_total and part_inventory_total > 0:
-                # Add plane info to the response
+        for cell in cells:
+            if not data or data[-1]['plane_id'] != cell['plane_id']:
                 data.append({
-                    'plane_id': plane.id,
-                    'plane_name': plane.name,
-                    'part_count': part_inventory_total
+                    'plane_id': cell['plane_id'],
+                    'plane_name': cell['plane__name'],
+                    'part_count': 0,
+                    'parts': []
                 })
+            data[-1]['part_count'] += cell['total_inventory']
+            data[-1]['parts'].append({
+                'part_id': cell['part_id'],
+                'part_name': cell['part__name'],
+                'required_quantity': cell['quantity'],
+                'inventory': cell['total_inventory']
+            })
 
-        # Construct the final response, including the part_id found for the department
-        response_data = {
+        # Construct the final response, including the first part of the department
+        return {
             'status': True,
-            'department_name': department_name,
-            'part_id': part_id,
+            'department_name': capabilities.name,
+            'part_id': min(capabilities.part_ids, default=None),
             'data': data
         }
 
-        return Response(response_data, status=status.HTTP_200_OK)
-
 
 class PartManufacturerRecycleView(APIView):
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [MakesParts]
 
     @swagger_auto_schema(
         operation_description="Recycles one unit of the specified part for a given plane. Decreases the inventory count for the part associated with the plane. The user must have permission to recycle the part.",
@@ -637,10 +1067,12 @@ class PartManufacturerRecycleView(APIView):
                 description="JWT Authorization header. Format: Bearer <token>",
                 type=openapi.TYPE_STRING,
                 required=True
-            )
+            ),
+            idempotency_key_parameter,
         ]
     )
 
+    @idempotent
     def delete(self, request):
         user = request.user
         plane_id = request.data.get('plane_id')
@@ -652,23 +1084,32 @@ class PartManufacturerRecycleView(APIView):
         if not part_id:
             return Response({'status': False, 'error': 'part_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if the PartsInventory entry exists for the given plane and part
         try:
-            parts_inventory = PartsInventory.objects.get(plane_id=plane_id, part_id=part_id)
-        except PartsInventory.DoesNotExist:
-            return Response({'status': False, 'error': 'Part not found in inventory for the specified plane.'}, status=status.HTTP_404_NOT_FOUND)
+            part_id = int(part_id)
+        except (TypeError, ValueError):
+            return Response({'status': False, 'error': 'part_id must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if the user's department matches the part's department
-        if user.department is None or user.department.id != parts_inventory.part.department.id:
+        # Check if the part belongs to the user's department, before touching its inventory
+        if not get_department_capabilities(user.department_id).can_use_parts([part_id]):
             return Response({'status': False, 'error': 'User does not have permission to recycle this part.'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Check if there is any inventory to recycle
-        if parts_inventory.inventory <= 0:
-            return Response({'status': False, 'error': 'There is no part you can recycle.'}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            # Fold the buffered increments of the part, then lock its PartsInventory entry for the given plane
+            fold_parts_inventory_deltas(plane_id=plane_id, part_id=part_id)
+            try:
+                parts_inventory = PartsInventory.objects.select_for_update(of=('self',)).select_related('part', 'plane') \
+                    .get(plane_id=plane_id, part_id=part_id)
+            except PartsInventory.DoesNotExist:
+                return Response({'status': False, 'error': 'Part not found in inventory for the specified plane.'}, status=status.HTTP_404_NOT_FOUND)
+
+            # Check if there is any inventory to recycle
+            if parts_inventory.inventory <= 0:
+                return Response({'status': False, 'error': 'There is no part you can recycle.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Decrement the inventory
-        parts_inventory.inventory -= 1
-        parts_inventory.save()
+            # Decrement the inventory
+            parts_inventory.inventory -= 1
+            parts_inventory.save(update_fields=['inventory'])
+            record_movements([(parts_inventory.plane_id, parts_inventory.part_id, -1, InventoryMovement.RECYCLED)])
 
         # Get part and plane names for the success message
         part_name = parts_inventory.part.name
@@ -685,12 +1126,36 @@ class PartManufacturerRecycleView(APIView):
 
         return Response(response_data, status=status.HTTP_200_OK)
 
+assembly_history_filter_parameters = [
+    openapi.Parameter('plane_id', openapi.IN_QUERY, description="Only the assemblies of this plane", type=openapi.TYPE_INTEGER),
+    openapi.Parameter('part_id', openapi.IN_QUERY, description="Only the assemblies that used this part", type=openapi.TYPE_INTEGER),
+    openapi.Parameter('date_from', openapi.IN_QUERY, description="Only the assemblies on or after this date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+    openapi.Parameter('date_to', openapi.IN_QUERY, description="Only the assemblies on or before this date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+]
+
+
+def filter_assembly_history(assembly_history, query_params):
+    """Applies the assembly history filters of the query string, raises ValueError for an invalid one."""
+    if query_params.get('plane_id'):
+        assembly_history = assembly_history.filter(plane_id=int(query_params['plane_id']))
+    if query_params.get('part_id'):
+        assembly_history = assembly_history.filter(parts_used__part_id=int(query_params['part_id']))
+    if query_params.get('date_from'):
+        assembly_history = assembly_history.filter(date__gte=date.fromisoformat(query_params['date_from']))
+    if query_params.get('date_to'):
+        assembly_history = assembly_history.filter(date__lte=date.fromisoformat(query_params['date_to']))
+    return assembly_history
+
+
 class AssembleHistoryView(APIView):
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [CanAssemble]
+    page_size = 50
+    max_page_size = 500
 
     @swagger_auto_schema(
-        operation_description="Retrieves the assembly history for users who are part of the 'Assembly Team'. The history includes details about planes and the parts used in the assembly.",
+        operation_description="Retrieves the assembly history for users who are part of the 'Assembly Team', newest first. The history includes details about planes and the parts used in the assembly. "
+                              "The history is paginated with a cursor: pass the `next_cursor` of a page as `cursor` to get the next one. `next_cursor` is null on the last page.",
         responses={
             200: openapi.Response(
                 description="Successfully retrieved the assembly history.",
@@ -703,6 +1168,10 @@ class AssembleHistoryView(APIView):
                             items=openapi.Schema(
                                 type=openapi.TYPE_OBJECT,
                                 properties={
+                                    'id': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                                         description='ID of the assembly history record'),
+                                    'plane_id': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                                               description='ID of the plane'),
                                     'plane_name': openapi.Schema(type=openapi.TYPE_STRING,
                                                                  description='Name of the plane'),
                                     'used_parts': openapi.Schema(type=openapi.TYPE_STRING,
@@ -712,7 +1181,19 @@ class AssembleHistoryView(APIView):
                                 }
                             ),
                             description='List of assembly history records'
-                        )
+                        ),
+                        'next_cursor': openapi.Schema(type=openapi.TYPE_STRING, nullable=True,
+                                                      description='Cursor of the next page, null on the last page')
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Bad request due to an invalid filter, limit or cursor.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Operation success status'),
+                        'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message')
                     }
                 )
             ),
@@ -734,45 +1215,373 @@ class AssembleHistoryView(APIView):
                 description="JWT Authorization header. Format: Bearer <token>",
                 type=openapi.TYPE_STRING,
                 required=True
-            )
+            ),
+            *assembly_history_filter_parameters,
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Records per page, 50 by default and 500 at most", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="`next_cursor` of the previous page", type=openapi.TYPE_STRING),
         ]
     )
 
+    @conditional(CATALOG, HISTORY)
     def get(self, request):
-        user = request.user
+        # Build the query of the requested page
+        try:
+            assembly_history, limit = self.page_query(request.query_params)
+        except ValueError as e:
+            return Response({'status': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Fetch one more record than the page size to know if there is a next page
+        page = list(assembly_history[:limit + 1])
 
-        # Check if the user's department is "Assembly Team"
-        if user.department.name != 'Assembly Team':
-            return Response({'status': False, 'error': 'User is not part of the Assembly Team.'}, status=status.HTTP_403_FORBIDDEN)
+        # Fetch the parts used by the whole page with one query, resolving their names from the process cache
+        used_parts = list(self.used_parts_query(page[:limit]))
 
-        # Fetch the assembly history
-        assembly_history = AssemblyHistory.objects.all()
+        return Response(self.page_data(page, limit, used_parts, get_part_names()), status=status.HTTP_200_OK)
+
+    @classmethod
+    def page_query(cls, query_params):
+        """
+        Returns the query of the requested page of the history, newest first, and the page size.
+        Raises ValueError with the error to answer for an invalid parameter.
+        """
+        # Fetch the assembly history, newest first
+        assembly_history = AssemblyHistory.objects.select_related('plane').order_by('-date', '-id')
+
+        # Apply the filters
+        try:
+            assembly_history = filter_assembly_history(assembly_history, query_params)
+            limit = min(int(query_params.get('limit', cls.page_size)), cls.max_page_size)
+        except ValueError:
+            raise ValueError('plane_id, part_id and limit must be integers, date_from and date_to dates (YYYY-MM-DD).')
+        if limit < 1:
+            raise ValueError('limit must be a positive integer.')
+
+        # Continue after the last record of the previous page
+        cursor = query_params.get('cursor')
+        if cursor:
+            try:
+                cursor_date, cursor_id = cls.decode_cursor(cursor)
+            except ValueError:
+                raise ValueError('Invalid cursor.')
+            # The date bound keeps the scan on the index, the rest skips the records of that date already returned
+            assembly_history = assembly_history.filter(
+                models.Q(date__lt=cursor_date) | models.Q(date=cursor_date, id__lt=cursor_id),
+                date__lte=cursor_date,
+            )
+
+        return assembly_history, limit
+
+    @staticmethod
+    def used_parts_query(page):
+        return AssemblyUsedPart.objects.filter(history_id__in=[history.id for history in page]) \
+            .order_by('history_id', 'part_id').values_list('history_id', 'part_id', 'quantity')
+
+    @classmethod
+    def page_data(cls, page, limit, used_part_rows, part_names):
+        """Returns the response of a page fetched with one record more than `limit`, and the parts it used."""
+        next_cursor = cls.encode_cursor(page[limit - 1]) if len(page) > limit else None
+
+        used_parts = {}
+        for history_id, part_id, quantity in used_part_rows:
+            used_parts.setdefault(history_id, []).extend([part_names.get(part_id, str(part_id))] * quantity)
 
         # Prepare the response data
         data = []
-        for history in assembly_history:
-            # Parse the used_parts field assuming it's stored as a string representation of a list (e.g., "[1, 2, 3]")
-            try:
-                used_part_ids = eval(history.used_parts)
-                # Fetch the part names based on the part IDs
-                part_names = Parts.objects.filter(id__in=used_part_ids).values_list('name', flat=True)
-                part_names_list = list(part_names)
-            except Exception:
-                part_names_list = []
-
-            # Add each entry to the response data
+        for history in page[:limit]:
             data.append({
+                'id': history.id,
+                'plane_id': history.plane_id,
                 'plane_name': history.plane.name,
-                'used_parts': ', '.join(part_names_list),
+                'used_parts': ', '.join(used_parts.get(history.id, [])),
                 'date': history.date
             })
 
         # Construct the final response
-        response_data = {
+        return {
             'status': True,
-            'data': data
+            'data': data,
+            'next_cursor': next_cursor
         }
 
-        return Response(response_data, status=status.HTTP_200_OK)
+    @staticmethod
+    def encode_cursor(history):
+        return base64.urlsafe_b64encode(f'{history.date.isoformat()}|{history.id}'.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        # Raises ValueError for anything encode_cursor did not produce
+        cursor_date, cursor_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return date.fromisoformat(cursor_date), int(cursor_id)
+
 
+class AssembleHistoryExportView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [CanAssemble]
+    # Rows fetched from the database cursor at a time, and written to the response at a time
+    chunk_size = 2000
+    content_types = {
+        'csv': 'text/csv',
+        'ndjson': 'application/x-ndjson',
+    }
 
+    @swagger_auto_schema(
+        operation_description="Downloads the whole assembly history, oldest first, as CSV or newline delimited JSON. The file is streamed while it is read from the "
+                              "database, so any history size can be exported. The read holds a database connection and transaction open for the whole "
+                              "download: the export is aborted when the client stops reading for ASSEMBLY_HISTORY_EXPORT_IDLE_TIMEOUT seconds. "
+                              "The user must be part of the 'Assembly Team'.",
+        responses={
+            200: openapi.Response(
+                description="The assembly history file. CSV columns: id, date, plane_id, plane_name, used_parts. "
+                            "NDJSON objects have the same keys, `used_parts` being a list of `{part_id, part_name, quantity}`.",
+            ),
+            400: openapi.Response(
+                description="Bad request due to an invalid type or filter.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Operation success status'),
+                        'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message')
+                    }
+                )
+            ),
+            403: openapi.Response(
+                description="Forbidden. The user is not part of the Assembly Team.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Operation success status'),
+                        'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message')
+                    }
+                )
+            )
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                'Authorization',
+                openapi.IN_HEADER,
+                description="JWT Authorization header. Format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+            openapi.Parameter('type', openapi.IN_QUERY, description="File type, `csv` (default) or `ndjson`", type=openapi.TYPE_STRING),
+            *assembly_history_filter_parameters,
+        ]
+    )
+
+    def get(self, request):
+        export_type = request.query_params.get('type', 'csv')
+        if export_type not in self.content_types:
+            return Response({'status': False, 'error': 'type must be csv or ndjson.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Every row carries its used parts, so that the export is a single query read through a server-side cursor
+        used_parts = AssemblyUsedPart.objects.filter(history=OuterRef('pk')).order_by('part_id')
+        assembly_history = AssemblyHistory.objects.order_by('date', 'id').annotate(
+            plane_name=models.F('plane__name'),
+            used_part_ids=ArraySubquery(used_parts.values('part_id')),
+            used_part_quantities=ArraySubquery(used_parts.values('quantity')),
+        ).values_list('id', 'date', 'plane_id', 'plane_name', 'used_part_ids', 'used_part_quantities')
+        try:
+            assembly_history = filter_assembly_history(assembly_history, request.query_params)
+        except ValueError:
+            return Response({'status': False, 'error': 'plane_id and part_id must be integers, date_from and date_to dates (YYYY-MM-DD).'}, status=status.HTTP_400_BAD_REQUEST)
+
+        write_rows = self.csv_rows if export_type == 'csv' else self.ndjson_rows
+        chunks = self.stream(write_rows, assembly_history)
+        if isinstance(request._request, ASGIRequest):
+            # Under ASGI a sync iterator would be read whole by Django before the first byte is sent
+            chunks = self.async_stream(chunks)
+        response = StreamingHttpResponse(chunks, content_type=self.content_types[export_type])
+        response['Content-Disposition'] = f'attachment; filename="assembly-history.{export_type}"'
+        return response
+
+    def stream(self, write_rows, assembly_history):
+        # The header goes out before the query runs, then the rows in batches as the cursor returns them.
+        # Outside a transaction the server-side cursor would be WITH HOLD, which computes the whole result first.
+        # The transaction stays open for the whole download, the timeouts end it if the client stalls.
+        with transaction.atomic(savepoint=False):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('idle_in_transaction_session_timeout', %s, true), set_config('statement_timeout', %s, true)",
+                    [f'{settings.ASSEMBLY_HISTORY_EXPORT_IDLE_TIMEOUT}s', f'{settings.ASSEMBLY_HISTORY_EXPORT_STATEMENT_TIMEOUT}s'],
+                )
+            rows = assembly_history.iterator(chunk_size=self.chunk_size)
+            yield from write_rows(rows, get_part_names())
+
+    @staticmethod
+    async def async_stream(chunks):
+        # Every chunk is read in the request's sync thread, which holds the cursor's connection
+        next_chunk = sync_to_async(next)
+        try:
+            while (chunk := await next_chunk(chunks, None)) is not None:
+                yield chunk
+        finally:
+            await sync_to_async(chunks.close)()
+
+    def batched(self, lines):
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) == self.chunk_size:
+                yield ''.join(batch)
+                batch = []
+        if batch:
+            yield ''.join(batch)
+
+    def csv_rows(self, rows, part_names):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def line(values):
+            writer.writerow(values)
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return value
+
+        yield line(['id', 'date', 'plane_id', 'plane_name', 'used_parts'])
+        yield from self.batched(
+            line([history_id, history_date.isoformat(), plane_id, plane_name, ', '.join(
+                name for part_id, quantity in zip(part_ids, quantities) for name in [part_names.get(part_id, str(part_id))] * quantity
+            )])
+            for history_id, history_date, plane_id, plane_name, part_ids, quantities in rows
+        )
+
+    def ndjson_rows(self, rows, part_names):
+        yield from self.batched(
+            json.dumps({
+                'id': history_id,
+                'date': history_date.isoformat(),
+                'plane_id': plane_id,
+                'plane_name': plane_name,
+                'used_parts': [
+                    {'part_id': part_id, 'part_name': part_names.get(part_id), 'quantity': quantity}
+                    for part_id, quantity in zip(part_ids, quantities)
+                ],
+            }) + '\n'
+            for history_id, history_date, plane_id, plane_name, part_ids, quantities in rows
+        )
+
+
+class ProductionAnalyticsView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    # Expression grouping the daily rollup rows of each granularity
+    periods = {
+        'day': models.F('date'),
+        'week': TruncWeek('date'),
+        'month': TruncMonth('date'),
+    }
+    # A daily series over longer ranges is too large to serve quickly, and to chart
+    max_daily_range = 366
+
+    @swagger_auto_schema(
+        operation_description="Retrieves the number of planes built per model and the number of parts consumed per department, per day, week or month. "
+                              "The figures are read from daily rollups maintained by the assemblies, so the cost depends on the number of days in the range, "
+                              "not on the size of the assembly history. Weeks start on Monday and are labelled with it, months with their first day. "
+                              "The `day` granularity needs both dates and a range of at most 366 days.",
+        responses={
+            200: openapi.Response(
+                description="Successfully retrieved the production figures.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Operation success status'),
+                        'granularity': openapi.Schema(type=openapi.TYPE_STRING, description='day, week or month'),
+                        'planes_built': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'period': openapi.Schema(type=openapi.FORMAT_DATE, description='First day of the period'),
+                                    'plane_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the plane'),
+                                    'plane_name': openapi.Schema(type=openapi.TYPE_STRING, description='Name of the plane'),
+                                    'built': openapi.Schema(type=openapi.TYPE_INTEGER, description='Planes assembled in the period')
+                                }
+                            ),
+                            description='Planes built per period and model, oldest period first'
+                        ),
+                        'parts_consumed': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'period': openapi.Schema(type=openapi.FORMAT_DATE, description='First day of the period'),
+                                    'department_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the department that manufactures the parts'),
+                                    'department_name': openapi.Schema(type=openapi.TYPE_STRING, description='Name of the department'),
+                                    'quantity': openapi.Schema(type=openapi.TYPE_INTEGER, description='Parts consumed by the assemblies in the period')
+                                }
+                            ),
+                            description='Parts consumed per period and department, oldest period first'
+                        )
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Bad request due to an invalid granularity or date range.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Operation success status'),
+                        'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message')
+                    }
+                )
+            )
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                'Authorization',
+                openapi.IN_HEADER,
+                description="JWT Authorization header. Format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+            openapi.Parameter('granularity', openapi.IN_QUERY, description="`day` (default), `week` or `month`", type=openapi.TYPE_STRING),
+            openapi.Parameter('date_from', openapi.IN_QUERY, description="Only the assemblies on or after this date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('date_to', openapi.IN_QUERY, description="Only the assemblies on or before this date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+        ]
+    )
+
+    def get(self, request):
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in self.periods:
+            return Response({'status': False, 'error': 'granularity must be day, week or month.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Apply the date range to both rollups
+        try:
+            date_from = date.fromisoformat(request.query_params['date_from']) if request.query_params.get('date_from') else None
+            date_to = date.fromisoformat(request.query_params['date_to']) if request.query_params.get('date_to') else None
+        except ValueError:
+            return Response({'status': False, 'error': 'date_from and date_to must be dates (YYYY-MM-DD).'}, status=status.HTTP_400_BAD_REQUEST)
+        if granularity == 'day' and (date_from is None or date_to is None or (date_to - date_from).days >= self.max_daily_range):
+            return Response({'status': False, 'error': f'The day granularity needs date_from and date_to at most {self.max_daily_range} days apart.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {}
+        if date_from is not None:
+            filters['date__gte'] = date_from
+        if date_to is not None:
+            filters['date__lte'] = date_to
+        period = self.periods[granularity]
+
+        # Sum the daily rows of every period, the names are looked up separately to keep the grouping on the rollup columns
+        planes_built = DailyPlaneProduction.objects.filter(**filters).annotate(period=period) \
+            .values_list('period', 'plane_id').annotate(built=models.Sum('built')).order_by('period', 'plane_id')
+        parts_consumed = DailyPartConsumption.objects.filter(**filters).annotate(period=period) \
+            .values_list('period', 'department_id').annotate(quantity=models.Sum('quantity')).order_by('period', 'department_id')
+        plane_names = get_plane_names()
+        department_names = {department_id: capabilities.name for department_id, capabilities in get_capabilities().items()}
+
+        # Construct the final response
+        response_data = {
+            'status': True,
+            'granularity': granularity,
+            'planes_built': [
+                {'period': period_start, 'plane_id': plane_id, 'plane_name': plane_names.get(plane_id), 'built': built}
+                for period_start, plane_id, built in planes_built
+            ],
+            'parts_consumed': [
+                {'period': period_start, 'department_id': department_id, 'department_name': department_names.get(department_id), 'quantity': quantity}
+                for period_start, department_id, quantity in parts_consumed
+            ]
+        }
+
+        return Response(response_data, status=status.HTTP_200_OK)
@@ -0,0 +1,217 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+try:
+    from redis.exceptions import RedisError
+except ImportError:
+    # Only a Redis shared cache raises them
+    RedisError = OSError
+
+KEY_PREFIX = 'catalog'
+
+# Errors of the shared cache backend, e.g. Redis being unreachable
+SHARED_CACHE_ERRORS = (OSError, RedisError)
+
+# Every cached value by name, and the ones depending on each model by model label
+_cached_values = {}
+_dependents = {}
+
+# Until when the shared cache is skipped after an error, and the labels whose version bump it missed
+_shared_retry_at = 0
+_unbumped = set()
+_shared_lock = threading.Lock()
+
+
+def _shared_cache():
+    if not settings.CATALOG_CACHE_SHARED or time.monotonic() < _shared_retry_at:
+        return None
+    return caches[settings.CATALOG_CACHE_SHARED]
+
+
+def _shared_failed(labels=()):
+    # Skips the shared cache for CATALOG_CACHE_LOCAL_TIMEOUT seconds, so that an outage costs one
+    # failed call per interval, and remembers the bumps to make once it is back
+    global _shared_retry_at
+    with _shared_lock:
+        _shared_retry_at = time.monotonic() + settings.CATALOG_CACHE_LOCAL_TIMEOUT
+        _unbumped.update(labels)
+
+
+def _version_key(label):
+    return f'{KEY_PREFIX}:version:{label}'
+
+
+class CachedValue:
+    """
+    Value derived from the tables of `models`, computed by `load` and cached in two tiers.
+
+    The first tier is the memory of the process: the loaded object itself is kept and returned
+    for CATALOG_CACHE_LOCAL_TIMEOUT seconds, without a query or a copy. Then, when
+    CATALOG_CACHE_SHARED names a cache (Redis for example), the value is looked up there before
+    being loaded, so that one process loads it for all of them. Its key there carries the version
+    of every model of `models`, bumped by `model_changed`.
+
+    A change made through the ORM is seen at once by the process making it. With a shared cache
+    every read also fetches the versions of `models` from it, a single round trip, and the copy of
+    the process is only used while they are the ones it was loaded with, so the other processes
+    see the change on their next read. Without one they see it once their copy expires.
+
+    The shared cache failing only slows the reads down: it is skipped for a while, the values are
+    loaded and kept by the process as without one, and the version bumps missed meanwhile are made
+    once it answers again.
+    """
+
+    def __init__(self, name, models, load):
+        self.name = name
+        self.models = models
+        self.load = load
+        self._local = None
+        self._lock = threading.Lock()
+        self._counters_lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        _cached_values[name] = self
+        for model in models:
+            _dependents.setdefault(model._meta.label_lower, []).append(self)
+
+    def get(self):
+        shared = _shared_cache()
+        versions = None
+        if shared is not None:
+            try:
+                versions = self._shared_versions(shared)
+            except SHARED_CACHE_ERRORS:
+                _shared_failed()
+                shared = None
+        local = self._local
+        if not self._is_fresh(local, versions):
+            with self._lock:
+                local = self._local
+                if not self._is_fresh(local, versions):
+                    self._local = local = (self._get_shared(shared, versions), time.monotonic(), versions)
+                    return local[0]
+        self._count('local_hits')
+        return local[0]
+
+    def invalidate(self):
+        """Drops the value everywhere, as a change of one of its models would."""
+        models_changed(*self.models)
+
+    def drop_local(self):
+        with self._lock:
+            self._local = None
+
+    def statistics(self):
+        with self._counters_lock:
+            return {'local_hits': self.local_hits, 'shared_hits': self.shared_hits, 'misses': self.misses}
+
+    def _count(self, counter):
+        with self._counters_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def _is_fresh(local, versions):
+        # The copy of the process was loaded with the current shared versions, and is not too old
+        return local is not None and local[2] == versions and time.monotonic() - local[1] <= settings.CATALOG_CACHE_LOCAL_TIMEOUT
+
+    def _shared_versions(self, shared):
+        # The versions of the models in the shared cache, in the order of `models`
+        if _unbumped:
+            _bump_missed(shared)
+        keys = [_version_key(model._meta.label_lower) for model in self.models]
+        versions = shared.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # Start from an arbitrary version, a lost counter must not revive the values of an older one
+                shared.add(key, time.time_ns(), None)
+                versions[key] = shared.get(key)
+        return tuple(versions[key] for key in keys)
+
+    def _get_shared(self, shared, versions):
+        # Called with the lock held, reads the value from the shared cache or loads it
+        if shared is None:
+            self._count('misses')
+            return self.load()
+
+        key = f'{KEY_PREFIX}:{self.name}:' + '-'.join(str(version) for version in versions)
+        try:
+            value = shared.get(key)
+        except SHARED_CACHE_ERRORS:
+            _shared_failed()
+            value = shared = None
+        if value is not None:
+            self._count('shared_hits')
+            return value
+        self._count('misses')
+        value = self.load()
+        if shared is not None:
+            try:
+                shared.set(key, value, settings.CATALOG_CACHE_SHARED_TIMEOUT)
+            except SHARED_CACHE_ERRORS:
+                _shared_failed()
+        return value
+
+
+def _bump_shared(shared, labels):
+    for label in labels:
+        try:
+            shared.incr(_version_key(label))
+        except ValueError:
+            shared.add(_version_key(label), time.time_ns(), None)
+
+
+def _bump_missed(shared):
+    # Makes the bumps missed while the shared cache was failing, raises if it still is
+    with _shared_lock:
+        labels = sorted(_unbumped)
+        _unbumped.clear()
+    try:
+        _bump_shared(shared, labels)
+    except SHARED_CACHE_ERRORS:
+        with _shared_lock:
+            _unbumped.update(labels)
+        raise
+
+
+def _bump(labels):
+    for label in labels:
+        for cached_value in _dependents.get(label, ()):
+            cached_value.drop_local()
+    if not settings.CATALOG_CACHE_SHARED:
+        return
+    shared = _shared_cache()
+    if shared is None:
+        # Skipped after an error, bumped once it answers again
+        with _shared_lock:
+            _unbumped.update(labels)
+        return
+    try:
+        _bump_shared(shared, labels)
+    except SHARED_CACHE_ERRORS:
+        _shared_failed(labels)
+
+
+def models_changed(*models):
+    """
+    Invalidates the cached values depending on `models`, for the changes the signals do not
+    report, e.g. `bulk_create()` or `update()`.
+    """
+    labels = [model._meta.label_lower for model in models]
+    _bump(labels)
+    # Bumped again once the change is committed, in case a concurrent request cached the values from before it
+    transaction.on_commit(lambda: _bump(labels))
+
+
+def model_changed(sender, **kwargs):
+    """post_save, post_delete and m2m_changed receiver invalidating the values depending on `sender`."""
+    models_changed(sender)
+
+
+def cache_statistics():
+    """Returns the hit and miss counters of every cached value of this process, by name."""
+    return {name: cached_value.statistics() for name, cached_value in sorted(_cached_values.items())}
@@ -0,0 +1,42 @@
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+
+from .pool import close_pools, get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # The pooled connections to the test database, its mirrors' included, would prevent dropping it
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend taking its connections from the pool of its alias instead of opening one
+    per request. Closing the connection, at the end of every request with CONN_MAX_AGE = 0,
+    returns it to the pool. The pool is configured by the POOL setting of the database, pooling
+    is off without a MAX_SIZE.
+    """
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get('POOL') or {}
+        if not options.get('MAX_SIZE') or self.alias == NO_DB_ALIAS:
+            return super().get_new_connection(conn_params)
+        self.pool = get_pool(self.alias, conn_params, options)
+        return self.pool.checkout(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        pool, self.pool = self.pool, None
+        if self.in_atomic_block:
+            # Closed in the middle of a transaction, the pool drops the connection rather than reuse it
+            with self.wrap_database_errors:
+                self.connection.close()
+        pool.checkin(self.connection)
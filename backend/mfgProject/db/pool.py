@@ -0,0 +1,223 @@
+import collections
+import os
+import threading
+import time
+
+from psycopg2 import Error, OperationalError, extensions
+
+
+class ConnectionPool:
+    """
+    Bounded pool of psycopg2 connections shared by the threads of a process.
+
+    At most `max_size` connections are open at once, a checkout waits up to `timeout` seconds
+    for one to be returned before giving up. Connections idle for `health_check_after` seconds
+    are pinged before being handed out and replaced when the ping fails, the ones idle for
+    `max_idle` seconds are closed.
+    """
+
+    def __init__(self, params, max_size, timeout=10, max_idle=300, health_check_after=5):
+        self.params = params
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.pid = os.getpid()
+        self.closed = False
+
+        # Idle connections with the time they were returned, the most recently used last
+        self._idle = collections.deque()
+        self._size = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._opened = 0
+        self._health_check_failures = 0
+        self._checkout_time = 0.0
+        self._checkout_time_max = 0.0
+
+    def checkout(self, connect):
+        """
+        Returns a connection, opened with `connect` when none is idle. Waits for one to be returned
+        when `max_size` connections are in use.
+        """
+        started = time.monotonic()
+        while True:
+            connection, returned_at = self._reserve(started + self.timeout)
+            if connection is None:
+                connection = self._open(connect)
+                break
+            if time.monotonic() - returned_at < self.health_check_after or self._ping(connection):
+                break
+            # The server closed it while it was idle, its slot is used to open another one
+            self._discard(connection)
+            with self._condition:
+                self._health_check_failures += 1
+
+        elapsed = time.monotonic() - started
+        with self._condition:
+            self._checkouts += 1
+            self._checkout_time += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+        return connection
+
+    def checkin(self, connection):
+        """Returns a connection taken with `checkout`, the broken ones are closed."""
+        try:
+            if connection.closed or self.closed or self.pid != os.getpid():
+                raise OperationalError('The connection cannot be reused.')
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Error:
+            self._discard(connection)
+            return
+
+        now = time.monotonic()
+        expired = []
+        with self._condition:
+            self._idle.append((connection, now))
+            while self._idle and now - self._idle[0][1] > self.max_idle:
+                expired.append(self._idle.popleft()[0])
+                self._size -= 1
+            self._condition.notify()
+        for idle in expired:
+            self._close(idle)
+
+    def close(self):
+        """Closes the idle connections, the ones in use are closed when they are returned."""
+        with self._condition:
+            self.closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._size -= len(idle)
+            self._idle.clear()
+            self._condition.notify_all()
+        for connection in idle:
+            self._close(connection)
+
+    def statistics(self):
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._size - len(self._idle),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'connections_opened': self._opened,
+                'health_check_failures': self._health_check_failures,
+                'checkout_ms_avg': round(self._checkout_time / self._checkouts * 1000, 3) if self._checkouts else 0,
+                'checkout_ms_max': round(self._checkout_time_max * 1000, 3),
+            }
+
+    def _reserve(self, deadline):
+        # Takes an idle connection, or a free slot for a new one returned as (None, None)
+        with self._condition:
+            self._waiting += 1
+            try:
+                while True:
+                    if self.closed:
+                        raise OperationalError('The connection pool is closed.')
+                    if self._idle:
+                        return self._idle.pop()
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise OperationalError(
+                            f'No database connection was returned to the pool within {self.timeout} seconds, '
+                            f'all {self.max_size} are in use.'
+                        )
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def _open(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opened += 1
+        return connection
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return True
+        except Error:
+            return False
+
+    def _discard(self, connection):
+        self._close(connection)
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _close(self, connection):
+        # A connection inherited from the parent process shares its socket, closing it would end
+        # the parent's session too
+        if self.pid == os.getpid():
+            try:
+                connection.close()
+            except Error:
+                pass
+
+
+# Pool of each database alias of the process
+_pools = {}
+_lock = threading.Lock()
+
+
+def get_pool(alias, params, options):
+    """
+    Returns the pool of `alias`, created with `options` (the POOL setting of the database) on
+    first use. The pool is replaced when the connection parameters change, e.g. once the test
+    database is created, and in a forked process.
+    """
+    with _lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.params != params or pool.pid != os.getpid() or pool.closed:
+            if pool is not None and pool.pid == os.getpid():
+                pool.close()
+            pool = _pools[alias] = ConnectionPool(
+                params,
+                max_size=options['MAX_SIZE'],
+                timeout=options.get('TIMEOUT', 10),
+                max_idle=options.get('MAX_IDLE', 300),
+                health_check_after=options.get('HEALTH_CHECK_AFTER', 5),
+            )
+        return pool
+
+
+def close_pool(alias):
+    with _lock:
+        pool = _pools.pop(alias, None)
+    if pool is not None:
+        pool.close()
+
+
+def close_pools():
+    for alias in list(_pools):
+        close_pool(alias)
+
+
+def pool_statistics():
+    """Returns the statistics of the pools of this process by database alias."""
+    return {alias: pool.statistics() for alias, pool in list(_pools.items()) if pool.pid == os.getpid()}
+
+
+# The idle connections are closed before forking, a child process opens its own
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=close_pools)
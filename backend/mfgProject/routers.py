@@ -0,0 +1,43 @@
+import contextlib
+import contextvars
+
+from django.conf import settings
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+@contextlib.contextmanager
+def replica_reads():
+    """
+    Routes the reads made in the block, including the ones of async code awaited in it, to the
+    DATABASE_READ_REPLICA. They stay on the primary when no replica is configured.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReadReplicaRouter:
+    """
+    Sends the reads of `replica_reads` blocks to the read replica, everything else to the
+    primary. The replica is never migrated, it follows the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_READ_REPLICA and _replica_reads.get():
+            return settings.DATABASE_READ_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == settings.DATABASE_READ_REPLICA:
+            return False
+        return None
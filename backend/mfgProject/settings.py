@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,9 +57,12 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_HEADERS = [
     'content-type',
     'authorization',
+    'idempotency-key',
 ]
 
 MIDDLEWARE = [
+    # Compresses the responses for the clients accepting gzip, first so that it sees the final body
+    'django.middleware.gzip.GZipMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -93,17 +97,45 @@ WSGI_APPLICATION = 'mfgProject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections are pooled by each process (see mfgProject/db) and returned to the pool at the end
+# of every request, CONN_MAX_AGE must stay 0: persistent connections are not safe under ASGI.
+# DATABASE_POOL_MAX_CONNECTIONS bounds the connections of all the web workers together, it is split
+# between the WEB_CONCURRENCY workers and must stay below the max_connections of the server. 0 turns
+# pooling off. Connections idle for HEALTH_CHECK_AFTER seconds are checked before being reused.
+DATABASE_POOL_MAX_CONNECTIONS = int(os.environ.get('DATABASE_POOL_MAX_CONNECTIONS', 40))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'db_test',
-        'USER': 'postgres',
-        'PASSWORD': 'postgres',
-        'HOST': 'db',
-        'PORT': '5432',
+        'ENGINE': 'mfgProject.db',
+        'NAME': os.environ.get('POSTGRES_DB', 'db_test'),
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'postgres'),
+        'HOST': os.environ.get('POSTGRES_HOST', 'db'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': DATABASE_POOL_MAX_CONNECTIONS and max(1, DATABASE_POOL_MAX_CONNECTIONS // int(os.environ.get('WEB_CONCURRENCY', 1))),
+            'TIMEOUT': int(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+            'MAX_IDLE': 300,
+            'HEALTH_CHECK_AFTER': 5,
+        },
     }
 }
 
+# Read replica of the primary, set POSTGRES_REPLICA_HOST to send the reads of the list and history
+# endpoints to it. They go to the primary while the version counters of their data changed less
+# than DATABASE_REPLICA_MAX_LAG seconds ago, which must exceed the replication lag. In tests the
+# replica is a second connection to the test database, seeing only committed data.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': os.environ.get('POSTGRES_REPLICA_HOST', DATABASES['default']['HOST']),
+    'PORT': os.environ.get('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_READ_REPLICA = 'replica' if os.environ.get('POSTGRES_REPLICA_HOST') else None
+DATABASE_REPLICA_MAX_LAG = float(os.environ.get('DATABASE_REPLICA_MAX_LAG', 5))
+DATABASE_ROUTERS = ['mfgProject.routers.ReadReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -149,7 +181,7 @@ AUTH_USER_MODEL = 'personnel.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'personnel.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -164,4 +196,78 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
-}
\ No newline at end of file
+    # Tokens carry the user's department, requests are authenticated without a database query. The
+    # user's is_active is not checked either: a deactivated user keeps access until their access
+    # token expires, only refreshing refuses them
+    'TOKEN_OBTAIN_SERIALIZER': 'personnel.serializers.ClaimsTokenObtainPairSerializer',
+    # Rotated refresh tokens are revoked by personnel.revocation, simplejwt's blacklist app is not installed
+    'TOKEN_REFRESH_SERIALIZER': 'personnel.serializers.ClaimsTokenRefreshSerializer',
+}
+
+# Revoked refresh tokens are looked up in a Bloom filter kept by every process, sized for
+# TOKEN_REVOCATION_BLOOM_CAPACITY tokens at TOKEN_REVOCATION_BLOOM_ERROR_RATE false positives. It
+# picks up the revocations of other processes every TOKEN_REVOCATION_SYNC_INTERVAL seconds, and the
+# revocations of expired tokens are deleted every TOKEN_REVOCATION_PRUNE_INTERVAL seconds
+TOKEN_REVOCATION_BLOOM_CAPACITY = 100000
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = 0.001
+TOKEN_REVOCATION_SYNC_INTERVAL = 5
+TOKEN_REVOCATION_PRUNE_INTERVAL = 3600
+
+# Assembly orders waiting for a worker before plane/order starts refusing new ones
+ASSEMBLY_ORDERS_MAX_IN_FLIGHT = 500
+# Attempts at an assembly order failing with an unexpected error (a deadlock, a lost connection...)
+# before it is marked failed. The n-th retry waits n * ASSEMBLY_ORDERS_RETRY_DELAY seconds
+ASSEMBLY_ORDERS_MAX_ATTEMPTS = 5
+ASSEMBLY_ORDERS_RETRY_DELAY = 10
+
+# How long a stored Idempotency-Key response can be replayed
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# Write-combining for part manufacturing. When enabled, increments go to one of
+# PARTS_INVENTORY_DELTA_SHARDS delta rows instead of locking the PartsInventory row, and are
+# folded into it by assembly, recycling and the fold_parts_inventory command. Run
+# `fold_parts_inventory --once` after turning it off.
+PARTS_INVENTORY_WRITE_COMBINING = False
+PARTS_INVENTORY_DELTA_SHARDS = 16
+
+# The assembly history export reads a server-side cursor in a transaction held open for the whole
+# download, pinning a database connection and holding back vacuum. The transaction is aborted when
+# the client stops reading for ASSEMBLY_HISTORY_EXPORT_IDLE_TIMEOUT seconds, or when fetching one
+# chunk takes more than ASSEMBLY_HISTORY_EXPORT_STATEMENT_TIMEOUT seconds
+ASSEMBLY_HISTORY_EXPORT_IDLE_TIMEOUT = 60
+ASSEMBLY_HISTORY_EXPORT_STATEMENT_TIMEOUT = 30
+
+# Monthly assembly history partitions kept ahead of time, and where archived ones are written,
+# see `assembly_history_partitions`
+ASSEMBLY_HISTORY_PARTITIONS_AHEAD = 3
+ASSEMBLY_HISTORY_ARCHIVE_DIR = BASE_DIR / 'archive' / 'assembly_history'
+
+# The catalog (departments and their capabilities, part and plane names, bills of materials) is
+# cached by every process for CATALOG_CACHE_LOCAL_TIMEOUT seconds, see mfgProject/cache.py. With
+# CACHE_SHARED_URL set, the processes also share it through Redis for CATALOG_CACHE_SHARED_TIMEOUT
+# seconds, and check its version counters on every read. Changes made through the ORM invalidate it
+# at once in the process making them, and in the other ones on their next read with Redis. Without
+# it, the local timeout bounds how long other processes keep the old one. Assembly always reads the
+# bill of materials from the database
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+if os.environ.get('CACHE_SHARED_URL'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['CACHE_SHARED_URL'],
+    }
+CATALOG_CACHE_SHARED = 'shared' if 'shared' in CACHES else None
+CATALOG_CACHE_LOCAL_TIMEOUT = 5 if CATALOG_CACHE_SHARED else 60
+CATALOG_CACHE_SHARED_TIMEOUT = 3600
+
+# Processes hashing the passwords of `import_personnel` and personnel/import/, None for one per CPU
+PERSONNEL_IMPORT_PROCESSES = None
+
+# Serve department/list, part/list, plane/list and plane/assemble-history with async views, which
+# do not hold a worker while waiting on the database when the application runs under ASGI (see
+# gunicorn.conf.py). They answer exactly like the DRF views, which are used when this is off. Off
+# by default: on a single core they measured slower than the DRF views, turn them on where
+# `load_test` shows a gain
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == '1'
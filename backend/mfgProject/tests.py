@@ -0,0 +1,150 @@
+import psycopg2
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from departments.models import Departments
+from parts.models import Parts
+from parts.names import get_part_names, part_names
+from personnel.models import CustomUser
+from . import cache
+from .db.pool import ConnectionPool
+
+
+class ConnectionPoolTests(TestCase):
+    def connect(self):
+        return psycopg2.connect(**connection.get_connection_params())
+
+    def test_reuses_returned_connections_and_times_out_when_exhausted(self):
+        pool = ConnectionPool(params={}, max_size=1, timeout=0.1)
+        first = pool.checkout(self.connect)
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.checkout(self.connect)
+
+        pool.checkin(first)
+        self.assertIs(pool.checkout(self.connect), first)
+        statistics = pool.statistics()
+        self.assertEqual((statistics['in_use'], statistics['checkouts'], statistics['timeouts'], statistics['connections_opened']), (1, 2, 1, 1))
+        pool.checkin(first)
+        pool.close()
+        self.assertTrue(first.closed)
+
+    def test_replaces_connections_closed_by_the_server(self):
+        pool = ConnectionPool(params={}, max_size=1, health_check_after=0)
+        first = pool.checkout(self.connect)
+        pool.checkin(first)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [first.info.backend_pid])
+
+        second = pool.checkout(self.connect)
+        self.assertIsNot(second, first)
+        with second.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertEqual(pool.statistics()['health_check_failures'], 1)
+        pool.checkin(second)
+        pool.close()
+
+    def test_statistics_need_a_staff_user(self):
+        user = CustomUser.objects.create_user(username='operator', password='pass')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        self.assertEqual(client.get('/database/pool').status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        response = client.get('/database/pool')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(response.data['pools']['default']['in_use'], 1)
+
+
+class UnreachableCache(LocMemCache):
+    """Shared cache whose server is down."""
+
+    def get(self, *args, **kwargs):
+        raise ConnectionRefusedError('Connection refused')
+
+    get_many = set = add = incr = get
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'catalog-tests'},
+    },
+    CATALOG_CACHE_SHARED='shared',
+)
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        part_names.drop_local()
+        self.part = Parts.objects.create(name='Wing', department=Departments.objects.create(name='Wing'))
+
+    def counters(self):
+        statistics = part_names.statistics()
+        return statistics['local_hits'], statistics['shared_hits'], statistics['misses']
+
+    def test_values_come_from_the_process_then_the_shared_cache(self):
+        # Creating the part dropped the values, the first read loads them
+        local_hits, shared_hits, misses = self.counters()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_part_names()[self.part.id], 'Wing')
+        with self.assertNumQueries(0):
+            get_part_names()
+
+        # Another process finds them in the shared cache
+        part_names.drop_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_part_names()[self.part.id], 'Wing')
+        self.assertEqual(self.counters(), (local_hits + 1, shared_hits + 1, misses + 1))
+
+    def test_saving_a_model_changes_the_shared_key(self):
+        get_part_names()
+        self.part.name = 'Tail'
+        self.part.save()
+
+        # The key of the value before the change is no longer used by any process
+        part_names.drop_local()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_part_names()[self.part.id], 'Tail')
+
+    def test_changes_of_other_processes_are_seen_on_the_next_read(self):
+        get_part_names()
+        # Another process renames the part and bumps the version of Parts
+        Parts.objects.filter(id=self.part.id).update(name='Tail')
+        caches['shared'].incr('catalog:version:parts.parts')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_part_names()[self.part.id], 'Tail')
+
+    def test_an_unreachable_shared_cache_falls_back_to_the_database(self):
+        get_part_names()
+        self.addCleanup(cache._unbumped.clear)
+        self.addCleanup(setattr, cache, '_shared_retry_at', 0)
+
+        with self.settings(CACHES={**settings.CACHES, 'shared': {'BACKEND': 'mfgProject.tests.UnreachableCache'}}):
+            self.part.name = 'Tail'
+            self.part.save()
+            with self.assertNumQueries(1):
+                self.assertEqual(get_part_names()[self.part.id], 'Tail')
+
+        # Once it is back, the bump missed meanwhile retires the value cached before the change
+        cache._shared_retry_at = 0
+        part_names.drop_local()
+        self.assertEqual(get_part_names()[self.part.id], 'Tail')
+
+    def test_statistics_need_a_staff_user(self):
+        user = CustomUser.objects.create_user(username='operator', password='pass')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        self.assertEqual(client.get('/cache/statistics').status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        response = client.get('/cache/statistics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['shared'], 'shared')
+        self.assertIn('part_names', response.data['caches'])
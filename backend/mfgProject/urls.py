@@ -4,6 +4,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from .views import CacheStatisticsView, DatabasePoolView
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Baykar Manufacturing Info API",
@@ -20,6 +22,8 @@ urlpatterns = [
     path('', include('personnel.urls')),
     path('', include('departments.urls')),
     path('', include('manufacturing.urls')),
+    path('database/pool', DatabasePoolView.as_view(), name='database_pool'),
+    path('cache/statistics', CacheStatisticsView.as_view(), name='cache_statistics'),
     # Swagger URLs
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
@@ -0,0 +1,99 @@
+import os
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from .cache import cache_statistics
+from .db.pool import pool_statistics
+
+
+class DatabasePoolView(APIView):
+    # Loads the user from the database, the claims do not say whether they are staff
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Returns the statistics of the database connection pools of the worker process answering the request, "
+                              "by database alias: open connections (`size`, `in_use`, `idle`), requests `waiting` for a connection, "
+                              "checkouts that timed out, connections opened and replaced after a failed health check, and the "
+                              "average and maximum checkout latency in milliseconds. Every worker has its own pools, `pid` tells which "
+                              "one answered. The user must be staff.",
+        responses={
+            200: openapi.Response(
+                description="Statistics of the pools of the worker.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Operation status'),
+                        'pid': openapi.Schema(type=openapi.TYPE_INTEGER, description='Process ID of the worker'),
+                        'pools': openapi.Schema(type=openapi.TYPE_OBJECT, description='Statistics by database alias'),
+                    }
+                )
+            ),
+            401: openapi.Response(description="The token is missing, invalid or expired."),
+            403: openapi.Response(description="Forbidden. The user is not staff.")
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                'Authorization',
+                openapi.IN_HEADER,
+                description="JWT Authorization header. Format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ]
+    )
+    def get(self, request):
+        return Response({'status': True, 'pid': os.getpid(), 'pools': pool_statistics()}, status=status.HTTP_200_OK)
+
+
+class CacheStatisticsView(APIView):
+    # Loads the user from the database, the claims do not say whether they are staff
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Returns the hit and miss counters of the cached catalog values (department capabilities, part and plane "
+                              "names, bills of materials) of the worker process answering the request, by name: `local_hits` were "
+                              "answered from the memory of the process, `shared_hits` from the shared cache, and `misses` were loaded "
+                              "from the database. Every worker has its own counters, `pid` tells which one answered. The user must be staff.",
+        responses={
+            200: openapi.Response(
+                description="Counters of the cached values of the worker.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Operation status'),
+                        'pid': openapi.Schema(type=openapi.TYPE_INTEGER, description='Process ID of the worker'),
+                        'shared': openapi.Schema(type=openapi.TYPE_STRING, description='Alias of the shared cache, null without one'),
+                        'caches': openapi.Schema(type=openapi.TYPE_OBJECT, description='Counters by cached value'),
+                    }
+                )
+            ),
+            401: openapi.Response(description="The token is missing, invalid or expired."),
+            403: openapi.Response(description="Forbidden. The user is not staff.")
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                'Authorization',
+                openapi.IN_HEADER,
+                description="JWT Authorization header. Format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ]
+    )
+    def get(self, request):
+        return Response({
+            'status': True,
+            'pid': os.getpid(),
+            'shared': settings.CATALOG_CACHE_SHARED,
+            'caches': cache_statistics(),
+        }, status=status.HTTP_200_OK)
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class PartsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'parts'
+
+    def ready(self):
+        from mfgProject.cache import model_changed
+        from .models import Parts
+
+        # Drop the cached values depending on the parts, e.g. their names, whenever one changes
+        post_save.connect(model_changed, sender=Parts, dispatch_uid='cache_part_saved')
+        post_delete.connect(model_changed, sender=Parts, dispatch_uid='cache_part_deleted')
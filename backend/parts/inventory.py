@@ -0,0 +1,147 @@
+import random
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from manufacturing.ledger import movements_cte
+from manufacturing.models import InventoryMovement
+from manufacturing.versions import INVENTORY, changed
+from .models import PartsInventory, PartsInventoryDelta
+
+
+def increment_parts_inventory(increments, write_combining=None):
+    """
+    Adds `quantity` units to the inventory of every `(plane_id, part_id): quantity` pair in one
+    INSERT ... ON CONFLICT DO UPDATE, creating the missing inventory rows on the way.
+
+    With write-combining (PARTS_INVENTORY_WRITE_COMBINING, or `write_combining` when given) the
+    increments go to a random delta shard of every pair instead, see `buffer_parts_inventory`.
+
+    The increments are recorded as `manufactured` movements of the inventory ledger.
+
+    Returns the new inventory of every pair as `{(plane_id, part_id): inventory}`.
+    """
+    if not increments:
+        return {}
+    changed(INVENTORY)
+    if write_combining is None:
+        write_combining = settings.PARTS_INVENTORY_WRITE_COMBINING
+    if write_combining:
+        return buffer_parts_inventory(increments)
+
+    table = connection.ops.quote_name(PartsInventory._meta.db_table)
+    values = ', '.join(['(%s, %s, %s)'] * len(increments))
+    # Rows are locked in (plane, part) order so concurrent batches cannot deadlock
+    params = [value for (plane_id, part_id), quantity in sorted(increments.items()) for value in (plane_id, part_id, quantity)]
+
+    # The movements are appended to the ledger by the same statement
+    ledger, ledger_params = movements_cte('moved', increments, InventoryMovement.MANUFACTURED)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH {ledger} '
+            f'INSERT INTO {table} (plane_id, part_id, inventory) VALUES {values} '
+            f'ON CONFLICT (plane_id, part_id) DO UPDATE SET inventory = {table}.inventory + EXCLUDED.inventory '
+            f'RETURNING plane_id, part_id, inventory',
+            ledger_params + params,
+        )
+        return {(plane_id, part_id): inventory for plane_id, part_id, inventory in cursor.fetchall()}
+
+
+def buffer_parts_inventory(increments):
+    """
+    Adds the increments to one of the PARTS_INVENTORY_DELTA_SHARDS delta rows of every pair.
+
+    Concurrent stations pick different shards, so they only wait on each other when they land on
+    the same one. The deltas are folded into the PartsInventory rows by
+    `fold_parts_inventory_deltas`. Returns the exact new inventory of every pair.
+    """
+    inventory_table = connection.ops.quote_name(PartsInventory._meta.db_table)
+    delta_table = connection.ops.quote_name(PartsInventoryDelta._meta.db_table)
+    shard = random.randrange(settings.PARTS_INVENTORY_DELTA_SHARDS)
+    values = ', '.join(['(%s, %s, %s, %s)'] * len(increments))
+    params = [value for (plane_id, part_id), quantity in sorted(increments.items()) for value in (plane_id, part_id, shard, quantity)]
+
+    ledger, ledger_params = movements_cte('moved', increments, InventoryMovement.MANUFACTURED)
+
+    # The totals are read in the same statement: the other rows come from its snapshot, which
+    # still holds any shard row a concurrent fold replaced ours with
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH {ledger}, added AS (INSERT INTO {delta_table} (plane_id, part_id, shard, delta) VALUES {values} '
+            f'ON CONFLICT (plane_id, part_id, shard) DO UPDATE SET delta = {delta_table}.delta + EXCLUDED.delta '
+            f'RETURNING id, plane_id, part_id, delta) '
+            f'SELECT added.plane_id, added.part_id, added.delta '
+            f'+ COALESCE((SELECT inventory FROM {inventory_table} stock '
+            f'WHERE stock.plane_id = added.plane_id AND stock.part_id = added.part_id), 0) '
+            f'+ COALESCE((SELECT SUM(delta) FROM {delta_table} pending '
+            f'WHERE pending.plane_id = added.plane_id AND pending.part_id = added.part_id AND pending.id <> added.id), 0) '
+            f'FROM added',
+            ledger_params + params,
+        )
+        return {(plane_id, part_id): inventory for plane_id, part_id, inventory in cursor.fetchall()}
+
+
+def current_parts_inventory(pairs):
+    """
+    Returns the exact inventory of every `(plane_id, part_id)` pair, pending deltas included,
+    as `{(plane_id, part_id): inventory}`. A single statement reads both tables, so a concurrent
+    fold is seen either entirely or not at all.
+    """
+    pairs = sorted(pairs)
+    if not pairs:
+        return {}
+
+    inventory_table = connection.ops.quote_name(PartsInventory._meta.db_table)
+    delta_table = connection.ops.quote_name(PartsInventoryDelta._meta.db_table)
+    values = ', '.join(['(%s, %s)'] * len(pairs))
+    params = [value for pair in pairs for value in pair] * 2
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT plane_id, part_id, SUM(inventory) FROM ('
+            f'SELECT plane_id, part_id, inventory FROM {inventory_table} WHERE (plane_id, part_id) IN (VALUES {values}) '
+            f'UNION ALL SELECT plane_id, part_id, delta FROM {delta_table} WHERE (plane_id, part_id) IN (VALUES {values})'
+            f') AS stock GROUP BY plane_id, part_id',
+            params,
+        )
+        stock = {(plane_id, part_id): inventory for plane_id, part_id, inventory in cursor.fetchall()}
+    return {pair: stock.get(pair, 0) for pair in pairs}
+
+
+def pending_parts_inventory(plane='plane', part='part'):
+    """
+    Sum of the pending deltas of a (plane, part) pair, as an expression for querysets having
+    `plane` and `part` references.
+    """
+    pending = PartsInventoryDelta.objects.filter(plane=OuterRef(plane), part=OuterRef(part)) \
+        .values('plane', 'part').annotate(total=Sum('delta')).values('total')
+    return Coalesce(Subquery(pending), 0)
+
+
+def fold_parts_inventory_deltas(**filters):
+    """
+    Moves the pending deltas matching `filters` into their PartsInventory rows.
+
+    The deltas are deleted and added to the inventory by a single statement, so no increment is
+    lost or counted twice. Both tables are locked in (plane, part) order, like every other
+    writer. Returns the number of inventory rows updated.
+    """
+    inventory_table = connection.ops.quote_name(PartsInventory._meta.db_table)
+    delta_table = connection.ops.quote_name(PartsInventoryDelta._meta.db_table)
+
+    with transaction.atomic():
+        pending = PartsInventoryDelta.objects.select_for_update(of=('self',)).filter(**filters) \
+            .order_by('plane_id', 'part_id', 'shard').values('id')
+        pending_sql, params = pending.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH folded AS (DELETE FROM {delta_table} WHERE id IN ({pending_sql}) RETURNING plane_id, part_id, delta) '
+                f'INSERT INTO {inventory_table} (plane_id, part_id, inventory) '
+                f'SELECT plane_id, part_id, SUM(delta) FROM folded GROUP BY plane_id, part_id ORDER BY plane_id, part_id '
+                f'ON CONFLICT (plane_id, part_id) DO UPDATE SET inventory = {inventory_table}.inventory + EXCLUDED.inventory',
+                params,
+            )
+            return cursor.rowcount
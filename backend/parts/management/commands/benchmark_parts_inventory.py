@@ -0,0 +1,65 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from departments.models import Departments
+from parts.inventory import current_parts_inventory, fold_parts_inventory_deltas, increment_parts_inventory
+from parts.models import Parts
+from planes.models import Planes
+
+
+class Command(BaseCommand):
+    help = "Benchmarks contended part increments on one inventory row with write-combining off and on. " \
+           "Creates a throwaway department, part and plane in the configured database and removes them afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=16, help='Number of concurrent stations (threads).')
+        parser.add_argument('--increments', type=int, default=200, help='Increments sent by every station.')
+        parser.add_argument('--work-ms', type=float, default=1.0,
+                            help='Time every station request spends in its transaction after the increment, '
+                                 'e.g. storing its Idempotency-Key response.')
+
+    def handle(self, *args, **options):
+        department = Departments.objects.create(name='Benchmark Team')
+        part = Parts.objects.create(name='Benchmark Part', department=department)
+        plane = Planes.objects.create(name='Benchmark Plane')
+        try:
+            for write_combining in (False, True):
+                elapsed = self.run(plane.id, part.id, options['stations'], options['increments'], options['work_ms'] / 1000, write_combining)
+                fold_parts_inventory_deltas(plane_id=plane.id, part_id=part.id)
+
+                expected = options['stations'] * options['increments'] * (2 if write_combining else 1)
+                inventory = current_parts_inventory([(plane.id, part.id)])[(plane.id, part.id)]
+                if inventory != expected:
+                    raise CommandError(f"Lost increments: expected {expected}, found {inventory}.")
+
+                total = options['stations'] * options['increments']
+                label = 'write-combining' if write_combining else 'row lock'
+                self.stdout.write(f"{label:>16}: {total} increments in {elapsed:.2f} s, {total / elapsed:.0f} increments/s")
+        finally:
+            plane.delete()
+            department.delete()
+
+    def run(self, plane_id, part_id, stations, increments, work, write_combining):
+        barrier = threading.Barrier(stations + 1)
+
+        def station():
+            try:
+                barrier.wait()
+                for _ in range(increments):
+                    with transaction.atomic():
+                        increment_parts_inventory({(plane_id, part_id): 1}, write_combining=write_combining)
+                        time.sleep(work)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=station) for _ in range(stations)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
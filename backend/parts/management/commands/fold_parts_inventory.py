@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from parts.inventory import fold_parts_inventory_deltas
+
+
+class Command(BaseCommand):
+    help = "Folds the buffered part increments (PARTS_INVENTORY_WRITE_COMBINING) into the parts inventory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between two folds.')
+        parser.add_argument('--once', action='store_true', help='Fold once and exit.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                folded = fold_parts_inventory_deltas()
+                if options['once']:
+                    self.stdout.write(f"Folded the pending increments of {folded} inventory rows.")
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:50
+
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_inventories(apps, schema_editor):
+    PartsInventory = apps.get_model('parts', 'PartsInventory')
+
+    # Keep the oldest row of every (plane, part) pair with the summed inventory, drop the others
+    duplicates = PartsInventory.objects.values('plane_id', 'part_id') \
+        .annotate(rows=Count('id'), kept_id=Min('id'), total=Sum('inventory')).filter(rows__gt=1)
+    for duplicate in duplicates.iterator():
+        PartsInventory.objects.filter(id=duplicate['kept_id']).update(inventory=duplicate['total'])
+        PartsInventory.objects.filter(plane_id=duplicate['plane_id'], part_id=duplicate['part_id']) \
+            .exclude(id=duplicate['kept_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0002_rename_department_id_parts_department_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_inventories, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0003_merge_duplicate_partsinventory'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='partsinventory',
+            constraint=models.UniqueConstraint(fields=('plane', 'part'), name='unique_parts_inventory_plane_part'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planes', '0006_remove_planes_required_parts'),
+        ('parts', '0004_partsinventory_unique_plane_part'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartsInventoryDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('delta', models.IntegerField()),
+                ('part', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='parts.parts')),
+                ('plane', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='planes.planes')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='partsinventorydelta',
+            constraint=models.UniqueConstraint(fields=('plane', 'part', 'shard'), name='unique_parts_inventory_delta_shard'),
+        ),
+    ]
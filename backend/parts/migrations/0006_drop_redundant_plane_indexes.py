@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planes', '0007_merge_duplicate_planesinventory'),
+        ('parts', '0005_partsinventorydelta'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='partsinventory',
+            name='plane',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='planes.planes'),
+        ),
+        migrations.AlterField(
+            model_name='partsinventorydelta',
+            name='plane',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='planes.planes'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0006_drop_redundant_plane_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='partsinventory',
+            name='unique_parts_inventory_plane_part',
+        ),
+        migrations.AddConstraint(
+            model_name='partsinventory',
+            constraint=models.UniqueConstraint(fields=('plane', 'part'), include=('inventory',), name='unique_parts_inventory_plane_part'),
+        ),
+    ]
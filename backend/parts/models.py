@@ -9,6 +9,25 @@ class Parts(models.Model):
     department = models.ForeignKey(Departments, on_delete=models.CASCADE)
 
 class PartsInventory(models.Model):
-    plane = models.ForeignKey(Planes, on_delete=models.CASCADE)
+    # Indexed by the unique constraint
+    plane = models.ForeignKey(Planes, on_delete=models.CASCADE, db_index=False)
     part = models.ForeignKey(Parts, on_delete=models.CASCADE)
-    inventory = models.IntegerField()
\ No newline at end of file
+    inventory = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            # Covers the inventory reads by (plane, part), answered from the index alone
+            models.UniqueConstraint(fields=['plane', 'part'], include=['inventory'], name='unique_parts_inventory_plane_part'),
+        ]
+
+class PartsInventoryDelta(models.Model):
+    # Pending increments of a PartsInventory row, spread over shards so concurrent stations do not wait on one row lock
+    plane = models.ForeignKey(Planes, on_delete=models.CASCADE, db_index=False)
+    part = models.ForeignKey(Parts, on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField()
+    delta = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['plane', 'part', 'shard'], name='unique_parts_inventory_delta_shard'),
+        ]
@@ -0,0 +1,28 @@
+from mfgProject.cache import CachedValue
+
+from .models import Parts
+
+
+def _load_part_names():
+    return dict(Parts.objects.values_list('id', 'name'))
+
+
+part_names = CachedValue('part_names', [Parts], _load_part_names)
+
+
+def get_part_names():
+    """
+    Returns the name of every part as `{part_id: name}`.
+
+    The names are loaded with a single query and cached, see `CachedValue`. Every Parts change
+    made through the ORM invalidates them.
+    """
+    return part_names.get()
+
+
+def get_part_name(part_id):
+    """Returns the name of the part `part_id`, None when there is no such part."""
+    try:
+        return get_part_names().get(int(part_id))
+    except (TypeError, ValueError):
+        return None
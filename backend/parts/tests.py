@@ -1,3 +1,54 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from departments.models import Departments
+from planes.models import Planes
+from .inventory import current_parts_inventory, fold_parts_inventory_deltas, increment_parts_inventory
+from .models import Parts, PartsInventory, PartsInventoryDelta
+from .names import get_part_names
+
+
+class PartsInventoryWriteCombiningTests(TestCase):
+    def setUp(self):
+        department = Departments.objects.create(name='Wing Team')
+        self.wing = Parts.objects.create(name='Wing', department=department)
+        self.tb2 = Planes.objects.create(name='TB2')
+        self.tb3 = Planes.objects.create(name='TB3')
+        PartsInventory.objects.create(plane=self.tb2, part=self.wing, inventory=5)
+
+    @override_settings(PARTS_INVENTORY_WRITE_COMBINING=True, PARTS_INVENTORY_DELTA_SHARDS=4)
+    def test_buffered_increments_return_exact_totals(self):
+        for expected in range(6, 16):
+            new_inventory = increment_parts_inventory({(self.tb2.id, self.wing.id): 1, (self.tb3.id, self.wing.id): 2})
+            self.assertEqual(new_inventory[(self.tb2.id, self.wing.id)], expected)
+
+        self.assertEqual(PartsInventory.objects.get(plane=self.tb2, part=self.wing).inventory, 5)
+        self.assertLessEqual(PartsInventoryDelta.objects.count(), 8)
+        self.assertEqual(current_parts_inventory([(self.tb2.id, self.wing.id), (self.tb3.id, self.wing.id)]),
+                         {(self.tb2.id, self.wing.id): 15, (self.tb3.id, self.wing.id): 20})
+
+    def test_fold_moves_the_deltas_into_the_inventory(self):
+        increment_parts_inventory({(self.tb2.id, self.wing.id): 3, (self.tb3.id, self.wing.id): 4}, write_combining=True)
+        increment_parts_inventory({(self.tb2.id, self.wing.id): 1}, write_combining=True)
+
+        self.assertEqual(fold_parts_inventory_deltas(plane_id=self.tb2.id), 1)
+        self.assertEqual(PartsInventory.objects.get(plane=self.tb2, part=self.wing).inventory, 9)
+        self.assertEqual(PartsInventoryDelta.objects.get().plane_id, self.tb3.id)
+
+        # The missing inventory row is created by the fold
+        fold_parts_inventory_deltas()
+        self.assertEqual(PartsInventory.objects.get(plane=self.tb3, part=self.wing).inventory, 4)
+        self.assertFalse(PartsInventoryDelta.objects.exists())
+
+
+class PartNamesCacheTests(TestCase):
+    def test_changes_invalidate_the_cache(self):
+        department = Departments.objects.create(name='Wing Team')
+        wing = Parts.objects.create(name='Wing', department=department)
+        get_part_names()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_part_names()[wing.id], 'Wing')
+
+        wing.name = 'Left Wing'
+        wing.save()
+        self.assertEqual(get_part_names()[wing.id], 'Left Wing')
@@ -0,0 +1,53 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from departments.models import Departments
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from the claims of a `ClaimsRefreshToken` access token. It answers the
+    attributes the views read from a CustomUser, `department` being an unsaved Departments
+    instance holding the id and name of the claims.
+    """
+
+    @cached_property
+    def id(self):
+        # The claim holds the id as a string
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def department_id(self):
+        return self.token.get('department_id')
+
+    @cached_property
+    def department(self):
+        if self.department_id is None:
+            return None
+        return Departments(id=self.department_id, name=self.token.get('department_name'))
+
+    @cached_property
+    def is_assembly_team(self):
+        return self.token.get('is_assembly_team', False)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Authenticates with the claims of the access token instead of loading the user and their
+    department from the database.
+
+    The claims are written at login and reflect the user at that time: after a department
+    change the user gets up to date claims from `personnel/token/claims/` or by logging in again.
+    Tokens issued without the claims are resolved from the database like JWTAuthentication does.
+
+    Skipping the user query also skips JWTAuthentication's `is_active` check: a deactivated user
+    keeps access until their access token expires, ACCESS_TOKEN_LIFETIME at most. Refreshing
+    loads the user and refuses inactive ones, so they get no new access token.
+    """
+
+    def get_user(self, validated_token):
+        if 'department_id' not in validated_token:
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token)
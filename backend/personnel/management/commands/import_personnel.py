@@ -0,0 +1,41 @@
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from personnel.provisioning import FORMATS, ProvisioningError, import_personnel, read_personnel
+
+
+class Command(BaseCommand):
+    help = "Creates users from a CSV or JSON file, creating the departments they name which do not exist yet. " \
+           "Nothing is created when a row is invalid or a username is already taken."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, '-' for the standard input. CSV files need a header row with "
+                                         "username, password and optionally email and department (name) or department_id.")
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Format of the file. Defaults to its extension, required for the standard input.')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Processes hashing the passwords. Defaults to PERSONNEL_IMPORT_PROCESSES, or one per CPU.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users inserted per statement.')
+
+    def handle(self, *args, **options):
+        format = options['format'] or Path(options['path']).suffix.lstrip('.').lower()
+        if format not in FORMATS:
+            raise CommandError(f"Cannot tell the format of {options['path']}, use --format.")
+        if options['path'] == '-':
+            content = sys.stdin.read()
+        else:
+            with open(options['path'], encoding='utf-8-sig') as file:
+                content = file.read()
+
+        started = time.monotonic()
+        try:
+            created, departments = import_personnel(read_personnel(content, format), options['processes'], options['batch_size'])
+        except ProvisioningError as e:
+            raise CommandError('\n'.join([e.message] + e.errors))
+
+        self.stdout.write(f"Created {created} users in {time.monotonic() - started:.1f}s.")
+        if departments:
+            self.stdout.write(f"Created the departments {', '.join(departments)}.")
@@ -8,3 +8,9 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return self.username
+
+
+class RevokedToken(models.Model):
+    # Refresh tokens which cannot be used anymore, kept until they expire, see personnel.revocation
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
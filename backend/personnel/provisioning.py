@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from departments.models import Departments
+from manufacturing.versions import catalog_changed
+from mfgProject.cache import models_changed
+from .models import CustomUser
+
+FORMATS = ('csv', 'json')
+USERNAME_MAX_LENGTH = CustomUser._meta.get_field('username').max_length
+
+
+class ProvisioningError(Exception):
+    """Raised when an import is refused, `errors` lists the problems of every row."""
+
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.message = message
+        self.errors = list(errors)
+
+
+def read_personnel(content, format):
+    """
+    Parses the users of an import, CSV with a header row or JSON (a list of objects or
+    `{"users": [...]}`). Every user has a `username` and a `password`, and optionally an
+    `email` and either the `department` name or an existing `department_id`.
+    """
+    if format == 'csv':
+        return list(csv.DictReader(io.StringIO(content)))
+    if format == 'json':
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            raise ProvisioningError(f'Invalid JSON: {e}.')
+        return data.get('users') if isinstance(data, dict) else data
+    raise ProvisioningError(f'Unknown format {format!r}, expected one of {", ".join(FORMATS)}.')
+
+
+def hash_passwords(passwords, processes=None):
+    """
+    Hashes `passwords` with `make_password`, spread over `processes` processes (defaults to
+    PERSONNEL_IMPORT_PROCESSES, or one per CPU). The hashes are returned in order.
+    """
+    processes = processes or settings.PERSONNEL_IMPORT_PROCESSES or multiprocessing.cpu_count()
+    if processes <= 1 or len(passwords) <= 1:
+        return [make_password(password) for password in passwords]
+    # Fresh interpreters rather than forks of a possibly multithreaded server process
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(processes, len(passwords)), mp_context=context) as pool:
+        chunksize = max(1, len(passwords) // (processes * 4))
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def _clean(rows):
+    # Returns the rows as (username, email, password, department_id, department_name) and the errors found
+    if not isinstance(rows, list) or not rows:
+        raise ProvisioningError('At least one user is required.')
+
+    users, errors, usernames = [], [], set()
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append(f'Row {number}: expected an object.')
+            continue
+        username = str(row.get('username') or '').strip()
+        password = str(row.get('password') or '')
+        email = str(row.get('email') or '').strip()
+        department_name = str(row.get('department') or '').strip()
+        department_id = row.get('department_id') or None
+
+        if not username:
+            errors.append(f'Row {number}: username is required.')
+        elif len(username) > USERNAME_MAX_LENGTH:
+            errors.append(f'Row {number}: username is longer than {USERNAME_MAX_LENGTH} characters.')
+        elif username in usernames:
+            errors.append(f'Row {number}: username {username} appears more than once.')
+        if not password:
+            errors.append(f'Row {number}: password is required.')
+        if department_id is not None:
+            try:
+                department_id = int(department_id)
+            except (TypeError, ValueError):
+                errors.append(f'Row {number}: department_id must be an integer.')
+                department_id = None
+        usernames.add(username)
+        users.append((username, email, password, department_id, department_name))
+    return users, errors
+
+
+def import_personnel(rows, processes=None, batch_size=500):
+    """
+    Creates the users of `rows` (see `read_personnel`) and the departments they name which do not
+    exist yet. Nothing is created when a row is invalid or a username is taken.
+
+    The passwords are hashed in parallel before the transaction starts, then the departments and
+    the users are inserted with `bulk_create` in batches of `batch_size`. Returns the number of
+    users created and the names of the departments created.
+    """
+    users, errors = _clean(rows)
+
+    taken = set(CustomUser.objects.filter(username__in=[user[0] for user in users]).values_list('username', flat=True))
+    errors += [f'Username {username} is already taken.' for username in sorted(taken)]
+    department_ids = {user[3] for user in users if user[3] is not None}
+    known_ids = set(Departments.objects.filter(id__in=department_ids).values_list('id', flat=True))
+    errors += [f'Department {department_id} does not exist.' for department_id in sorted(department_ids - known_ids)]
+    if errors:
+        raise ProvisioningError('The users were not imported.', errors)
+
+    hashes = hash_passwords([user[2] for user in users], processes)
+
+    try:
+        with transaction.atomic():
+            # The first department of each name is used, the missing ones are created
+            names = {user[4] for user in users if user[3] is None and user[4]}
+            departments = {}
+            for department_id, name in Departments.objects.filter(name__in=names).order_by('-id').values_list('id', 'name'):
+                departments[name] = department_id
+            created = Departments.objects.bulk_create([Departments(name=name) for name in sorted(names - departments.keys())])
+            departments.update((department.name, department.id) for department in created)
+
+            CustomUser.objects.bulk_create([
+                CustomUser(
+                    username=username,
+                    email=email,
+                    password=password_hash,
+                    department_id=department_id if department_id is not None else departments.get(department_name),
+                )
+                for (username, email, password, department_id, department_name), password_hash in zip(users, hashes)
+            ], batch_size=batch_size)
+
+            if created:
+                # bulk_create sends no post_save, the caches depending on the departments are dropped here
+                models_changed(Departments)
+                catalog_changed()
+    except IntegrityError:
+        # A user of the import registered in the meantime
+        raise ProvisioningError('The users were not imported, a username was taken during the import.')
+
+    return len(users), [department.name for department in created]
@@ -0,0 +1,116 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import RevokedToken
+
+
+class BloomFilter:
+    """
+    Set of strings answering membership with false positives at `error_rate` but no false
+    negatives, in about 1.44 * log2(1 / error_rate) bits per key for `capacity` keys.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing, every position is derived from the two halves of a single digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+# Process level filter of the revoked token ids, with the highest RevokedToken id it holds
+_filter = None
+_last_id = 0
+_synced_at = 0
+_pruned_at = 0
+_lock = threading.Lock()
+
+
+def _sync_filter():
+    # Called with the lock held. Reloads the unexpired revocations once the filter holds more keys
+    # than it was sized for, otherwise adds the ones made by other processes since the last sync.
+    global _filter, _last_id, _synced_at
+    if _filter is None or _filter.count > _filter.capacity:
+        rows = list(RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('id', 'jti'))
+        _filter = BloomFilter(max(settings.TOKEN_REVOCATION_BLOOM_CAPACITY, 2 * len(rows)), settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE)
+        _last_id = 0
+    else:
+        rows = RevokedToken.objects.filter(id__gt=_last_id).values_list('id', 'jti')
+    for revoked_id, jti in rows:
+        _filter.add(jti)
+        _last_id = max(_last_id, revoked_id)
+    _synced_at = time.monotonic()
+
+
+def _get_filter():
+    if _filter is None or time.monotonic() - _synced_at > settings.TOKEN_REVOCATION_SYNC_INTERVAL:
+        with _lock:
+            if _filter is None or time.monotonic() - _synced_at > settings.TOKEN_REVOCATION_SYNC_INTERVAL:
+                _sync_filter()
+    return _filter
+
+
+def is_revoked(jti):
+    """
+    Returns whether the token `jti` is revoked. Tokens the filter has never seen, the common case,
+    are answered from memory, only its hits are confirmed with a query.
+
+    The filter learns of the revocations of other processes every `TOKEN_REVOCATION_SYNC_INTERVAL`
+    seconds, until then they are only caught by `revoke`.
+    """
+    if jti not in _get_filter():
+        return False
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def revoke(jti, expires_at):
+    """
+    Revokes the token `jti` until `expires_at`, when it would be refused anyway. Returns False
+    when it was revoked already, e.g. by a concurrent refresh rotating the same token: the insert
+    decides, so a token is never revoked twice whatever the filters of the processes hold.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {RevokedToken._meta.db_table} (jti, expires_at) VALUES (%s, %s) '
+            f'ON CONFLICT (jti) DO NOTHING RETURNING id',
+            [jti, expires_at],
+        )
+        revoked = cursor.fetchone() is not None
+    with _lock:
+        if _filter is not None:
+            _filter.add(jti)
+    prune_revoked_tokens()
+    return revoked
+
+
+def prune_revoked_tokens():
+    """
+    Deletes the revocations of expired tokens, at most once every `TOKEN_REVOCATION_PRUNE_INTERVAL`
+    seconds per process. Returns the number of rows deleted.
+    """
+    global _pruned_at
+    with _lock:
+        if time.monotonic() - _pruned_at < settings.TOKEN_REVOCATION_PRUNE_INTERVAL:
+            return 0
+        _pruned_at = time.monotonic()
+    return RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()[0]
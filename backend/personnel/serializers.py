@@ -1,5 +1,9 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from .models import CustomUser
+from .tokens import ClaimsRefreshToken, user_claims
 from departments.models import Departments
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -12,19 +16,47 @@ class CustomUserSerializer(serializers.ModelSerializer):
         extra_kwargs = {'password': {'write_only': True}}
 
     def create(self, validated_data):
-        # Extract the department ID from validated_data, if provided
-        department_id = validated_data.pop('department', None)
-
-        # Create the user instance
-        user = CustomUser.objects.create_user(
+        # Create the user instance with their department, if provided, in a single insert
+        return CustomUser.objects.create_user(
             username=validated_data['username'],
             email=validated_data['email'],
-            password=validated_data['password']
+            password=validated_data['password'],
+            department=validated_data.get('department'),
         )
 
-        # Set the department if department_id is provided
-        if department_id:
-            user.department_id = department_id
-            user.save()
 
-        return user
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    # Login issues tokens carrying the user's department, see ClaimsJWTAuthentication
+    token_class = ClaimsRefreshToken
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh with a `ClaimsRefreshToken`. The user is loaded anyway to check they are still active,
+    so the department claims are brought up to date on the way, and the rotated token is revoked
+    through `personnel.revocation`.
+    """
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user = CustomUser.objects.select_related('department').filter(id=refresh[api_settings.USER_ID_CLAIM]).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        for claim, value in user_claims(user).items():
+            refresh[claim] = value
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data['refresh'] = str(refresh)
+
+        return data
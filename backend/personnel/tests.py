@@ -1,3 +1,191 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from departments.models import Departments
+from .authentication import ClaimsJWTAuthentication, ClaimsUser
+from .models import CustomUser, RevokedToken
+from . import revocation
+from .revocation import BloomFilter, is_revoked, revoke
+from .tokens import ClaimsRefreshToken
+
+
+def authenticate(token):
+    request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+    return ClaimsJWTAuthentication().authenticate(request)[0]
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        self.assembly_team = Departments.objects.create(name='Assembly Team')
+        self.wing_team = Departments.objects.create(name='Wing Team')
+        self.user = CustomUser.objects.create_user(username='operator', password='pass', department=self.wing_team)
+
+    def login(self):
+        response = APIClient().post('/personnel/login/', {'username': 'operator', 'password': 'pass'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_login_tokens_authenticate_without_queries(self):
+        access = self.login()['access']
+
+        with self.assertNumQueries(0):
+            user = authenticate(access)
+            self.assertIsInstance(user, ClaimsUser)
+            self.assertEqual((user.id, user.username), (self.user.id, 'operator'))
+            self.assertEqual((user.department.id, user.department.name), (self.wing_team.id, 'Wing Team'))
+            self.assertFalse(user.is_assembly_team)
+
+    def test_claims_are_refreshed_after_a_department_change(self):
+        tokens = self.login()
+        self.user.department = self.assembly_team
+        self.user.save()
+        self.assertEqual(AccessToken(tokens['access'])['department_id'], self.wing_team.id)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        response = client.post('/personnel/token/claims/', {'refresh': tokens['refresh']}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        user = authenticate(response.data['access'])
+        self.assertEqual(user.department.id, self.assembly_team.id)
+        self.assertTrue(user.is_assembly_team)
+        # The refresh token carrying the old department is revoked
+        self.assertEqual(client.post('/personnel/token/claims/', {'refresh': tokens['refresh']}, format='json').status_code, 401)
+        self.assertEqual(APIClient().post('/personnel/token/refresh/', {'refresh': tokens['refresh']}, format='json').status_code, 401)
+
+    def test_claims_refresh_refuses_another_users_refresh_token(self):
+        other = CustomUser.objects.create_user(username='other', password='pass', department=self.wing_team)
+        other_refresh = str(ClaimsRefreshToken.for_user(other))
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.login()["access"]}')
+
+        self.assertEqual(client.post('/personnel/token/claims/', {'refresh': other_refresh}, format='json').status_code, 401)
+        self.assertEqual(client.post('/personnel/token/claims/').status_code, 400)
+        self.assertFalse(is_revoked(ClaimsRefreshToken(other_refresh)['jti']))
+
+    def test_tokens_without_claims_load_the_user(self):
+        user = authenticate(RefreshToken.for_user(self.user).access_token)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.department.name, 'Wing Team')
+
+
+class RefreshTokenTests(TestCase):
+    def setUp(self):
+        self.assembly_team = Departments.objects.create(name='Assembly Team')
+        self.wing_team = Departments.objects.create(name='Wing Team')
+        self.user = CustomUser.objects.create_user(username='operator', password='pass', department=self.wing_team)
+        self.refresh = str(ClaimsRefreshToken.for_user(self.user))
+
+    def refresh_tokens(self, refresh):
+        return APIClient().post('/personnel/token/refresh/', {'refresh': refresh}, format='json')
+
+    def test_refresh_rotates_and_revokes_the_used_token(self):
+        response = self.refresh_tokens(self.refresh)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(authenticate(response.data['access']).department.id, self.wing_team.id)
+        self.assertTrue(RevokedToken.objects.filter(jti=RefreshToken(self.refresh, verify=False)['jti']).exists())
+        # The used token is refused, the rotated one works once
+        self.assertEqual(self.refresh_tokens(self.refresh).status_code, 401)
+        self.assertEqual(self.refresh_tokens(response.data['refresh']).status_code, 200)
+
+    def test_refresh_updates_the_department_claims(self):
+        self.user.department = self.assembly_team
+        self.user.save()
+
+        response = self.refresh_tokens(self.refresh)
+
+        user = authenticate(response.data['access'])
+        self.assertEqual(user.department.id, self.assembly_team.id)
+        self.assertTrue(user.is_assembly_team)
+
+    def test_revocation_check_of_unrevoked_tokens_needs_no_query(self):
+        is_revoked('warm up')
+
+        with self.assertNumQueries(0):
+            self.assertFalse(is_revoked(ClaimsRefreshToken(self.refresh)['jti']))
+
+    @override_settings(TOKEN_REVOCATION_BLOOM_CAPACITY=2, TOKEN_REVOCATION_SYNC_INTERVAL=0)
+    def test_filter_is_not_reloaded_while_under_its_own_capacity(self):
+        expires_at = timezone.now() + timedelta(days=1)
+        RevokedToken.objects.bulk_create([RevokedToken(jti=f'token-{i}', expires_at=expires_at) for i in range(3)])
+        revocation._filter = None
+        is_revoked('warm up')
+
+        # More revocations than the configured capacity, but the filter was sized for them
+        with CaptureQueriesContext(connection) as queries:
+            is_revoked('warm up')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('expires_at', queries[0]['sql'])
+
+    @override_settings(TOKEN_REVOCATION_PRUNE_INTERVAL=0)
+    def test_expired_revocations_are_pruned(self):
+        self.assertTrue(revoke('expired', timezone.now() - timedelta(minutes=1)))
+        self.assertTrue(revoke('current', timezone.now() + timedelta(days=1)))
+        self.assertFalse(revoke('current', timezone.now() + timedelta(days=1)))
+
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['current'])
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        keys = [f'token-{i}' for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+
+        self.assertTrue(all(key in bloom for key in keys))
+        self.assertLess(sum(f'other-{i}' in bloom for i in range(10000)), 300)
+
+
+class PersonnelImportTests(TestCase):
+    def setUp(self):
+        self.wing_team = Departments.objects.create(name='Wing Team')
+
+    def test_command_imports_a_csv_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write('username,email,password,department\n'
+                       'wing1,wing1@example.com,secret1,Wing Team\n'
+                       'tail1,,secret2,Tail Team\n'
+                       'tail2,,secret3,Tail Team\n')
+            file.flush()
+            call_command('import_personnel', file.name, '--processes', '2', stdout=StringIO())
+
+        tail_team = Departments.objects.get(name='Tail Team')
+        self.assertEqual(
+            list(CustomUser.objects.order_by('username').values_list('username', 'department_id')),
+            [('tail1', tail_team.id), ('tail2', tail_team.id), ('wing1', self.wing_team.id)],
+        )
+        self.assertTrue(CustomUser.objects.get(username='tail2').check_password('secret3'))
+
+    def test_endpoint_needs_staff_and_imports_nothing_on_errors(self):
+        admin = CustomUser.objects.create_user(username='admin', password='pass', is_staff=True)
+        operator = CustomUser.objects.create_user(username='operator', password='pass')
+        users = [
+            {'username': 'new', 'password': 'secret', 'department_id': self.wing_team.id},
+            {'username': 'operator', 'password': 'secret', 'department': 'Body Team'},
+        ]
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(operator).access_token}')
+        self.assertEqual(client.post('/personnel/import/', users, format='json').status_code, 403)
+
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}')
+        response = client.post('/personnel/import/', users, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], ['Username operator is already taken.'])
+        self.assertFalse(CustomUser.objects.filter(username='new').exists())
+        self.assertFalse(Departments.objects.filter(name='Body Team').exists())
+
+        response = client.post('/personnel/import/', {'users': users[:1]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(CustomUser.objects.get(username='new').department_id, self.wing_team.id)
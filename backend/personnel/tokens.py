@@ -0,0 +1,44 @@
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from departments.capabilities import get_department_capabilities
+from .revocation import is_revoked, revoke
+
+
+def user_claims(user):
+    """The claims `ClaimsJWTAuthentication` builds the request user from, read from the database user."""
+    department = user.department
+    return {
+        'username': user.username,
+        'department_id': department.id if department is not None else None,
+        'department_name': department.name if department is not None else None,
+        'is_assembly_team': get_department_capabilities(user.department_id).can_assemble,
+    }
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's department as claims. Its access tokens copy them, so the
+    requests they authenticate need no user or department query.
+
+    Rotated tokens are revoked through `personnel.revocation` instead of simplejwt's blacklist app.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in user_claims(user).items():
+            token[claim] = value
+        return token
+
+    def verify(self):
+        super().verify()
+        if is_revoked(self[api_settings.JTI_CLAIM]):
+            raise TokenError('Token is revoked')
+
+    def blacklist(self):
+        # Fails when a concurrent refresh revoked the token first, each refresh token is used once
+        if not revoke(self[api_settings.JTI_CLAIM], datetime_from_epoch(self['exp'])):
+            raise TokenError('Token is revoked')
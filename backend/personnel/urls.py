@@ -4,14 +4,16 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from personnel.views import RegisterUserView
+from personnel.views import PersonnelImportView, RegisterUserView, RefreshClaimsView
 
 
 
 urlpatterns = [
     path('personnel/register/', RegisterUserView.as_view(), name='register'),
     path('personnel/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    #path('personnel/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('personnel/token/claims/', RefreshClaimsView.as_view(), name='token_claims'),
+    path('personnel/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('personnel/import/', PersonnelImportView.as_view(), name='personnel_import'),
 
 
 
@@ -1,9 +1,163 @@
 from rest_framework import status, generics
-from rest_framework.permissions import AllowAny
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from .provisioning import FORMATS, ProvisioningError, import_personnel, read_personnel
 from .serializers import CustomUserSerializer
+from .tokens import ClaimsRefreshToken
 from personnel.models import CustomUser
 
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
 class RegisterUserView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     permission_classes = (AllowAny,)
-    serializer_class = CustomUserSerializer
\ No newline at end of file
+    serializer_class = CustomUserSerializer
+
+
+class RefreshClaimsView(APIView):
+    # Loads the user from the database, the point is to read their current department
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Issues a new token pair whose claims reflect the user's current department. Tokens carry the department they were issued with, "
+                              "call this after the user changed department instead of logging in again. The user's refresh token is revoked, use the new one.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'refresh': openapi.Schema(type=openapi.TYPE_STRING, description="The user's current refresh token"),
+            },
+            required=['refresh'],
+        ),
+        responses={
+            200: openapi.Response(
+                description="The new tokens.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'refresh': openapi.Schema(type=openapi.TYPE_STRING, description='Refresh token'),
+                        'access': openapi.Schema(type=openapi.TYPE_STRING, description='Access token')
+                    }
+                )
+            ),
+            400: openapi.Response(description="Bad request. Missing `refresh`."),
+            401: openapi.Response(description="A token is missing, invalid, expired or revoked, or the refresh token belongs to another user.")
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                'Authorization',
+                openapi.IN_HEADER,
+                description="JWT Authorization header. Format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ]
+    )
+    def post(self, request):
+        if not request.data.get('refresh'):
+            return Response({'status': False, 'error': 'refresh is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Revoke the presented refresh token, it would otherwise keep issuing tokens with the old claims
+        try:
+            presented = ClaimsRefreshToken(request.data['refresh'])
+            if str(presented[api_settings.USER_ID_CLAIM]) != str(request.user.id):
+                raise TokenError('Token belongs to another user')
+            presented.blacklist()
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        refresh = ClaimsRefreshToken.for_user(request.user)
+        return Response({'refresh': str(refresh), 'access': str(refresh.access_token)}, status=status.HTTP_200_OK)
+
+
+class PersonnelImportView(APIView):
+    # Loads the user from the database, the claims do not say whether they are staff
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+    parser_classes = [JSONParser, MultiPartParser]
+
+    @swagger_auto_schema(
+        operation_description="Creates many users at once, e.g. a new shift of operators. The users are sent as a JSON list of "
+                              "`{username, password, email, department}` objects (or `{users: [...]}`), or uploaded as a CSV or JSON "
+                              "`file` whose name ends in .csv or .json. `department` is a department name, created when it does not "
+                              "exist yet, `department_id` can be given instead. Nothing is created when a row is invalid or a username "
+                              "is already taken. The user must be staff.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'username': openapi.Schema(type=openapi.TYPE_STRING, description='Username'),
+                    'password': openapi.Schema(type=openapi.TYPE_STRING, description='Password'),
+                    'email': openapi.Schema(type=openapi.TYPE_STRING, description='Email address'),
+                    'department': openapi.Schema(type=openapi.TYPE_STRING, description='Department name'),
+                    'department_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of an existing department'),
+                },
+                required=['username', 'password'],
+            )
+        ),
+        responses={
+            201: openapi.Response(
+                description="The users were created.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Operation status'),
+                        'created_users': openapi.Schema(type=openapi.TYPE_INTEGER, description='Number of users created'),
+                        'created_departments': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING),
+                                                              description='Names of the departments created'),
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Nothing was imported, `errors` lists the problems of the rows.",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Operation status'),
+                        'error': openapi.Schema(type=openapi.TYPE_STRING, description='Error message'),
+                        'errors': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING),
+                                                 description='Problems found in the rows'),
+                    }
+                )
+            ),
+            401: openapi.Response(description="The token is missing, invalid or expired."),
+            403: openapi.Response(description="Forbidden. The user is not staff.")
+        },
+        manual_parameters=[
+            openapi.Parameter(
+                'Authorization',
+                openapi.IN_HEADER,
+                description="JWT Authorization header. Format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ]
+    )
+    def post(self, request):
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                # Read the uploaded file in the format its name tells
+                format = upload.name.rsplit('.', 1)[-1].lower()
+                if format not in FORMATS:
+                    raise ProvisioningError('The file must be a .csv or .json file.')
+                try:
+                    content = upload.read().decode('utf-8-sig')
+                except UnicodeDecodeError:
+                    raise ProvisioningError('The file must be UTF-8 encoded.')
+                rows = read_personnel(content, format)
+            else:
+                rows = request.data.get('users') if isinstance(request.data, dict) else request.data
+
+            created, departments = import_personnel(rows)
+        except ProvisioningError as e:
+            return Response({'status': False, 'error': e.message, 'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'status': True, 'created_users': created, 'created_departments': departments}, status=status.HTTP_201_CREATED)
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class PlanesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'planes'
+
+    def ready(self):
+        from mfgProject.cache import model_changed
+        from .models import BillOfMaterials, Planes
+
+        # Drop the cached plane names and bills of materials whenever a plane or a bill of materials changes
+        for model in (Planes, BillOfMaterials):
+            post_save.connect(model_changed, sender=model, dispatch_uid=f'cache_saved_{model.__name__}')
+            post_delete.connect(model_changed, sender=model, dispatch_uid=f'cache_deleted_{model.__name__}')
+        m2m_changed.connect(model_changed, sender=Planes.parts.through, dispatch_uid='cache_m2m_changed')
@@ -0,0 +1,41 @@
+from mfgProject.cache import CachedValue
+
+from .models import BillOfMaterials
+
+
+def _load_bills_of_materials():
+    bills = {}
+    for plane_id, part_id, quantity in BillOfMaterials.objects.order_by('plane_id', 'part_id').values_list('plane_id', 'part_id', 'quantity'):
+        bills.setdefault(plane_id, {})[part_id] = quantity
+    return bills
+
+
+bills_of_materials = CachedValue('bills_of_materials', [BillOfMaterials], _load_bills_of_materials)
+
+
+def get_bills_of_materials():
+    """
+    Returns the bill of materials of every plane as `{plane_id: {part_id: quantity}}`.
+
+    The whole table is loaded with a single query and cached, see `CachedValue`. Every
+    BillOfMaterials change made through the ORM invalidates it. Queryset `update()`/`bulk_create()`
+    bypass the signals, so callers using them must invalidate the cache themselves.
+    """
+    return bills_of_materials.get()
+
+
+def get_bill_of_materials(plane_id):
+    """Returns `{part_id: quantity}` for the given plane, empty if the plane has no parts."""
+    return get_bills_of_materials().get(int(plane_id), {})
+
+
+def read_bill_of_materials(plane_id):
+    """
+    Returns `{part_id: quantity}` for the given plane read from the database, for the callers that
+    must not use a copy of another process older than the rows they locked.
+    """
+    return dict(BillOfMaterials.objects.filter(plane_id=plane_id).order_by('part_id').values_list('part_id', 'quantity'))
+
+
+def invalidate_bills_of_materials():
+    bills_of_materials.invalidate()
@@ -0,0 +1,20 @@
+from django.db import connection
+
+from .models import PlanesInventory
+
+
+def increment_planes_inventory(plane_id, quantity):
+    """
+    Adds `quantity` planes to the inventory of a plane model in one INSERT ... ON CONFLICT DO
+    UPDATE, creating its inventory row on the way. Returns the new inventory.
+    """
+    table = connection.ops.quote_name(PlanesInventory._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (plane_id, inventory) VALUES (%s, %s) '
+            f'ON CONFLICT (plane_id) DO UPDATE SET inventory = {table}.inventory + EXCLUDED.inventory '
+            f'RETURNING inventory',
+            [plane_id, quantity],
+        )
+        return cursor.fetchone()[0]
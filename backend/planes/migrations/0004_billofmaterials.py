@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0002_rename_department_id_parts_department_and_more'),
+        ('planes', '0003_planes_required_parts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillOfMaterials',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('part', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='parts.parts')),
+                ('plane', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bill_of_materials', to='planes.planes')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='planes',
+            name='parts',
+            field=models.ManyToManyField(related_name='planes', through='planes.BillOfMaterials', to='parts.parts'),
+        ),
+        migrations.AddConstraint(
+            model_name='billofmaterials',
+            constraint=models.UniqueConstraint(fields=('plane', 'part'), name='unique_bill_of_materials_plane_part'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:40
+
+import ast
+from collections import Counter
+
+from django.db import migrations
+
+
+def required_parts_to_bill_of_materials(apps, schema_editor):
+    Planes = apps.get_model('planes', 'Planes')
+    Parts = apps.get_model('parts', 'Parts')
+    BillOfMaterials = apps.get_model('planes', 'BillOfMaterials')
+
+    part_ids = set(Parts.objects.values_list('id', flat=True))
+    rows = []
+    for plane_id, required_parts in Planes.objects.values_list('id', 'required_parts'):
+        # required_parts is a string like "(1, 2, 3, 4)", a repeated part means more than one unit
+        try:
+            parsed = ast.literal_eval(required_parts)
+        except (ValueError, SyntaxError):
+            continue
+        if isinstance(parsed, int):
+            parsed = (parsed,)
+        for part_id, quantity in Counter(parsed).items():
+            if part_id in part_ids:
+                rows.append(BillOfMaterials(plane_id=plane_id, part_id=part_id, quantity=quantity))
+
+    BillOfMaterials.objects.bulk_create(rows)
+
+
+def bill_of_materials_to_required_parts(apps, schema_editor):
+    Planes = apps.get_model('planes', 'Planes')
+    BillOfMaterials = apps.get_model('planes', 'BillOfMaterials')
+
+    required_parts = {}
+    for plane_id, part_id, quantity in BillOfMaterials.objects.order_by('id').values_list('plane_id', 'part_id', 'quantity'):
+        required_parts.setdefault(plane_id, []).extend([part_id] * quantity)
+
+    planes = list(Planes.objects.all())
+    for plane in planes:
+        plane.required_parts = str(tuple(required_parts.get(plane.id, ())))
+    Planes.objects.bulk_update(planes, ['required_parts'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planes', '0004_billofmaterials'),
+    ]
+
+    operations = [
+        migrations.RunPython(required_parts_to_bill_of_materials, bill_of_materials_to_required_parts),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:12
+
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_inventories(apps, schema_editor):
+    PlanesInventory = apps.get_model('planes', 'PlanesInventory')
+
+    # Keep the oldest row of every plane with the summed inventory, drop the others
+    duplicates = PlanesInventory.objects.values('plane_id') \
+        .annotate(rows=Count('id'), kept_id=Min('id'), total=Sum('inventory')).filter(rows__gt=1)
+    for duplicate in duplicates.iterator():
+        PlanesInventory.objects.filter(id=duplicate['kept_id']).update(inventory=duplicate['total'])
+        PlanesInventory.objects.filter(plane_id=duplicate['plane_id']).exclude(id=duplicate['kept_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planes', '0006_remove_planes_required_parts'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_inventories, migrations.RunPython.noop),
+    ]
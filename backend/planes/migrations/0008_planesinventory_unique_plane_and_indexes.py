@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0006_drop_redundant_plane_indexes'),
+        ('planes', '0007_merge_duplicate_planesinventory'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='billofmaterials',
+            name='part',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='parts.parts'),
+        ),
+        migrations.AlterField(
+            model_name='billofmaterials',
+            name='plane',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='bill_of_materials', to='planes.planes'),
+        ),
+        migrations.AlterField(
+            model_name='planesinventory',
+            name='plane',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='planes.planes'),
+        ),
+        migrations.AddIndex(
+            model_name='billofmaterials',
+            index=models.Index(fields=['part'], include=('plane', 'quantity'), name='bill_of_materials_part_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='planesinventory',
+            constraint=models.UniqueConstraint(fields=('plane',), name='unique_planes_inventory_plane'),
+        ),
+    ]
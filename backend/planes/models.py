@@ -3,10 +3,32 @@ from django.db import models
 # Create your models here.
 class Planes(models.Model):
     name = models.CharField(max_length=100)
-    required_parts = models.TextField()
+    parts = models.ManyToManyField('parts.Parts', through='BillOfMaterials', related_name='planes')
 
 
 class PlanesInventory(models.Model):
-    plane = models.ForeignKey(Planes, on_delete=models.CASCADE)
+    # Indexed by the unique constraint
+    plane = models.ForeignKey(Planes, on_delete=models.CASCADE, db_index=False)
     inventory = models.IntegerField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['plane'], name='unique_planes_inventory_plane'),
+        ]
+
+
+class BillOfMaterials(models.Model):
+    # Indexed by the unique constraint and the covering index
+    plane = models.ForeignKey(Planes, on_delete=models.CASCADE, related_name='bill_of_materials', db_index=False)
+    part = models.ForeignKey('parts.Parts', on_delete=models.CASCADE, db_index=False)
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['plane', 'part'], name='unique_bill_of_materials_plane_part'),
+        ]
+        indexes = [
+            # Lets the per department lookups find the planes needing a part without reading the table
+            models.Index(fields=['part'], include=['plane', 'quantity'], name='bill_of_materials_part_idx'),
+        ]
+
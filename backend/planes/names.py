@@ -0,0 +1,28 @@
+from mfgProject.cache import CachedValue
+
+from .models import Planes
+
+
+def _load_plane_names():
+    return dict(Planes.objects.values_list('id', 'name'))
+
+
+plane_names = CachedValue('plane_names', [Planes], _load_plane_names)
+
+
+def get_plane_names():
+    """
+    Returns the name of every plane as `{plane_id: name}`.
+
+    The names are loaded with a single query and cached, see `CachedValue`. Every Planes change
+    made through the ORM invalidates them.
+    """
+    return plane_names.get()
+
+
+def get_plane_name(plane_id):
+    """Returns the name of the plane `plane_id`, None when there is no such plane."""
+    try:
+        return get_plane_names().get(int(plane_id))
+    except (TypeError, ValueError):
+        return None
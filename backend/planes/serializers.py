@@ -1,13 +1,20 @@
 # serializers.py
 
 from rest_framework import serializers
-from .models import Planes, PlanesInventory
+from .models import Planes, PlanesInventory, BillOfMaterials
 
 
+class BillOfMaterialsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BillOfMaterials
+        fields = ['part', 'quantity']
+
 class PlanesSerializer(serializers.ModelSerializer):
+    bill_of_materials = BillOfMaterialsSerializer(many=True, read_only=True)
+
     class Meta:
         model = Planes
-        fields = ['id', 'name', 'required_parts']
+        fields = ['id', 'name', 'bill_of_materials']
 
 class PlanesInventorySerializer(serializers.ModelSerializer):
     plane = PlanesSerializer()
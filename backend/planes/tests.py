@@ -1,3 +1,40 @@
 from django.test import TestCase
 
-# Create your tests here.
+from departments.models import Departments
+from parts.models import Parts
+from .bom import get_bill_of_materials, get_bills_of_materials, invalidate_bills_of_materials
+from .models import BillOfMaterials, Planes
+
+
+class BillOfMaterialsCacheTests(TestCase):
+    def setUp(self):
+        department = Departments.objects.create(name='Wing Team')
+        self.wing = Parts.objects.create(name='Wing', department=department)
+        self.body = Parts.objects.create(name='Body', department=department)
+        self.plane = Planes.objects.create(name='TB2')
+        BillOfMaterials.objects.create(plane=self.plane, part=self.wing, quantity=2)
+        invalidate_bills_of_materials()
+
+    def test_loads_every_plane_once(self):
+        other = Planes.objects.create(name='TB3')
+        other.parts.add(self.body)
+
+        with self.assertNumQueries(1):
+            bills = get_bills_of_materials()
+            get_bill_of_materials(self.plane.id)
+            get_bill_of_materials(other.id)
+
+        self.assertEqual(bills[self.plane.id], {self.wing.id: 2})
+        self.assertEqual(bills[other.id], {self.body.id: 1})
+
+    def test_changes_invalidate_the_cache(self):
+        get_bills_of_materials()
+
+        BillOfMaterials.objects.create(plane=self.plane, part=self.body)
+        self.assertEqual(get_bill_of_materials(self.plane.id), {self.wing.id: 2, self.body.id: 1})
+
+        BillOfMaterials.objects.get(plane=self.plane, part=self.wing).delete()
+        self.assertEqual(get_bill_of_materials(self.plane.id), {self.body.id: 1})
+
+        self.plane.parts.clear()
+        self.assertEqual(get_bill_of_materials(self.plane.id), {})
@@ -6,13 +6,15 @@ import { fetchAssemblyHistory } from '../services/planeManufactureService';
 
 const AssemblyHistory = ({ token, refresh }) => {
   const [history, setHistory] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [error, setError] = useState(null);
 
   useEffect(() => {
     const fetchHistory = async () => {
       try {
-        const historyData = await fetchAssemblyHistory(token);
-        setHistory(historyData);
+        const page = await fetchAssemblyHistory(token);
+        setHistory(page.history);
+        setNextCursor(page.nextCursor);
       } catch (err) {
         setError(err.message);
       }
@@ -20,6 +22,17 @@ const AssemblyHistory = ({ token, refresh }) => {
     fetchHistory();
   }, [token, refresh]); // Add 'refresh' as a dependency
 
+  // Append the next page of the history
+  const loadMore = async () => {
+    try {
+      const page = await fetchAssemblyHistory(token, nextCursor);
+      setHistory((previous) => [...previous, ...page.history]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError(err.message);
+    }
+  };
+
   if (error) {
     return <p>{error}</p>;
   }
@@ -40,8 +53,8 @@ const AssemblyHistory = ({ token, refresh }) => {
           </tr>
         </thead>
         <tbody>
-          {history.map((entry, index) => (
-            <tr key={index}>
+          {history.map((entry) => (
+            <tr key={entry.id}>
               <td>{entry.plane_name}</td>
               <td>{entry.used_parts}</td>
               <td>{entry.date}</td>
@@ -49,6 +62,7 @@ const AssemblyHistory = ({ token, refresh }) => {
           ))}
         </tbody>
       </table>
+      {nextCursor && <button onClick={loadMore}>Load more</button>}
     </div>
   );
 };
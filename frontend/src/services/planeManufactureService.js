@@ -56,16 +56,17 @@ export const recyclePlane = async (planeId, token) => {
 };
 
 
-export const fetchAssemblyHistory = async (token) => {
+export const fetchAssemblyHistory = async (token, cursor = null) => {
   try {
     const response = await axios.get('/plane/assemble-history', {
       headers: {
         Authorization: `Bearer ${token}`,
       },
+      params: cursor ? { cursor } : {},
     });
     const data = response.data;
     if (data.status) {
-      return data.data;
+      return { history: data.data, nextCursor: data.next_cursor };
     } else {
       throw new Error('No assembly history data available');
     }